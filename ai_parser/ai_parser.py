@@ -1,35 +1,97 @@
 from __future__ import annotations
-from typing import Dict, Any
-from scrapegraphai.graphs import SmartScraperGraph
+from functools import partial
+from typing import Dict, Any, Optional, Sequence
 from scrapegraphai.utils import prettify_exec_info
-import inspect
 from rich import print
 from .graph_config import GRAPH_CONFIG
-from .output_class import PlanningQuantitativeAssessment
-from .system_prompt import DEFAULT_SIMPLE_PROMPT
-import asyncio
+from .system_prompt import DEFAULT_SIMPLE_PROMPT, focused_prompt
+from .cache import ExtractionCache, extraction_key, get_default_cache
+from .batching import get_default_batcher
+from .engine import get_default_engine
+from .reduce import reduce_policy_html
+from resilience import LLM_HOST, classify_llm_error, get_controller
+from singleflight import get_group
+import tracing
 
 
+# Concurrent requests for the same policy HTML + prompt share one LLM call.
+_flights = get_group("llm")
 
 
-async def scrape_zone_data(html: str, prompt: str = DEFAULT_SIMPLE_PROMPT) -> Dict[str, Any]:
-    scraper = SmartScraperGraph(prompt=prompt, source=html, config=GRAPH_CONFIG,schema=PlanningQuantitativeAssessment)
+
+
+async def scrape_zone_data(
+    html: str,
+    prompt: str = DEFAULT_SIMPLE_PROMPT,
+    cache: Optional[ExtractionCache] = None,
+    use_cache: bool = True,
+    provenance: Optional[Dict[str, Any]] = None,
+    fields: Optional[Sequence[str]] = None,
+    reduce: bool = True,
+) -> Dict[str, Any]:
+    """Extract a ``PlanningQuantitativeAssessment`` dict from policy HTML.
+
+    With ``reduce`` the HTML is first cut down to the criteria relevant to
+    ``fields`` as compact markdown (see ``ai_parser.reduce``), and that is
+    what the LLM reads and the cache is keyed on. Results are looked up in
+    (and written to) the on-disk extraction cache first, so identical zone
+    policies only ever reach the LLM once; concurrent misses for the same
+    key share a single LLM call. With batching configured (see
+    ``ai_parser.batching``) a miss may share its LLM request with other
+    documents, as long as ``prompt`` is the default one (focused on
+    ``fields`` when given), which the batched prompt is built from. When
+    ``provenance`` is given, its ``llm_source`` is set to "cache" or "llm".
+    """
+    model = GRAPH_CONFIG["llm"].get("model", "")
+    if reduce:
+        with tracing.span("llm.reduce") as current:
+            reduction = reduce_policy_html(html, fields)
+            current.set(tokens_before=reduction.tokens_before, tokens_after=reduction.tokens_after,
+                        criteria=reduction.criteria)
+        html = reduction.text
+    key = extraction_key(html, prompt, model)
+    with tracing.span("llm.extract", model=model) as current:
+        if use_cache:
+            cache = cache or get_default_cache()
+            cached = cache.get(key)
+            if cached is not None:
+                current.set(cache_hit=True)
+                if provenance is not None:
+                    provenance["llm_source"] = "cache"
+                return cached
+
+        if provenance is not None:
+            provenance["llm_source"] = "llm"
+        cache = cache if use_cache else None
+        single = partial(_run_scraper, html, prompt, cache, key)
+        batcher = get_default_batcher()
+        default_prompt = focused_prompt(fields) if fields is not None else DEFAULT_SIMPLE_PROMPT
+        if batcher is not None and prompt == default_prompt:
+            return await _flights.do(key, lambda: batcher.extract(html, fields, key, cache, single))
+        return await _flights.do(key, single)
+
+
+async def _run_scraper(html: str, prompt: str, cache: Optional[ExtractionCache], key: str) -> Dict[str, Any]:
+    engine = get_default_engine()
     try:
-        if inspect.iscoroutinefunction(scraper.run):
-            raw = await scraper.run()
-        else:
-            raw = await asyncio.get_running_loop().run_in_executor(None, scraper.run)
+        # The engine bounds how many run at once. Only the run itself is rate
+        # limited, timed, retried and circuit-broken under the "llm" host
+        # policy, so waiting for a free graph never counts as a timeout.
+        async with engine.lease(prompt, html) as graph:
+            extraction = await get_controller(LLM_HOST).call(lambda: graph.run(prompt, html),
+                                                             classify_error=classify_llm_error)
+        raw = extraction.raw
+        tracing.add("tokens", extraction.tokens)
         if GRAPH_CONFIG.get("verbose"):
             try:
-                print("\n" + prettify_exec_info(scraper.get_execution_info()))
+                print("\n" + prettify_exec_info(extraction.execution_info))
             except Exception:
                 pass
         if not isinstance(raw, dict):
             raise ValueError("Scraper returned non-dict")
         print("Scraped data: %s", raw)
+        if cache is not None:
+            cache.put(key, raw)
         return raw
     except Exception as e:
         raise ValueError(f"Scraping error: {e}") from e
-
-
-
@@ -0,0 +1,239 @@
+"""Pack several policy documents into one LLM request.
+
+A single-document extraction repeats the system prompt and the
+``PlanningQuantitativeAssessment`` schema on every call, and pays a round
+trip for each. ``ExtractionBatcher`` collects the (already reduced)
+documents whose extractions are requested within ``max_wait`` seconds of
+each other and sends them together, up to ``token_budget`` document tokens
+or ``max_documents`` documents per request. Each document is headed by an
+``=== DOCUMENT <id> ===`` line, and the model answers with one assessment
+per id (``BatchedAssessments``). Answers are validated per document; a
+document that is missing from the answer or whose assessment doesn't
+validate is re-extracted on its own, as is every document of a request
+that fails outright. Results are cached per document under the key the
+single-document path uses, so both modes share the extraction cache.
+"""
+from __future__ import annotations
+import asyncio
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Set
+
+from pydantic import BaseModel, Field, ValidationError
+
+from resilience import LLM_HOST, classify_llm_error, get_controller
+from settings import LLM_BATCH_TOKENS
+import tracing
+
+from .cache import ExtractionCache
+from .engine import get_default_engine
+from .output_class import PlanningQuantitativeAssessment
+from .reduce import count_tokens
+from .system_prompt import DEFAULT_SIMPLE_PROMPT
+
+
+DEFAULT_MAX_DOCUMENTS = 8
+DEFAULT_MAX_WAIT = 0.05  # seconds a request waits for others to share it with
+
+
+class DocumentAssessment(BaseModel):
+    document_id: str = Field(description="The id in the document's `=== DOCUMENT <id> ===` header.")
+    assessment: PlanningQuantitativeAssessment
+
+
+class BatchedAssessments(BaseModel):
+    documents: List[DocumentAssessment] = Field(description="One entry per input document.")
+
+
+@dataclass
+class BatchStats:
+    requests: int = 0         # LLM requests carrying more than one document
+    documents: int = 0        # documents sent in those requests
+    singles: int = 0          # documents sent alone because nothing arrived to pack them with
+    fallbacks: int = 0        # packed documents re-extracted alone
+    failed_requests: int = 0  # packed requests that raised
+
+
+@dataclass
+class _Job:
+    text: str
+    fields: Optional[Sequence[str]]
+    key: str
+    tokens: int
+    cache: Optional[ExtractionCache]
+    single: Callable[[], Awaitable[Dict[str, Any]]]
+    future: asyncio.Future
+
+
+def batch_source(document_ids: Sequence[str], texts: Sequence[str]) -> str:
+    """The documents of one request, each under its ``=== DOCUMENT <id> ===`` header."""
+    return "\n\n".join(f"=== DOCUMENT {document_id} ===\n{text}" for document_id, text in zip(document_ids, texts))
+
+
+def batch_prompt(
+    document_ids: Sequence[str],
+    fields: Sequence[Optional[Sequence[str]]],
+    prompt: str = DEFAULT_SIMPLE_PROMPT,
+) -> str:
+    """``prompt`` for several documents, listing the fields each one still needs."""
+    wanted = "\n".join(f"- {document_id}: {', '.join(needed) if needed is not None else 'all fields'}"
+                       for document_id, needed in zip(document_ids, fields))
+    return (
+        f"{prompt}\n"
+        f"The input holds {len(document_ids)} separate policy documents, each starting with a line "
+        "`=== DOCUMENT <id> ===`. Assess every document on its own and return one entry per document "
+        "in `documents`, with its `document_id` and its `assessment`. For each document only the "
+        "fields listed below still need values; leave every other field null:\n"
+        f"{wanted}\n"
+    )
+
+
+def parse_batched(raw: Any, document_ids: Sequence[str]) -> Dict[str, Dict[str, Any]]:
+    """Valid assessments in a batched answer, by document id; invalid or unknown entries are skipped."""
+    if isinstance(raw, dict) and "documents" not in raw and isinstance(raw.get("content"), dict):
+        raw = raw["content"]
+    items = raw.get("documents") if isinstance(raw, dict) else None
+    answers: Dict[str, Dict[str, Any]] = {}
+    for item in items if isinstance(items, list) else []:
+        try:
+            entry = DocumentAssessment.model_validate(item)
+        except ValidationError:
+            continue
+        if entry.document_id in document_ids and entry.document_id not in answers:
+            answers[entry.document_id] = entry.assessment.model_dump(mode="json")
+    return answers
+
+
+class ExtractionBatcher:
+    """Coalesces concurrent extractions into multi-document LLM requests."""
+
+    def __init__(
+        self,
+        token_budget: int,
+        max_documents: int = DEFAULT_MAX_DOCUMENTS,
+        max_wait: float = DEFAULT_MAX_WAIT,
+    ):
+        if token_budget < 1:
+            raise ValueError("token_budget must be at least 1")
+        if max_documents < 1:
+            raise ValueError("max_documents must be at least 1")
+        self.token_budget = token_budget
+        self.max_documents = max_documents
+        self.max_wait = max_wait
+        self.stats = BatchStats()
+        self._pending: List[_Job] = []
+        self._tokens = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def extract(
+        self,
+        text: str,
+        fields: Optional[Sequence[str]],
+        key: str,
+        cache: Optional[ExtractionCache],
+        single: Callable[[], Awaitable[Dict[str, Any]]],
+    ) -> Dict[str, Any]:
+        """Extract ``text`` in the next request with room for it.
+
+        ``key`` is its extraction-cache key and ``single`` the
+        single-document extraction used when batching doesn't work out.
+        """
+        loop = asyncio.get_running_loop()
+        job = _Job(text, fields, key, count_tokens(text), cache, single, loop.create_future())
+        if self._pending and self._tokens + job.tokens > self.token_budget:
+            self._flush()
+        self._pending.append(job)
+        self._tokens += job.tokens
+        if self._tokens >= self.token_budget or len(self._pending) >= self.max_documents:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await job.future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        jobs, self._pending, self._tokens = self._pending, [], 0
+        if not jobs:
+            return
+        task = asyncio.ensure_future(self._dispatch(jobs))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _dispatch(self, jobs: List[_Job]) -> None:
+        if len(jobs) == 1:
+            self.stats.singles += 1
+            await self._single(jobs[0])
+            return
+        document_ids = [f"D{n}" for n in range(1, len(jobs) + 1)]
+        self.stats.requests += 1
+        self.stats.documents += len(jobs)
+        with tracing.span("llm.batch", documents=len(jobs), tokens_in=sum(job.tokens for job in jobs)) as current:
+            try:
+                answers = await self._request(document_ids, jobs)
+            except Exception as e:
+                self.stats.failed_requests += 1
+                current.set(error=type(e).__name__)
+                answers = {}
+            current.set(answered=len(answers))
+        retry = []
+        for document_id, job in zip(document_ids, jobs):
+            answer = answers.get(document_id)
+            if answer is None:
+                retry.append(job)
+                continue
+            if job.cache is not None:
+                job.cache.put(job.key, answer)
+            if not job.future.done():
+                job.future.set_result(answer)
+        self.stats.fallbacks += len(retry)
+        await asyncio.gather(*(self._single(job) for job in retry))
+
+    async def _request(self, document_ids: List[str], jobs: List[_Job]) -> Dict[str, Dict[str, Any]]:
+        engine = get_default_engine()
+        source = batch_source(document_ids, [job.text for job in jobs])
+        prompt = batch_prompt(document_ids, [job.fields for job in jobs])
+        async with engine.lease(prompt, source, schema=BatchedAssessments) as graph:
+            extraction = await get_controller(LLM_HOST).call(
+                lambda: graph.run(prompt, source),
+                classify_error=classify_llm_error,
+            )
+        tracing.add("tokens", extraction.tokens)
+        return parse_batched(extraction.raw, document_ids)
+
+    async def _single(self, job: _Job) -> None:
+        try:
+            result = await job.single()
+        except Exception as e:
+            if not job.future.done():
+                job.future.set_exception(e)
+            return
+        if not job.future.done():
+            job.future.set_result(result)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "token_budget": self.token_budget,
+            "requests": self.stats.requests,
+            "documents": self.stats.documents,
+            "singles": self.stats.singles,
+            "fallbacks": self.stats.fallbacks,
+            "failed_requests": self.stats.failed_requests,
+        }
+
+
+_default_batcher: Optional[ExtractionBatcher] = (
+    ExtractionBatcher(LLM_BATCH_TOKENS) if LLM_BATCH_TOKENS > 0 else None
+)
+
+
+def configure_batching(token_budget: int) -> Optional[ExtractionBatcher]:
+    """Batch extractions up to ``token_budget`` document tokens per request; 0 turns batching off."""
+    global _default_batcher
+    _default_batcher = ExtractionBatcher(token_budget) if token_budget > 0 else None
+    return _default_batcher
+
+
+def get_default_batcher() -> Optional[ExtractionBatcher]:
+    return _default_batcher
@@ -0,0 +1,145 @@
+from __future__ import annotations
+import hashlib
+import json
+import re
+import sqlite3
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from settings import CACHE_DIR, LLM_CACHE_MAX_BYTES
+from .output_class import PlanningQuantitativeAssessment
+
+
+DEFAULT_CACHE_PATH = CACHE_DIR / "llm_extractions.sqlite"
+DEFAULT_MAX_BYTES = LLM_CACHE_MAX_BYTES
+
+_WS = re.compile(r"\s+")
+_TAG_GAP = re.compile(r">\s+<")
+
+# Any change to the output model changes this digest, which retires every
+# entry extracted against the old schema without a manual cache clear.
+SCHEMA_VERSION = hashlib.sha256(
+    json.dumps(PlanningQuantitativeAssessment.model_json_schema(), sort_keys=True).encode("utf-8")
+).hexdigest()[:16]
+
+
+def normalize_html(html: str) -> str:
+    """Collapse whitespace so cosmetic re-indentation doesn't defeat the cache."""
+    return _WS.sub(" ", _TAG_GAP.sub("><", html)).strip()
+
+
+def extraction_key(html: str, prompt: str, model: str, schema_version: str = SCHEMA_VERSION) -> str:
+    """Content address for one extraction: normalized HTML + prompt + schema + model."""
+    digest = hashlib.sha256()
+    for part in (normalize_html(html), prompt, schema_version, model):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class ExtractionCache:
+    """SQLite-backed, size-bounded store of LLM extraction results.
+
+    Entries are evicted least-recently-used first once the stored payloads
+    exceed ``max_bytes``.
+    """
+
+    def __init__(self, path: Path = DEFAULT_CACHE_PATH, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.stats = CacheStats()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS extractions ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " created REAL NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS extractions_last_used ON extractions(last_used)")
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        row = self._conn.execute("SELECT value FROM extractions WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.stats.misses += 1
+            return None
+        self.stats.hits += 1
+        self._conn.execute("UPDATE extractions SET last_used = ? WHERE key = ?", (time.time(), key))
+        self._conn.commit()
+        return json.loads(row[0])
+
+    def put(self, key: str, value: Dict[str, Any]) -> None:
+        payload = json.dumps(value, default=str)
+        now = time.time()
+        self._conn.execute(
+            "INSERT OR REPLACE INTO extractions (key, value, size, created, last_used) VALUES (?, ?, ?, ?, ?)",
+            (key, payload, len(payload), now, now),
+        )
+        self._evict()
+        self._conn.commit()
+
+    def _evict(self) -> None:
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM extractions").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._conn.execute("SELECT key, size FROM extractions ORDER BY last_used ASC")
+        doomed = []
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            doomed.append((key,))
+            total -= size
+        self._conn.executemany("DELETE FROM extractions WHERE key = ?", doomed)
+        self.stats.evictions += len(doomed)
+
+    def clear(self) -> int:
+        """Drop every cached extraction and return how many were removed."""
+        removed = self._conn.execute("DELETE FROM extractions").rowcount
+        self._conn.commit()
+        self._conn.execute("VACUUM")
+        return removed
+
+    def summary(self) -> Dict[str, Any]:
+        entries, size = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM extractions"
+        ).fetchone()
+        return {
+            "entries": entries,
+            "bytes": size,
+            "hits": self.stats.hits,
+            "misses": self.stats.misses,
+            "evictions": self.stats.evictions,
+            "hit_rate": round(self.stats.hit_rate, 3),
+        }
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+_default_cache: Optional[ExtractionCache] = None
+
+
+def get_default_cache() -> ExtractionCache:
+    """Process-wide cache used by ``scrape_zone_data`` unless told otherwise."""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ExtractionCache()
+    return _default_cache
@@ -0,0 +1,231 @@
+from __future__ import annotations
+import asyncio
+import inspect
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, List, NamedTuple, Optional, Tuple, Type
+
+from pydantic import BaseModel
+from scrapegraphai.graphs import SmartScraperGraph
+
+from settings import LLM_CONCURRENCY
+from .graph_config import GRAPH_CONFIG
+from .output_class import PlanningQuantitativeAssessment
+
+
+class Extraction(NamedTuple):
+    raw: Any
+    tokens: int
+    execution_info: List[Dict[str, Any]]
+
+
+@dataclass
+class EngineStats:
+    calls: int = 0
+    graphs_built: int = 0
+    graphs_replaced: int = 0      # idle graphs dropped to build one for another schema
+    waits: int = 0                # calls that queued for a free graph
+    wait_seconds: float = 0.0
+    in_flight: int = 0            # graphs currently running an extraction
+    peak_in_flight: int = 0
+
+
+def _total_tokens(execution_info: List[Dict[str, Any]]) -> int:
+    """Tokens the graph reported for the whole run (its "TOTAL RESULT" row)."""
+    for row in execution_info:
+        if row.get("node_name") == "TOTAL RESULT":
+            return int(row.get("total_tokens") or 0)
+    return 0
+
+
+class GraphLease:
+    """A pooled graph held by one caller, from ``ExtractionEngine.lease``.
+
+    ``run`` starts the extraction itself, so a caller can put only that
+    under a timeout and retry it on the same graph without queueing again.
+    """
+
+    def __init__(self, engine: ExtractionEngine, graph: SmartScraperGraph, schema: Type[BaseModel],
+                 loop: asyncio.AbstractEventLoop):
+        self._engine = engine
+        self._graph = graph
+        self._schema = schema
+        self._loop = loop
+        self._work: Optional[Future] = None
+
+    async def run(self, prompt: str, html: str) -> Extraction:
+        graph = self._graph
+        if inspect.iscoroutinefunction(graph.run):
+            graph.prompt = prompt
+            graph.source = html
+            raw = await graph.run()
+            info = graph.get_execution_info() or []
+            return Extraction(raw, _total_tokens(info), info)
+        if self._work is not None and not self._work.done():
+            raise RuntimeError("the graph is still running an earlier extraction")
+        self._work = self._engine._submit(graph, prompt, html)
+        return await asyncio.wrap_future(self._work)
+
+    async def release(self) -> None:
+        work, self._work = self._work, None
+        if work is not None and not work.done():
+            # A timed-out or cancelled caller stops waiting, but the thread
+            # keeps using the graph; it only goes back to the pool when done.
+            work.add_done_callback(
+                lambda _: self._engine._release_from_thread(self._graph, self._schema, self._loop))
+        else:
+            await self._engine._release(self._graph, self._schema)
+
+
+class ExtractionEngine:
+    """Runs extractions on a fixed pool of reusable ``SmartScraperGraph`` instances.
+
+    Building a graph creates its LLM client, so graphs are built once (up to
+    ``size`` of them) and then re-pointed at each call's prompt and HTML.
+    ``size`` is also the concurrency limit: a call waits for a free graph,
+    which is the backpressure that keeps a batch from queueing unbounded
+    work. A graph's output schema is fixed when it is built, so idle graphs
+    are pooled per schema; a call for another schema replaces an idle graph
+    rather than waiting when the pool is full. Graphs with an async ``run``
+    are awaited on the event loop; otherwise they run on the engine's own
+    ``size``-thread executor rather than the loop's default pool, which is
+    shared with everything else. A graph is only released once its thread is
+    done, so holding a graph also means a free executor thread.
+    """
+
+    def __init__(
+        self,
+        size: int = LLM_CONCURRENCY,
+        config: Optional[Dict[str, Any]] = None,
+        schema: Type[BaseModel] = PlanningQuantitativeAssessment,
+    ):
+        if size < 1:
+            raise ValueError("size must be at least 1")
+        self.size = size
+        self.config = config if config is not None else GRAPH_CONFIG
+        self.schema = schema
+        self.stats = EngineStats()
+        self._idle: Dict[Type[BaseModel], List[SmartScraperGraph]] = {}
+        self._built = 0
+        self._available: Optional[asyncio.Condition] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def _build(self, prompt: str, html: str, schema: Type[BaseModel]) -> SmartScraperGraph:
+        graph = SmartScraperGraph(prompt=prompt, source=html, config=self.config, schema=schema)
+        self.stats.graphs_built += 1
+        return graph
+
+    def _take(self, schema: Type[BaseModel]) -> Tuple[bool, Optional[SmartScraperGraph]]:
+        """``(got a slot, idle graph to reuse)``; call with the condition held."""
+        idle = self._idle.get(schema)
+        if idle:
+            return True, idle.pop()
+        if self._built < self.size:
+            self._built += 1
+            return True, None
+        spare = next((graphs for graphs in self._idle.values() if graphs), None)
+        if spare:
+            spare.pop()  # its slot is reused for a graph of this schema
+            self.stats.graphs_replaced += 1
+            return True, None
+        return False, None
+
+    async def _acquire(self, prompt: str, html: str, schema: Type[BaseModel]) -> SmartScraperGraph:
+        if self._available is None:
+            self._available = asyncio.Condition()
+        async with self._available:
+            ready, graph = self._take(schema)
+            if not ready:
+                self.stats.waits += 1
+                started = time.monotonic()
+                while not ready:
+                    await self._available.wait()
+                    ready, graph = self._take(schema)
+                self.stats.wait_seconds += time.monotonic() - started
+        if graph is None:
+            try:
+                graph = self._build(prompt, html, schema)
+            except BaseException:
+                await self._release(None, schema)
+                raise
+        self.stats.in_flight += 1
+        self.stats.peak_in_flight = max(self.stats.peak_in_flight, self.stats.in_flight)
+        return graph
+
+    async def _release(self, graph: Optional[SmartScraperGraph], schema: Type[BaseModel]) -> None:
+        async with self._available:
+            if graph is None:
+                self._built -= 1
+            else:
+                self.stats.in_flight -= 1
+                self._idle.setdefault(schema, []).append(graph)
+            self._available.notify()
+
+    def _release_from_thread(self, graph: SmartScraperGraph, schema: Type[BaseModel],
+                             loop: asyncio.AbstractEventLoop) -> None:
+        if not loop.is_closed():
+            asyncio.run_coroutine_threadsafe(self._release(graph, schema), loop)
+
+    @staticmethod
+    def _run(graph: SmartScraperGraph, prompt: str, html: str) -> Extraction:
+        graph.prompt = prompt
+        graph.source = html
+        raw = graph.run()
+        info = graph.get_execution_info() or []
+        return Extraction(raw, _total_tokens(info), info)
+
+    def _submit(self, graph: SmartScraperGraph, prompt: str, html: str) -> Future:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.size, thread_name_prefix="llm-extract")
+        return self._executor.submit(self._run, graph, prompt, html)
+
+    @asynccontextmanager
+    async def lease(self, prompt: str, html: str,
+                    schema: Optional[Type[BaseModel]] = None) -> AsyncIterator[GraphLease]:
+        """Hold a graph for ``schema``, waiting for one if all ``size`` are busy.
+
+        Time limits belong around ``GraphLease.run``, not around this wait:
+        a call queued behind a busy pool hasn't started.
+        """
+        schema = schema or self.schema
+        self.stats.calls += 1
+        graph = await self._acquire(prompt, html, schema)
+        held = GraphLease(self, graph, schema, asyncio.get_running_loop())
+        try:
+            yield held
+        finally:
+            await held.release()
+
+    async def extract(self, html: str, prompt: str, schema: Optional[Type[BaseModel]] = None) -> Extraction:
+        """Run one extraction, waiting for a free graph if all ``size`` are busy.
+
+        ``schema`` overrides the engine's output schema for this call.
+        """
+        async with self.lease(prompt, html, schema) as graph:
+            return await graph.run(prompt, html)
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+_default_engine: Optional[ExtractionEngine] = None
+
+
+def configure_engine(size: int) -> ExtractionEngine:
+    """Replace the process-wide engine with one of ``size`` graphs."""
+    global _default_engine
+    if _default_engine is not None:
+        _default_engine.close()
+    _default_engine = ExtractionEngine(size)
+    return _default_engine
+
+
+def get_default_engine() -> ExtractionEngine:
+    global _default_engine
+    if _default_engine is None:
+        _default_engine = ExtractionEngine()
+    return _default_engine
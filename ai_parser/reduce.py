@@ -0,0 +1,117 @@
+"""Shrink a zone policy document to what the LLM needs before it is tokenized.
+
+The LLM only needs the Quantitative Assessment criteria, but the policy
+``Content`` HTML also carries scripts, styling, class attributes and layout
+tables. ``reduce_policy_html`` keeps just the criterion rows, as compact
+markdown: a ``## heading`` per criterion and one ``- PO/DTS: text`` line
+per cell. Given the fields the LLM is being asked for, it also drops the
+criteria that only feed fields the rule-based extractor has already
+filled. A document whose criteria table can't be found is reduced to its
+plain text instead.
+"""
+from __future__ import annotations
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Iterable, List, Optional, Tuple
+
+from html_backends import HtmlBackend, get_backend
+from parsers import FIELD_RULES, PolicyTableIndex, normalize_heading
+
+
+TITLE = "# Planning and Design Code – Quantitative Assessment"
+TOKENIZER = "cl100k_base"
+
+
+@lru_cache(maxsize=1)
+def _encoding() -> Optional[Any]:
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    return tiktoken.get_encoding(TOKENIZER)
+
+
+def count_tokens(text: str) -> int:
+    """Tokens in ``text`` with tiktoken when installed, else the usual ~4 characters per token."""
+    encoding = _encoding()
+    if encoding is None:
+        return (len(text) + 3) // 4
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+@dataclass
+class Reduction:
+    text: str
+    tokens_before: int
+    tokens_after: int
+    criteria: int   # criterion sections kept; 0 when the plain-text fallback was used
+
+    @property
+    def saved(self) -> float:
+        """Fraction of input tokens removed."""
+        return 1 - self.tokens_after / self.tokens_before if self.tokens_before else 0.0
+
+
+@dataclass
+class ReductionStats:
+    documents: int = 0
+    fallbacks: int = 0
+    tokens_before: int = 0
+    tokens_after: int = 0
+
+    def record(self, reduction: Reduction) -> None:
+        self.documents += 1
+        self.fallbacks += reduction.criteria == 0
+        self.tokens_before += reduction.tokens_before
+        self.tokens_after += reduction.tokens_after
+
+
+_stats = ReductionStats()
+
+
+def get_reduction_stats() -> ReductionStats:
+    return _stats
+
+
+def _headings(fields: Iterable[str]) -> Tuple[List[str], List[str]]:
+    """``(needed, settled)``: rule headings for ``fields``, and those only feeding other fields."""
+    wanted = set(fields)
+    needed = list(dict.fromkeys(normalize_heading(h) for rule in FIELD_RULES
+                                if rule.field in wanted for h in rule.headings))
+    settled = [heading for heading in dict.fromkeys(normalize_heading(h) for rule in FIELD_RULES
+                                                    if rule.field not in wanted for h in rule.headings)
+               if heading not in needed]
+    return needed, settled
+
+
+def reduce_policy_html(
+    html: str,
+    fields: Optional[Iterable[str]] = None,
+    backend: Optional[HtmlBackend] = None,
+) -> Reduction:
+    """Compact text of the criteria the LLM needs from ``html``.
+
+    ``fields`` are the schema fields still to be filled; criteria that
+    only serve other fields are left out. Without ``fields`` every
+    criterion is kept.
+    """
+    backend = backend or get_backend()
+    document = backend.parse(html)
+    needed, settled = _headings(fields) if fields is not None else ([], [])
+    sections, kept = [], []
+    for title, row in PolicyTableIndex(document, backend).criteria():
+        cells = backend.rule_cells(row)
+        if not cells:
+            continue
+        sections.append("\n".join([f"## {title}", *(f"- {name}: {text}" for name, text in cells.items())]))
+        # Headings are matched by containment, like ``PolicyTableIndex.rule_row``.
+        heading = normalize_heading(title)
+        if not any(done in heading for done in settled) or any(want in heading for want in needed):
+            kept.append(sections[-1])
+    # If every criterion is settled the fields' values aren't under a heading
+    # of their own, so the LLM gets the whole table to look through.
+    sections = kept or sections
+    text = "\n\n".join([TITLE, *sections]) if sections else backend.text(document)
+    reduction = Reduction(text, count_tokens(html), count_tokens(text), len(sections))
+    _stats.record(reduction)
+    return reduction
@@ -16,4 +16,13 @@ You are **PlanSA-Scraper-v1** – an autonomous agent that converts the *Quantit
 2 Target data structure
 -------------------------------------------------------------------------------
 The following Python classes are pre-imported; use them **verbatim**:
-"""
\ No newline at end of file
+"""
+
+
+def focused_prompt(fields, prompt: str = DEFAULT_SIMPLE_PROMPT) -> str:
+    """Narrow ``prompt`` to the schema fields that still need a value."""
+    return (
+        f"{prompt}\n"
+        "Only the following fields still need values; leave every other field null: "
+        f"{', '.join(fields)}.\n"
+    )
@@ -0,0 +1,254 @@
+from __future__ import annotations
+import asyncio
+import csv
+import json
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from rich import print
+
+from exports.writers import DEFAULT_CHUNK_ROWS, open_writer
+from pipeline import assess_zone, fetch_address, fetch_by_coordinates
+from tracing import span
+from valuation.zone_cache import get_zone_policies
+
+if TYPE_CHECKING:
+    from curl_cffi.requests import AsyncSession
+
+
+STAGES = ("resolve", "policies", "parse")
+
+# Rows resolved per bulk geocode/query round when ``bulk_resolve`` is on.
+BULK_RESOLVE_ROWS = 500
+
+
+@dataclass
+class BatchItem:
+    """One input row: either an address or a (lat, lon) pair."""
+    row: int
+    address: Optional[str] = None
+    coords: Optional[Tuple[float, float]] = None
+    error: Optional[str] = None
+    valuation_sid: Optional[Any] = None  # filled in ahead of time by bulk resolution
+    location: Optional[Tuple[float, float]] = None  # where bulk resolution geocoded ``address``
+
+    def describe(self) -> Dict[str, Any]:
+        if self.address is not None:
+            return {"address": self.address}
+        if self.coords is not None:
+            return {"lat": self.coords[0], "lon": self.coords[1]}
+        return {}
+
+
+def _item_from_mapping(row: int, data: Dict[str, Any]) -> BatchItem:
+    address = (data.get("address") or "").strip()
+    if address:
+        return BatchItem(row=row, address=address)
+
+    lat = data.get("lat", data.get("latitude"))
+    lon = data.get("lon", data.get("longitude"))
+    try:
+        return BatchItem(row=row, coords=(float(lat), float(lon)))
+    except (TypeError, ValueError):
+        return BatchItem(row=row, error="input: row has neither an address nor valid lat/lon")
+
+
+def iter_batch_file(path: Path) -> Iterator[BatchItem]:
+    """Stream batch items from a CSV or JSONL file without loading it whole.
+
+    CSV files need a header with either an ``address`` column or
+    ``lat``/``lon`` (``latitude``/``longitude``) columns; JSONL rows use the
+    same keys. Rows that can't be understood are yielded with ``error`` set
+    so one bad line doesn't abort a long run.
+    """
+    path = Path(path)
+    with path.open("r", encoding="utf-8", newline="") as f:
+        if path.suffix.lower() in (".jsonl", ".ndjson"):
+            for row, line in enumerate(f, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    data = json.loads(line)
+                except json.JSONDecodeError:
+                    yield BatchItem(row=row, error="input: invalid JSON")
+                    continue
+                yield _item_from_mapping(row, data)
+        else:
+            for row, data in enumerate(csv.DictReader(f), start=1):
+                yield _item_from_mapping(row, data)
+
+
+def _chunked(items: Iterable[BatchItem], size: int) -> Iterator[List[BatchItem]]:
+    chunk: List[BatchItem] = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+async def prefill_valuations(session: AsyncSession, items: List[BatchItem]) -> List[BatchItem]:
+    """Resolve a chunk's valuation numbers with bulk geocode/query calls.
+
+    Items the bulk calls don't resolve (or all of them, if a bulk call
+    fails) are left for ``process_item`` to resolve one at a time.
+    """
+    from search.bulk_search import resolve_addresses, resolve_points
+
+    addressed = [item for item in items if item.error is None and item.address is not None]
+    located = [item for item in items if item.error is None and item.address is None and item.coords is not None]
+    try:
+        if addressed:
+            found = await resolve_addresses(session, [item.address for item in addressed])
+            for item, address in zip(addressed, found):
+                if address is not None:
+                    item.valuation_sid = address.Valuation
+                    item.location = (address.latitude, address.longitude)
+        if located:
+            found = await resolve_points(session, [item.coords for item in located])
+            for item, parcel in zip(located, found):
+                if parcel is not None and parcel.attributes is not None:
+                    item.valuation_sid = parcel.attributes.Valuation_No
+    except Exception as e:
+        print(f"[yellow]Bulk resolve failed; resolving these rows one at a time:[/yellow] {e}")
+    return items
+
+
+@dataclass
+class BatchStats:
+    """Outcome counters for a batch run; per-stage latencies are recorded as tracing spans."""
+    started: float = field(default_factory=time.perf_counter)
+    succeeded: int = 0
+    failed: int = 0
+
+    @property
+    def completed(self) -> int:
+        return self.succeeded + self.failed
+
+    def report(self) -> None:
+        elapsed = time.perf_counter() - self.started
+        rate = self.completed / elapsed if elapsed > 0 else 0.0
+        print(
+            f"[bold]Batch finished:[/bold] {self.completed} properties "
+            f"([green]{self.succeeded} ok[/green], [red]{self.failed} failed[/red]) "
+            f"in {elapsed:.1f}s — [cyan]{rate:.2f} properties/sec[/cyan]"
+        )
+
+
+async def process_item(session: AsyncSession, item: BatchItem, stats: BatchStats, use_llm: bool = True) -> Dict[str, Any]:
+    """Run one property through resolve -> policies -> parse and build its result row.
+
+    ``lat``/``lon`` are the input point for coordinate rows and the
+    geocoded location for address rows.
+    """
+    result: Dict[str, Any] = {"row": item.row, **item.describe(), "valuation_sid": None,
+                              "assessment": None, "provenance": None, "error": item.error}
+    if item.error:
+        stats.failed += 1
+        return result
+
+    stage = STAGES[0]
+    try:
+        with span("property", row=item.row):
+            with span(stage) as current:
+                if item.valuation_sid is not None:
+                    valuation_sid = item.valuation_sid
+                    current.set(bulk=True)
+                    if item.location is not None:
+                        result["lat"], result["lon"] = item.location
+                elif item.address is not None:
+                    address = await fetch_address(session, item.address)
+                    valuation_sid = address.Valuation
+                    result["lat"], result["lon"] = address.latitude, address.longitude
+                else:
+                    valuation_sid = await fetch_by_coordinates(session, item.coords)
+            result["valuation_sid"] = valuation_sid
+
+            stage = STAGES[1]
+            with span(stage):
+                zone = await get_zone_policies(session, valuation_sid)
+
+            stage = STAGES[2]
+            with span(stage):
+                provenance: Dict[str, Any] = {}
+                result["assessment"] = await assess_zone(zone, use_llm=use_llm, provenance=provenance)
+                if result["assessment"] is not None:
+                    result["provenance"] = provenance
+        stats.succeeded += 1
+    except Exception as e:
+        result["error"] = f"{stage}: {e}"
+        stats.failed += 1
+    return result
+
+
+async def run_batch(
+    session: AsyncSession,
+    input_path: Path,
+    output_path: Path,
+    concurrency: int = 8,
+    use_llm: bool = True,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+    bulk_resolve: bool = False,
+) -> BatchStats:
+    """Process every row of ``input_path`` with at most ``concurrency`` in flight.
+
+    Rows are read lazily through a bounded queue and results are written
+    through an export writer chosen by the suffix of ``output_path``
+    (``.jsonl``, ``.csv`` or ``.parquet``) in chunks of ``chunk_rows``, so
+    memory stays flat no matter how large the input is. Output order is
+    completion order; use the ``row`` field to join back to the input.
+
+    With ``bulk_resolve``, rows are resolved ``BULK_RESOLVE_ROWS`` at a time
+    through ``geocodeAddresses``/multipoint ``query`` while the previous
+    chunk is being processed, instead of one geocode/identify per row.
+    The bulk calls are POSTs, which the HTTP cache can't answer, so an
+    offline session resolves rows one at a time from the cache instead.
+    """
+    if concurrency < 1:
+        raise ValueError("concurrency must be at least 1")
+    bulk_resolve = bulk_resolve and not getattr(session, "offline", False)
+
+    stats = BatchStats()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 2)
+
+    with open_writer(output_path, chunk_rows=chunk_rows) as out:
+
+        async def worker() -> None:
+            while True:
+                item = await queue.get()
+                try:
+                    if item is None:
+                        return
+                    result = await process_item(session, item, stats, use_llm=use_llm)
+                    out.write(result)
+                finally:
+                    queue.task_done()
+
+        async def feed(items: Iterable[BatchItem]) -> None:
+            for item in items:
+                await queue.put(item)
+
+        workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+        try:
+            if not bulk_resolve:
+                await feed(iter_batch_file(input_path))
+            else:
+                ahead: Optional[asyncio.Task] = None
+                for chunk in _chunked(iter_batch_file(input_path), BULK_RESOLVE_ROWS):
+                    resolving = asyncio.create_task(prefill_valuations(session, chunk))
+                    if ahead is not None:
+                        await feed(await ahead)
+                    ahead = resolving
+                if ahead is not None:
+                    await feed(await ahead)
+        finally:
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+
+    return stats
@@ -0,0 +1,104 @@
+"""Per-property vs bulk valuation resolution against the local mock upstream.
+
+    python -m benchmarks.bench_bulk_resolve [--properties 2000] [--concurrency 16]
+                                            [--latency 0.02] [--jitter 0.005] [--record-latency 0.0002]
+
+Resolves ``--properties`` addresses and as many points twice: once per
+property (``findAddressCandidates`` / ``identify`` at ``--concurrency``)
+and once through ``search.bulk_search`` (``geocodeAddresses`` / multipoint
+parcel ``query``). Reports wall time, requests sent and the resolution
+overhead per property, and checks both paths agree on every valuation.
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from contextlib import redirect_stdout
+from pathlib import Path
+
+
+async def _run(args: argparse.Namespace) -> None:
+    import tracing
+    from resilience import HostPolicy, ResilientSession, configure_host
+    from search.address_search import get_address
+    from search.bulk_search import geocode_addresses, query_points
+    from search.coordinate_search import get_addresses
+    from session_helpers import DEFAULT_MAX_CLIENTS, close_session, creat_session
+
+    configure_host("127.0.0.1", HostPolicy(rate=1e6, max_rate=1e6, burst=1_000_000, max_retries=0))
+    raw_session = await creat_session(max_clients=max(DEFAULT_MAX_CLIENTS, args.concurrency * 2))
+    session = ResilientSession(raw_session)
+
+    addresses = [f"{n} BULK ST PROSPECT SA 5082" for n in range(args.properties)]
+    lats = [-34.90 + (n // 100) * 1e-3 for n in range(args.properties)]
+    lons = [138.60 + (n % 100) * 1e-3 for n in range(args.properties)]
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def one_address(address: str):
+        async with semaphore:
+            return await get_address(session, address)
+
+    async def timed(label: str, request_span: str, work):
+        tracer = tracing.configure()
+        start = time.perf_counter()
+        with open(os.devnull, "w") as quiet, redirect_stdout(quiet):
+            result = await work
+        elapsed = time.perf_counter() - start
+        requests = tracer.summary().get(request_span, {}).get("count", 0)
+        print(f"  {label:<32} {elapsed:7.2f}s  {requests:>6} requests  "
+              f"{elapsed / args.properties * 1e3:8.3f} ms/property")
+        return result, elapsed
+
+    try:
+        print(f"Addresses ({args.properties}):")
+        single, single_s = await timed("findAddressCandidates x N", "geohub.find_address",
+                                       asyncio.gather(*(one_address(address) for address in addresses)))
+        bulk, bulk_s = await timed("geocodeAddresses", "geohub.geocode_addresses",
+                                   geocode_addresses(session, addresses))
+        agree = sum(a is not None and b is not None and a.Valuation == b.Valuation for a, b in zip(single, bulk))
+        print(f"  {single_s / bulk_s:.0f}x less overhead; valuations agree for {agree}/{args.properties}")
+
+        print(f"Points ({args.properties}):")
+        single, single_s = await timed("identify x N", "geohub.identify",
+                                       get_addresses(session, lats, lons, concurrency=args.concurrency))
+        bulk, bulk_s = await timed("multipoint query", "geohub.query", query_points(session, lats, lons))
+        agree = sum(a is not None and b is not None and a.attributes.Valuation_No == b.attributes.Valuation_No
+                    for a, b in zip(single, bulk))
+        print(f"  {single_s / bulk_s:.0f}x less overhead; valuations agree for {agree}/{args.properties}")
+    finally:
+        await close_session(raw_session)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--properties", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--latency", type=float, default=0.02, help="Mock seconds per response")
+    parser.add_argument("--jitter", type=float, default=0.005)
+    parser.add_argument("--record-latency", type=float, default=0.0002,
+                        help="Mock seconds per record in a bulk response")
+    args = parser.parse_args()
+
+    from benchmarks.mock_upstream import start_subprocess, upstream_settings
+
+    process, port = start_subprocess(args.latency, args.jitter, record_latency=args.record_latency)
+    try:
+        with tempfile.TemporaryDirectory() as scratch:
+            # Settings are read at import time, so this has to happen before
+            # anything from the pipeline is imported.
+            os.environ.update(upstream_settings(f"http://127.0.0.1:{port}"))
+            os.environ.update({
+                "PLANSA_CACHE_DIR": scratch,
+                "PLANSA_ADDRESS_INDEX": "off",
+                "PLANSA_PARCEL_INDEX": str(Path(scratch) / "no-parcel-index"),
+            })
+            asyncio.run(_run(args))
+    finally:
+        process.terminate()
+        process.wait()
+
+
+if __name__ == "__main__":
+    main()
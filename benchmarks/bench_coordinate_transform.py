@@ -0,0 +1,57 @@
+"""Per-point vs. vectorized WGS84 -> EPSG:3857 projection of coordinate batches.
+
+    python -m benchmarks.bench_coordinate_transform [--sizes 1000 100000 1000000]
+
+"per-point" is what ``coordinate_search.get_address`` does for each lookup
+(one ``transform(lon, lat)`` call per point); "vectorized" is
+``transform_points`` on the whole array plus the ``within_map_extent`` mask.
+"""
+from __future__ import annotations
+import argparse
+import time
+
+import numpy as np
+
+from search.coordinate_search import get_transformer, transform_points, within_map_extent
+
+# Rough Adelaide metro bounding box, so every point lands inside SA.
+LAT_RANGE = (-35.2, -34.6)
+LON_RANGE = (138.4, 138.8)
+
+
+def _points(size: int, seed: int = 0) -> tuple[np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    return rng.uniform(*LAT_RANGE, size), rng.uniform(*LON_RANGE, size)
+
+
+def _per_point(lats: np.ndarray, lons: np.ndarray) -> float:
+    transformer = get_transformer("EPSG:4326", "EPSG:3857")
+    start = time.perf_counter()
+    for lat, lon in zip(lats.tolist(), lons.tolist()):
+        transformer.transform(lon, lat)
+    return time.perf_counter() - start
+
+
+def _vectorized(lats: np.ndarray, lons: np.ndarray) -> float:
+    start = time.perf_counter()
+    x, y = transform_points(lats, lons)
+    within_map_extent(x, y)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", nargs="+", type=int, default=[1_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+
+    get_transformer("EPSG:4326", "EPSG:3857")  # keep CRS setup out of the timings
+    print(f"{'points':>10} {'per-point (s)':>14} {'vectorized (s)':>15} {'speedup':>8}")
+    for size in args.sizes:
+        lats, lons = _points(size)
+        per_point = _per_point(lats, lons)
+        vectorized = _vectorized(lats, lons)
+        print(f"{size:>10} {per_point:>14.3f} {vectorized:>15.4f} {per_point / vectorized:>7.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""End-to-end throughput, latency and memory against the local mock upstream.
+
+    python -m benchmarks.bench_end_to_end [--properties 500] [--concurrency 16] [--single 20]
+                                          [--latency 0.02] [--jitter 0.01] [--llm] [--llm-latency 0.5]
+                                          [--bulk-resolve]
+
+Starts ``benchmarks.mock_upstream`` in a subprocess, points the pipeline at
+it, and runs:
+
+* ``--single`` sequential address lookups through resolve -> policies -> parse,
+  the path ``main.py --address`` takes, reporting per-lookup percentiles;
+* a batch run over ``--properties`` addresses at ``--concurrency``,
+  reporting properties/sec, per-stage percentiles and peak RSS growth
+  (``--bulk-resolve`` resolves the batch through ``geocodeAddresses``),
+  and checking every row's building height matches its own parcel's TNV,
+  which the zone cache must not share between parcels.
+
+The local address index and parcel index are off and the HTTP cache isn't
+used, so every lookup goes to the mock. With ``--llm`` unresolved fields go
+to the mock's fake LLM (needs scrapegraphai installed); otherwise only the
+rule-based extractor runs. Host rate limits are lifted for the mock so the
+numbers reflect the pipeline, not the politeness settings.
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import importlib.util
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from pathlib import Path
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux, bytes on macOS.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _report(title: str, tracer, names) -> None:
+    summary = tracer.summary()
+    print(title)
+    for name in names:
+        stats = summary.get(name)
+        if stats and stats["count"]:
+            print(f"  {name:<20} n={stats['count']:<6} p50={stats['p50'] * 1e3:7.1f}ms "
+                  f"p95={stats['p95'] * 1e3:7.1f}ms p99={stats['p99'] * 1e3:7.1f}ms")
+
+
+def _tnv_mismatches(path: Path) -> int:
+    """Rows whose assessed building height differs from their parcel's own building height TNV."""
+    mismatches = 0
+    with path.open(encoding="utf-8") as rows:
+        for line in rows:
+            assessment = json.loads(line).get("assessment") or {}
+            levels = (assessment.get("building_height_levels") or {}).get("value")
+            tnv = (assessment.get("tnv") or {}).get("maximum_building_height_levels", {}).get("detached")
+            mismatches += tnv is not None and levels != tnv
+    return mismatches
+
+
+async def _run(args: argparse.Namespace, scratch: Path) -> None:
+    import tracing
+    from batch import STAGES, run_batch
+    from pipeline import assess_zone, fetch_by_address
+    from resilience import HostPolicy, ResilientSession, configure_host
+    from session_helpers import DEFAULT_MAX_CLIENTS, close_session, creat_session
+    from settings import ZONE_CACHE_MAX_ZONES
+    from valuation.zone_cache import configure_zone_cache, get_zone_policies
+
+    unlimited = HostPolicy(rate=1e6, max_rate=1e6, burst=1_000_000, max_retries=0)
+    configure_host("127.0.0.1", unlimited)
+    configure_host("llm", unlimited)
+
+    raw_session = await creat_session(max_clients=max(DEFAULT_MAX_CLIENTS, args.concurrency * 4))
+    session = ResilientSession(raw_session)
+    quiet = open(os.devnull, "w")
+    try:
+        tracer = tracing.configure()
+        with redirect_stdout(quiet):
+            for n in range(args.single):
+                with tracing.span("lookup"):
+                    valuation_sid = await fetch_by_address(session, f"{n} SINGLE ST PROSPECT SA 5082")
+                    await assess_zone(await get_zone_policies(session, valuation_sid), use_llm=args.llm)
+        _report(f"Single lookups ({args.single}, sequential):", tracer,
+                ["lookup", "geohub.find_address", "plansa.getzones", "plansa.getpolicies", "plansa.document",
+                 "parse.rules", "llm.extract"])
+
+        input_path = scratch / "batch.csv"
+        with input_path.open("w", encoding="utf-8") as f:
+            f.write("address\n")
+            f.writelines(f"{n} BATCH ST PROSPECT SA 5082\n" for n in range(args.properties))
+
+        configure_zone_cache(ZONE_CACHE_MAX_ZONES)  # the batch starts cold, like a fresh run
+        tracer = tracing.configure()
+        rss_before = _peak_rss_mb()
+        start = time.perf_counter()
+        with redirect_stdout(quiet):
+            stats = await run_batch(session, input_path, scratch / "batch.jsonl",
+                                    concurrency=args.concurrency, use_llm=args.llm,
+                                    bulk_resolve=args.bulk_resolve)
+        elapsed = time.perf_counter() - start
+        print(f"Batch ({args.properties} properties, concurrency {args.concurrency}): "
+              f"{stats.succeeded} ok, {stats.failed} failed in {elapsed:.2f}s — "
+              f"{args.properties / elapsed:.1f} properties/sec, "
+              f"peak RSS {_peak_rss_mb():.0f} MB (+{_peak_rss_mb() - rss_before:.1f} MB)")
+        print(f"  {_tnv_mismatches(scratch / 'batch.jsonl')} rows with another parcel's building height TNV")
+        _report("Batch stages:", tracer, ["property", *STAGES, "resolve.addresses", "plansa.getzones",
+                                         "plansa.document", "parse.rules", "llm.extract", "export.chunk"])
+    finally:
+        quiet.close()
+        await close_session(raw_session)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--properties", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--single", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.02, help="Mock GeoHub/PlanSA seconds per response")
+    parser.add_argument("--jitter", type=float, default=0.01)
+    parser.add_argument("--llm", action="store_true", help="Send unresolved fields to the mock's fake LLM")
+    parser.add_argument("--llm-latency", type=float, default=0.5)
+    parser.add_argument("--bulk-resolve", action="store_true", help="Resolve batch rows in bulk")
+    parser.add_argument("--fixtures", type=Path, help="Recorded responses for the mock to replay")
+    args = parser.parse_args()
+    if args.llm and importlib.util.find_spec("scrapegraphai") is None:
+        parser.error("--llm needs scrapegraphai installed")
+
+    from benchmarks.mock_upstream import start_subprocess, upstream_settings
+
+    process, port = start_subprocess(args.latency, args.jitter, args.llm_latency, args.fixtures)
+    try:
+        with tempfile.TemporaryDirectory() as scratch:
+
+            # Settings are read at import time, so this has to happen before
+            # anything from the pipeline is imported.
+            os.environ.update(upstream_settings(f"http://127.0.0.1:{port}"))
+            os.environ.update({
+                "PLANSA_CACHE_DIR": scratch,
+                "PLANSA_ADDRESS_INDEX": "off",
+                "PLANSA_PARCEL_INDEX": str(Path(scratch) / "no-parcel-index"),
+            })
+            if args.llm:
+                os.environ.update({"LLM_PROVIDER": "openai", "OPENAI_API_KEY": "mock"})
+            asyncio.run(_run(args, Path(scratch)))
+    finally:
+        process.terminate()
+        process.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Parse time and extracted-value equality across the installed HTML backends.
+
+    python -m benchmarks.bench_html_backends [--fixtures DIR] [--sizes 0 50 200 800] [--repeat 5]
+
+With ``--fixtures`` every ``*.html`` file in DIR (captured ``_getpolicies``
+``Content``) is measured; otherwise synthetic documents of growing size are.
+"""
+from __future__ import annotations
+import argparse
+import time
+from pathlib import Path
+from typing import Dict
+
+from benchmarks.policy_fixtures import load_fixtures, policy_html
+from html_backends import SoupBackend, available_backends, get_backend
+from parsers import extract_quantitative_assessment, parse_zone_policies
+
+
+def _best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fixtures", type=Path, help="Directory of captured policy HTML files")
+    parser.add_argument("--sizes", nargs="+", type=int, default=[0, 50, 200, 800],
+                        help="Filler criteria for synthetic documents (ignored with --fixtures)")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    documents: Dict[str, str] = (
+        load_fixtures(args.fixtures) if args.fixtures
+        else {f"synthetic-{size}": policy_html(size) for size in args.sizes}
+    )
+    if not documents:
+        raise SystemExit(f"No *.html fixtures found in {args.fixtures}")
+
+    names = available_backends()
+    baseline = SoupBackend.name
+    print(f"Backends: {', '.join(names)} (baseline: {baseline})")
+    print(f"{'document':<22} {'KiB':>7} " + " ".join(f"{name + ' ms':>15}" for name in names) + "  fastest speedup")
+
+    for label, html in documents.items():
+        expected = extract_quantitative_assessment(html, backend=get_backend(baseline))
+        timings = {}
+        for name in names:
+            backend = get_backend(name)
+            if extract_quantitative_assessment(html, backend=backend) != expected:
+                raise SystemExit(f"{name} extracted different values from {label}")
+            timings[name] = _best_of(lambda: parse_zone_policies(html, backend=backend), args.repeat)
+
+        fastest = min(timings, key=timings.get)
+        print(f"{label:<22} {len(html) / 1024:>7.1f} "
+              + " ".join(f"{timings[name] * 1000:>15.2f}" for name in names)
+              + f"  {fastest} {timings[baseline] / timings[fastest]:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
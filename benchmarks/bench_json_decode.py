@@ -0,0 +1,101 @@
+"""Decode cost of ``/_getpolicies`` payloads: repeated ``response.json()`` vs. one decode.
+
+    python -m benchmarks.bench_json_decode [--payloads DIR] [--sizes 0 200 800] [--repeat 20]
+
+"before" replays what the valuation client used to do on the success path
+(``'status' in response.json()`` followed by ``response.json()``) with the
+stdlib decoder pinned in requirements.txt; "after" is the single
+``_decode_response`` call, with the stdlib and, when installed, orjson. With ``--payloads`` every ``*.json`` file in DIR
+(recorded response bodies) is measured instead of synthetic ones.
+"""
+from __future__ import annotations
+import argparse
+import json
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict
+
+from curl_cffi.requests import Response
+
+import json_backend
+from benchmarks.policy_fixtures import policy_html
+from valuation.valuation import _decode_response
+
+
+def _policies_payload(filler: int) -> bytes:
+    document = [{
+        "DocTreeID": "1234",
+        "DocTreeText": "General Neighbourhood Zone",
+        "Title": "Zone Planning and Development Policies",
+        "Content": policy_html(filler),
+        "HasChildren": False,
+        "Children": [],
+    }]
+    return json.dumps(document).encode("utf-8")
+
+
+def _response(body: bytes) -> Response:
+    response = Response()
+    response.status_code = 200
+    response.content = body
+    return response
+
+
+def _before(body: bytes) -> object:
+    # curl_cffi's Response.json() is loads(self.content); spelled out here so
+    # the stdlib is used even if curl_cffi picked up orjson.
+    response = _response(body)
+    if response.status_code != 200:
+        raise ValueError(response.status_code)
+    if 'status' in json.loads(response.content):
+        raise ValueError(json.loads(response.content)['status'])
+    return json.loads(response.content)
+
+
+def _after(body: bytes) -> object:
+    return _decode_response(_response(body), "policy document")
+
+
+def _measure(fn: Callable[[bytes], object], body: bytes, repeat: int) -> tuple[float, int]:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(body)
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    fn(body)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--payloads", type=Path, help="Directory of recorded *.json response bodies")
+    parser.add_argument("--sizes", nargs="+", type=int, default=[0, 200, 800])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    payloads: Dict[str, bytes] = (
+        {path.name: path.read_bytes() for path in sorted(args.payloads.glob("*.json"))} if args.payloads
+        else {f"synthetic-{size}": _policies_payload(size) for size in args.sizes}
+    )
+    if not payloads:
+        raise SystemExit(f"No *.json payloads found in {args.payloads}")
+
+    backends = ["json"] + (["orjson"] if json_backend.orjson is not None else [])
+    print(f"{'payload':<18} {'KiB':>7} {'variant':<14} {'time (ms)':>10} {'peak KiB':>9}")
+    for label, body in payloads.items():
+        rows = [("before (json)", _measure(_before, body, args.repeat))]
+        saved = json_backend.orjson
+        for backend in backends:
+            json_backend.orjson = saved if backend == "orjson" else None
+            rows.append((f"after ({backend})", _measure(_after, body, args.repeat)))
+        json_backend.orjson = saved
+        for variant, (seconds, peak) in rows:
+            print(f"{label:<18} {len(body) / 1024:>7.1f} {variant:<14} {seconds * 1000:>10.2f} {peak / 1024:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
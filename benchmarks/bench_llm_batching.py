@@ -0,0 +1,87 @@
+"""One document per LLM request vs multi-document requests, against the mock LLM.
+
+    python -m benchmarks.bench_llm_batching [--documents 24] [--budgets 0 4000 16000]
+                                            [--llm-latency 0.5] [--llm-concurrency 4]
+
+Starts ``benchmarks.mock_upstream`` and extracts ``--documents`` distinct
+synthetic policy documents concurrently through ``scrape_zone_data``, once
+per ``--budgets`` entry (document tokens per request; 0 sends every
+document on its own). Reports LLM requests, the tokens the mock billed,
+wall time and whether every document got the same assessment as with
+batching off. The extraction cache is bypassed. Needs scrapegraphai.
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import importlib.util
+import os
+import tempfile
+import time
+from contextlib import redirect_stdout
+
+
+async def _run(args: argparse.Namespace) -> None:
+    import tracing
+    from ai_parser.ai_parser import scrape_zone_data
+    from ai_parser.batching import configure_batching
+    from ai_parser.engine import configure_engine
+    from ai_parser.system_prompt import focused_prompt
+    from benchmarks.policy_fixtures import policy_html
+    from parsers import extract_quantitative_assessment
+    from resilience import HostPolicy, configure_host
+
+    configure_host("llm", HostPolicy(rate=1e6, max_rate=1e6, burst=1_000_000, max_retries=0))
+    documents = []
+    for n in range(args.documents):
+        html = policy_html(n)
+        _, unresolved = extract_quantitative_assessment(html)
+        documents.append((html, unresolved))
+
+    baseline = None
+    print(f"{'budget':>8} {'requests':>9} {'tokens':>9} {'seconds':>8} {'agree':>7}")
+    for budget in args.budgets:
+        engine = configure_engine(args.llm_concurrency)
+        batcher = configure_batching(budget)
+        tracer = tracing.configure()
+        start = time.perf_counter()
+        with open(os.devnull, "w") as quiet, redirect_stdout(quiet):
+            results = await asyncio.gather(*(
+                scrape_zone_data(html, prompt=focused_prompt(unresolved), use_cache=False, fields=unresolved)
+                for html, unresolved in documents))
+        elapsed = time.perf_counter() - start
+        tokens = sum(stats.get("tokens", 0) for stats in tracer.summary().values())
+        baseline = baseline or results
+        agree = sum(all(result.get(field) == expected.get(field) for field in unresolved)
+                    for result, expected, (_, unresolved) in zip(results, baseline, documents))
+        print(f"{budget:>8} {engine.stats.calls:>9} {tokens:>9} {elapsed:>8.2f} {agree:>3}/{len(documents)}"
+              + (f"  ({batcher.stats.fallbacks} fell back)" if batcher is not None else ""))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=24)
+    parser.add_argument("--budgets", nargs="+", type=int, default=[0, 4000, 16000],
+                        help="Document tokens per request; 0 turns batching off")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="Mock seconds per LLM response")
+    parser.add_argument("--llm-concurrency", type=int, default=4)
+    args = parser.parse_args()
+    if importlib.util.find_spec("scrapegraphai") is None:
+        parser.error("needs scrapegraphai installed")
+
+    from benchmarks.mock_upstream import start_subprocess, upstream_settings
+
+    process, port = start_subprocess(0.0, 0.0, args.llm_latency)
+    try:
+        with tempfile.TemporaryDirectory() as scratch:
+            # Settings are read at import time, so this has to happen before
+            # anything from the pipeline is imported.
+            os.environ.update(upstream_settings(f"http://127.0.0.1:{port}"))
+            os.environ.update({"PLANSA_CACHE_DIR": scratch, "LLM_PROVIDER": "openai", "OPENAI_API_KEY": "mock"})
+            asyncio.run(_run(args))
+    finally:
+        process.terminate()
+        process.wait()
+
+
+if __name__ == "__main__":
+    main()
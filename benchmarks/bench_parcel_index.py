@@ -0,0 +1,73 @@
+"""Point-in-parcel lookup latency of the offline parcel index.
+
+    python -m benchmarks.bench_parcel_index [--side 300] [--parcel-size 20] [--rural 0] [--rural-size 5000]
+                                            [--points 100000] [--index DIR]
+
+Builds a synthetic ``side`` x ``side`` grid of square parcels in Adelaide,
+plus a row of ``--rural`` parcels ``--rural-size`` metres across east of it
+(or opens an existing index with ``--index``), and times the build and
+``parcel_at`` on random points over it, which is the per-point cost once
+coordinates are projected.
+"""
+from __future__ import annotations
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from search.coordinate_search import get_transformer
+from search.parcel_index import ParcelIndex
+
+ORIGIN = (138.5, -34.95)
+
+
+def _square(ax: float, ay: float, size: float) -> list:
+    return [(ax, ay), (ax + size, ay), (ax + size, ay + size), (ax, ay + size), (ax, ay)]
+
+
+def _synthetic_index(side: int, parcel_size: float, rural: int, rural_size: float, directory: Path) -> ParcelIndex:
+    x0, y0 = get_transformer("EPSG:4326", "EPSG:3857").transform(*ORIGIN)
+    parcels = []
+    for i in range(side):
+        for j in range(side):
+            ring = _square(x0 + i * parcel_size, y0 + j * parcel_size, parcel_size)
+            parcels.append(([ring], {"Valuation No": f"{i * side + j:010d}"}))
+    for k in range(rural):
+        ring = _square(x0 + side * parcel_size + k * rural_size, y0, rural_size)
+        parcels.append(([ring], {"Valuation No": f"{side * side + k:010d}"}))
+    return ParcelIndex.build(parcels, directory)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--side", type=int, default=300)
+    parser.add_argument("--parcel-size", type=float, default=20.0)
+    parser.add_argument("--rural", type=int, default=0, help="Large parcels added beside the urban grid")
+    parser.add_argument("--rural-size", type=float, default=5000.0, help="Side of each large parcel in metres")
+    parser.add_argument("--points", type=int, default=100_000)
+    parser.add_argument("--index", type=Path, help="Existing index directory to benchmark instead")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as scratch:
+        start = time.perf_counter()
+        index = (ParcelIndex(args.index) if args.index
+                 else _synthetic_index(args.side, args.parcel_size, args.rural, args.rural_size, Path(scratch)))
+        print(f"{len(index)} parcels ready in {time.perf_counter() - start:.2f}s")
+
+        xmin, ymin = index.bboxes[:, 0].min(), index.bboxes[:, 1].min()
+        xmax, ymax = index.bboxes[:, 2].max(), index.bboxes[:, 3].max()
+        rng = np.random.default_rng(0)
+        xs = rng.uniform(xmin, xmax, args.points).tolist()
+        ys = rng.uniform(ymin, ymax, args.points).tolist()
+
+        start = time.perf_counter()
+        found = sum(index.parcel_at(x, y) is not None for x, y in zip(xs, ys))
+        elapsed = time.perf_counter() - start
+        print(f"{args.points} lookups, {found} inside a parcel: "
+              f"{elapsed / args.points * 1e6:.1f} µs/lookup ({args.points / elapsed:,.0f} points/sec)")
+
+
+if __name__ == "__main__":
+    main()
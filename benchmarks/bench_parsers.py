@@ -0,0 +1,82 @@
+"""Criterion lookup cost vs. document size: per-heading soup.find scans vs. PolicyTableIndex.
+
+    python -m benchmarks.bench_parsers [--sizes 0 50 200 800] [--repeat 3]
+"""
+from __future__ import annotations
+import argparse
+import time
+from typing import Callable, Dict
+
+from bs4 import BeautifulSoup
+
+from benchmarks.policy_fixtures import CRITERIA, policy_html
+from html_backends import SoupBackend, get_backend
+from parsers import POLICY_HEADINGS, PolicyTableIndex, find_code_in_html
+
+
+def _legacy_lookup(soup: BeautifulSoup) -> Dict[str, Dict[str, str]]:
+    """The pre-index approach: one full-document lambda scan per heading."""
+    policies = {}
+    for heading in POLICY_HEADINGS:
+        needle = heading.lower()
+        heading_row = soup.find(
+            lambda tag: tag.name == "tr" and not tag.find("tr") and needle in tag.get_text(strip=True).lower()
+        )
+        next_row = heading_row.find_next("tr") if heading_row else None
+        if next_row is None:
+            continue
+        cells = find_code_in_html(next_row)
+        if cells:
+            policies[heading] = cells
+    return policies
+
+
+def _indexed_lookup(soup: BeautifulSoup) -> Dict[str, Dict[str, str]]:
+    index = PolicyTableIndex(soup, get_backend(SoupBackend.name))
+    policies = {}
+    for heading in POLICY_HEADINGS:
+        row = index.rule_row(heading)
+        if row is None:
+            continue
+        cells = find_code_in_html(row)
+        if cells:
+            policies[heading] = cells
+    return policies
+
+
+def _best_of(fn: Callable[[], object], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", nargs="+", type=int, default=[0, 50, 200, 800],
+                        help="Number of filler criteria added before the real ones")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'filler':>7} {'KiB':>8} {'rows':>6} {'scan (ms)':>10} {'index (ms)':>11} {'speedup':>8}")
+    for size in args.sizes:
+        html = policy_html(size)
+        soup = BeautifulSoup(html, "html.parser")
+        # The scan can also stop at a rule row that merely mentions a heading
+        # (e.g. "private open space" inside the Overlooking DTS), so it is
+        # only checked on the real criteria it did resolve.
+        legacy = _legacy_lookup(soup)
+        indexed = _indexed_lookup(soup)
+        if any(indexed.get(h) != cells for h, cells in legacy.items() if h in CRITERIA):
+            raise SystemExit(f"Lookup results differ at size {size}")
+
+        scan = _best_of(lambda: _legacy_lookup(soup), args.repeat)
+        index = _best_of(lambda: _indexed_lookup(soup), args.repeat)
+        print(f"{size:>7} {len(html) / 1024:>8.1f} {len(soup.find_all('tr')):>6} "
+              f"{scan * 1000:>10.1f} {index * 1000:>11.1f} {scan / index:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
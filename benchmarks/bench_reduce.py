@@ -0,0 +1,49 @@
+"""LLM input tokens before and after ``ai_parser.reduce`` vs. document size.
+
+    python -m benchmarks.bench_reduce [--sizes 0 50 200 800] [--repeat 3] [--fixtures DIR]
+
+For each synthetic policy document (or each captured ``*.html`` in
+``--fixtures``) prints the raw HTML tokens, the reduced tokens with every
+criterion kept, the reduced tokens for just the fields the rule-based
+extractor left unresolved (what the pipeline sends), and the time the
+reduction takes. Tokens come from tiktoken when it is installed, otherwise
+the ~4 characters per token estimate.
+"""
+from __future__ import annotations
+import argparse
+import time
+from pathlib import Path
+from typing import Dict
+
+from ai_parser.reduce import _encoding, reduce_policy_html
+from benchmarks.policy_fixtures import load_fixtures, policy_html
+from parsers import extract_quantitative_assessment
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", nargs="+", type=int, default=[0, 50, 200, 800],
+                        help="Number of filler criteria added before the real ones")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--fixtures", type=Path, help="Directory of captured policy HTML files")
+    args = parser.parse_args()
+
+    documents: Dict[str, str] = (load_fixtures(args.fixtures) if args.fixtures
+                                 else {f"filler={size}": policy_html(size) for size in args.sizes})
+    print(f"tokens: {'tiktoken' if _encoding() is not None else 'estimated (chars / 4)'}")
+    print(f"{'document':>14} {'KiB':>8} {'html':>8} {'table':>8} {'fields':>8} {'saved':>7} {'ms':>7}")
+    for name, html in documents.items():
+        _, unresolved = extract_quantitative_assessment(html)
+        table = reduce_policy_html(html)
+        focused = reduce_policy_html(html, unresolved)
+        best = float("inf")
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            reduce_policy_html(html, unresolved)
+            best = min(best, time.perf_counter() - start)
+        print(f"{name:>14} {len(html) / 1024:>8.1f} {focused.tokens_before:>8} {table.tokens_after:>8} "
+              f"{focused.tokens_after:>8} {focused.saved:>7.0%} {best * 1000:>7.1f}")
+
+
+if __name__ == "__main__":
+    main()
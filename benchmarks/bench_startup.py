@@ -0,0 +1,86 @@
+"""CLI startup regression check built on ``python -X importtime``.
+
+    python -m benchmarks.bench_startup [--runs 5] [--budget-ms 50]
+
+Fails (exit status 1) if importing ``main`` pulls in any heavy dependency,
+or if the median cumulative import time of ``main`` exceeds the budget.
+Also reports the median wall time of ``python main.py --help``.
+"""
+from __future__ import annotations
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+# Cumulative import time of the ``main`` module itself (interpreter start-up
+# and site-packages hooks excluded).
+STARTUP_BUDGET_MS = 50.0
+
+# Modules that must only be imported on the code paths that use them.
+LAZY_MODULES = ("curl_cffi", "rich", "pyproj", "scrapegraphai", "langchain", "bs4", "pydantic", "numpy", "pandas")
+
+
+def _importtime(module: str) -> Dict[str, Tuple[int, int]]:
+    """``{module: (self_us, cumulative_us)}`` for one fresh interpreter importing ``module``."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_ROOT, capture_output=True, text=True, check=True,
+    )
+    timings = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        timings[name] = (int(self_us), int(cumulative_us))
+    return timings
+
+
+def _help_wall_time() -> float:
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "main.py", "--help"], cwd=REPO_ROOT, capture_output=True, check=True)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=STARTUP_BUDGET_MS)
+    args = parser.parse_args()
+
+    samples: List[float] = []
+    leaked = set()
+    timings: Dict[str, Tuple[int, int]] = {}
+    for _ in range(args.runs):
+        timings = _importtime("main")
+        samples.append(timings["main"][1] / 1000)
+        leaked.update(name for name in timings if name.split(".")[0] in LAZY_MODULES)
+
+    help_ms = statistics.median(_help_wall_time() for _ in range(args.runs)) * 1000
+    import_ms = statistics.median(samples)
+
+    print(f"import main (cumulative, median of {args.runs}): {import_ms:.1f} ms  (budget {args.budget_ms:.0f} ms)")
+    print(f"python main.py --help (wall, median of {args.runs}): {help_ms:.0f} ms")
+    print("Heaviest imports in the process:")
+    heaviest = sorted(((cumulative, name) for name, (_, cumulative) in timings.items() if name != "main"),
+                      reverse=True)[:8]
+    for cumulative, name in heaviest:
+        print(f"  {cumulative / 1000:>7.1f} ms  {name}")
+
+    failures = []
+    if leaked:
+        failures.append(f"heavy modules imported eagerly: {', '.join(sorted(leaked))}")
+    if import_ms > args.budget_ms:
+        failures.append(f"import time {import_ms:.1f} ms exceeds budget {args.budget_ms:.0f} ms")
+    if failures:
+        raise SystemExit("FAIL: " + "; ".join(failures))
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""TNV decoding cost: per-item HTML parsing (the scratch parser) vs. ``valuation.tnv``.
+
+    python -m benchmarks.bench_tnv [--parcels 1000 10000 50000] [--repeat 3]
+
+Builds ``--parcels`` ``_getzones`` payloads like the mock upstream's (each
+parcel with its zone and a few TNV items, values varying by parcel) and
+decodes them three ways: the scratch approach (``html_to_text`` on every
+``Description``, string splits per ``Code``), ``decode_tnv`` per parcel,
+and one ``decode_tnv_many`` pass. Checks all three agree.
+"""
+from __future__ import annotations
+import argparse
+import time
+from typing import Any, Callable, Dict, List
+
+from benchmarks.mock_upstream import TNV_ITEMS, ZONES
+from html_backends import get_backend
+from valuation.tnv import DWELLING_TYPES, decode_tnv, decode_tnv_many
+
+
+def _payloads(parcels: int) -> List[Dict[str, Any]]:
+    payloads = []
+    for n in range(parcels):
+        code, name = ZONES[n % len(ZONES)]
+        payloads.append({"List": [
+            {"GroupType": "Zone", "Code": code, "Description": f"<p>{name}</p>"},
+            *({"GroupType": "Local Variation (TNV)", "Code": f"{variation.split('|')[0]}|_{n % 7 + 9}_8_6_18_18",
+               "Description": f"<p>{label} (detached, semi-detached, row, group, flat)</p>"}
+              for label, variation in TNV_ITEMS),
+        ]})
+    return payloads
+
+
+def _scratch_decode(zones: Dict[str, Any]) -> Dict[str, Dict[str, float]]:
+    """``scratch/test_init_parser.parse_tnv_json``'s per-item decoding."""
+    backend = get_backend()
+    decoded = {}
+    for item in zones.get("List", []):
+        if item.get("GroupType", "").lower().startswith("local variation"):
+            text = " ".join(backend.html_to_text(item.get("Description") or "").split())
+            label = text.split("(")[0].strip()
+            raw_code = item.get("Code") or ""
+            after = raw_code.split("|", 1)[1] if "|" in raw_code else ""
+            bits = [b for b in after.split("_") if b != ""]
+            decoded[label.lower()] = {dwelling: float(bit) for dwelling, bit in zip(DWELLING_TYPES, bits)}
+    return decoded
+
+
+def _values(decoded: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [{dwelling: entry[dwelling] for dwelling in DWELLING_TYPES} for entry in decoded.values()]
+
+
+def _best(func: Callable[[], Any], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--parcels", nargs="+", type=int, default=[1000, 10000, 50000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'parcels':>8} {'scratch s':>10} {'per-parcel s':>13} {'bulk s':>8} {'speedup':>8} {'agree':>6}")
+    for parcels in args.parcels:
+        payloads = _payloads(parcels)
+        scratch = _best(lambda: [_scratch_decode(zones) for zones in payloads], args.repeat)
+        single = _best(lambda: [decode_tnv(zones) for zones in payloads], args.repeat)
+        bulk = _best(lambda: decode_tnv_many(payloads), args.repeat)
+        table = decode_tnv_many(payloads)
+        agree = all(_values(table.for_parcel(n)) == _values(decode_tnv(zones)) == _values(_scratch_decode(zones))
+                    for n, zones in enumerate(payloads[:500]))
+        print(f"{parcels:>8} {scratch:>10.3f} {single:>13.3f} {bulk:>8.3f} {scratch / bulk:>7.0f}x {str(agree):>6}")
+
+
+if __name__ == "__main__":
+    main()
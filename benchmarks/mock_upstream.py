@@ -0,0 +1,387 @@
+"""Local stand-in for GeoHub, PlanSA and an OpenAI-compatible LLM.
+
+    python -m benchmarks.mock_upstream [--port 8900] [--latency 0.05] [--jitter 0.02]
+                                       [--record-latency 0.0002] [--llm-latency 1.0] [--fixtures DIR]
+
+Serves the endpoints the pipeline calls, each after ``latency`` ± ``jitter``
+seconds (plus ``record_latency`` per record for the batch operations):
+
+* ``.../GeocodeServer/findAddressCandidates`` (JSONP, like GeoHub)
+* ``.../GeocodeServer/geocodeAddresses`` and ``.../MapServer/43/query``
+  (multipoint or ``VALUATION_NO IN (...)``), plus their ``?f=json`` info
+  pages advertising ``MaxBatchSize``/``maxRecordCount``
+* ``.../MapServer/identify``
+* ``/int/_getzones`` and ``/int/_getpolicies`` (doc ID list, or one document with ``docId``);
+  parcels are spread over a handful of ``ZONES`` and ``TNV_LEVELS``, and a
+  document carries its parcel's building height TNV, as PlanSA's do
+* ``POST /v1/chat/completions``, a fake LLM that answers with a fixed assessment
+  (one per ``=== DOCUMENT <id> ===`` header when several documents are packed)
+
+Responses are synthetic by default (valuation numbers are derived from the
+address or point, so distinct inputs fetch distinct policies). To replay
+recorded responses instead, put them in ``--fixtures`` as
+``findAddressCandidates.json``, ``identify.json``, ``_getzones.json``,
+``_getpolicies.json``, ``_getpolicies_doc.json`` or ``chat.json``;
+``identify`` defaults to ``exports/identify_response.json``. Point the
+pipeline at the server with the ``PLANSA_*_URL`` and ``OPENAI_BASE_URL``
+settings it prints on start-up.
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import random
+import re
+import socket
+import subprocess
+import sys
+import time
+import zlib
+from dataclasses import dataclass, field
+from http import HTTPStatus
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from benchmarks.policy_fixtures import policy_html
+
+DEFAULT_PORT = 8900
+IDENTIFY_FIXTURE = Path(__file__).resolve().parent.parent / "exports" / "identify_response.json"
+DOCS_PER_ZONE = 2
+MAX_BATCH_SIZE = 1000
+MAX_RECORD_COUNT = 1000
+PARCEL_HALF_WIDTH = 5.0  # metres; each synthetic parcel is a square around the queried point
+
+# What the fake LLM "extracts" when no chat.json fixture is given.
+LLM_ANSWER: Dict[str, Any] = {
+    "site_coverage": {"type": "max", "value": 60, "unit": "%"},
+    "building_height_levels": {"type": "max", "value": 2, "unit": "levels"},
+    "overlooking": "Upper level windows have sill heights of at least 1.5m",
+}
+
+# Starts each document of a multi-document extraction (ai_parser.batching).
+DOCUMENT_HEADER = re.compile(r"^=== DOCUMENT (\S+) ===$", re.MULTILINE)
+
+# (code, name) of the zones parcels are spread across, by valuation number.
+ZONES = (
+    ("Z0204", "General Neighbourhood"),
+    ("Z0205", "Suburban Neighbourhood"),
+    ("Z0102", "Established Neighbourhood"),
+    ("Z0301", "Housing Diversity Neighbourhood"),
+    ("Z0910", "Suburban Activity Centre"),
+)
+
+TNV_ITEMS = (
+    ("Minimum Frontage", "V0004|_9_8_6_18_18"),
+    ("Minimum Site Area", "V0005|_300_250_200_300_300"),
+    ("Maximum Building Height (Levels)", "V0006|_{levels}_{levels}_{levels}_{levels}_{levels}"),
+)
+# Building height TNV values parcels within a zone are spread across.
+TNV_LEVELS = (2, 3)
+
+
+def valuation_for(text: str) -> str:
+    """A stable 10-digit valuation number for an address or point."""
+    return f"{zlib.crc32(text.encode('utf-8')) % 10_000_000_000:010d}"
+
+
+def zone_for(valuation: str) -> Tuple[str, str]:
+    digits = "".join(ch for ch in valuation if ch.isdigit())
+    return ZONES[int(digits or 0) % len(ZONES)]
+
+
+def levels_for(valuation: str) -> int:
+    """The parcel's building height TNV, varying independently of its zone."""
+    digits = "".join(ch for ch in valuation if ch.isdigit())
+    return TNV_LEVELS[int(digits or 0) // len(ZONES) % len(TNV_LEVELS)]
+
+
+def point_valuation(x: float, y: float) -> str:
+    """The valuation number ``identify`` and ``query`` both give the parcel at an EPSG:3857 point."""
+    return valuation_for(f"{x:.1f},{y:.1f}")
+
+
+def _parcel(x: float, y: float, valuation: str, geometry: bool = True) -> Dict[str, Any]:
+    feature: Dict[str, Any] = {"attributes": {
+        "OBJECTID": int(valuation) % 1_000_000,
+        "LOCATION": f"{int(valuation) % 200} MOCK ST PROSPECT",
+        "VALUATION_NO": valuation,
+        "TITLE_PREFIX": "CT",
+        "TITLE_VOLUME": valuation[:4],
+        "TITLE_FOLIO": valuation[4:7],
+    }}
+    if geometry:
+        w = PARCEL_HALF_WIDTH
+        feature["geometry"] = {"rings": [[[x - w, y - w], [x - w, y + w], [x + w, y + w], [x + w, y - w],
+                                          [x - w, y - w]]]}
+    return feature
+
+
+@dataclass
+class MockStats:
+    requests: int = 0
+    by_route: Dict[str, int] = field(default_factory=dict)
+
+
+class MockUpstream:
+    """Routes requests to synthetic or recorded responses with simulated latency."""
+
+    def __init__(
+        self,
+        latency: float = 0.05,
+        jitter: float = 0.02,
+        llm_latency: float = 1.0,
+        fixtures: Optional[Path] = None,
+        seed: int = 0,
+        record_latency: float = 0.0002,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.record_latency = record_latency
+        self.llm_latency = llm_latency
+        self.stats = MockStats()
+        self._random = random.Random(seed)
+        self._policy_html = {levels: policy_html(max_levels=levels) for levels in TNV_LEVELS}
+        self._fixtures: Dict[str, str] = {}
+        if IDENTIFY_FIXTURE.exists():
+            self._fixtures["identify.json"] = IDENTIFY_FIXTURE.read_text(encoding="utf-8")
+        if fixtures is not None:
+            for path in Path(fixtures).glob("*.json"):
+                self._fixtures[path.name] = path.read_text(encoding="utf-8")
+
+    def _fixture(self, name: str) -> Optional[Any]:
+        text = self._fixtures.get(name)
+        return None if text is None else json.loads(text)
+
+    async def _delay(self, latency: float) -> None:
+        await asyncio.sleep(max(0.0, latency + self._random.uniform(-self.jitter, self.jitter)))
+
+    async def respond(self, method: str, target: str, body: bytes) -> Tuple[HTTPStatus, str, str]:
+        """``(status, content type, body)`` for one request."""
+        url = urlsplit(target)
+        query = {name: values[0] for name, values in parse_qs(url.query).items()}
+        path = url.path
+        if method == "POST" and not path.endswith("/chat/completions"):
+            query.update({name: values[0] for name, values in parse_qs(body.decode("utf-8")).items()})
+        route = path.rsplit("/", 1)[-1]
+        self.stats.requests += 1
+        self.stats.by_route[route] = self.stats.by_route.get(route, 0) + 1
+
+        if method == "POST" and path.endswith("/chat/completions"):
+            await self._delay(self.llm_latency)
+            return HTTPStatus.OK, "application/json", json.dumps(self.chat_completion(json.loads(body or b"{}")))
+
+        if path.endswith("/geocodeAddresses"):
+            records = json.loads(query.get("addresses") or "{}").get("records", [])
+            await self._delay(self.latency + self.record_latency * len(records))
+            return HTTPStatus.OK, "application/json", json.dumps(self.geocode_addresses(records))
+        if path.endswith("/43/query"):
+            features = self.query_parcels(query)
+            await self._delay(self.latency + self.record_latency * len(features))
+            return HTTPStatus.OK, "application/json", json.dumps({"features": features})
+
+        await self._delay(self.latency)
+        if path.endswith("/GeocodeServer"):
+            return HTTPStatus.OK, "application/json", json.dumps(
+                {"locatorProperties": {"MaxBatchSize": MAX_BATCH_SIZE, "SuggestedBatchSize": MAX_BATCH_SIZE}})
+        if path.endswith("/MapServer/43"):
+            return HTTPStatus.OK, "application/json", json.dumps({"id": 43, "maxRecordCount": MAX_RECORD_COUNT})
+        if path.endswith("/findAddressCandidates"):
+            payload = self._fixture("findAddressCandidates.json") or self.address_candidates(
+                query.get("Single Line Input", ""))
+            return HTTPStatus.OK, "text/javascript", f"{query.get('callback', 'callback')}({json.dumps(payload)});"
+        if path.endswith("/identify"):
+            payload = self._fixture("identify.json") or {"results": []}
+            point = json.loads(query.get("geometry") or '{"x": 0, "y": 0}')
+            for result in payload.get("results", []):
+                result.setdefault("attributes", {})["Valuation No"] = point_valuation(point["x"], point["y"])
+            return HTTPStatus.OK, "application/json", json.dumps(payload)
+        if path.endswith("/_getzones"):
+            payload = self._fixture("_getzones.json") or self.zones(query.get("term", ""))
+            return HTTPStatus.OK, "application/json", json.dumps(payload)
+        if path.endswith("/_getpolicies"):
+            if "docId" in query:
+                # Tagged per document so the LLM cache doesn't hide the LLM's cost.
+                payload = self._fixture("_getpolicies_doc.json") or [
+                    {"Content": f"{self._policy_html[levels_for(query.get('term', ''))]}<!-- {query['docId']} -->"}]
+            else:
+                payload = self._fixture("_getpolicies.json") or self.policies(query.get("term", ""))
+            return HTTPStatus.OK, "application/json", json.dumps(payload)
+        return HTTPStatus.NOT_FOUND, "application/json", json.dumps({"error": f"No mock for {path}"})
+
+    def address_candidates(self, address: str) -> Dict[str, Any]:
+        return {"candidates": [{
+            "address": address.upper(),
+            "score": 100,
+            "location": {"x": 138.5871, "y": -34.8899},
+            "attributes": {"Valuation": valuation_for(address.upper())},
+        }]}
+
+    def geocode_addresses(self, records: List[Dict[str, Any]]) -> Dict[str, Any]:
+        locations = []
+        for record in records:
+            attributes = record.get("attributes", {})
+            address = str(attributes.get("SingleLine", "")).upper()
+            locations.append({
+                "address": address,
+                "score": 100,
+                "location": {"x": 138.5871, "y": -34.8899},
+                "attributes": {"ResultID": attributes.get("OBJECTID"), "Status": "M",
+                               "Valuation": valuation_for(address)},
+            })
+        return {"spatialReference": {"wkid": 4326}, "locations": locations}
+
+    def query_parcels(self, query: Dict[str, str]) -> List[Dict[str, Any]]:
+        if query.get("geometryType") == "esriGeometryMultipoint":
+            points = json.loads(query.get("geometry") or "{}").get("points", [])
+            return [_parcel(x, y, point_valuation(x, y)) for x, y in dict.fromkeys(map(tuple, points))]
+        valuations = re.findall(r"'([^']*)'", query.get("where", ""))
+        return [_parcel(0.0, 0.0, valuation, geometry=False) for valuation in valuations]
+
+    def zones(self, valuation: str) -> Dict[str, Any]:
+        code, name = zone_for(valuation)
+        return {"List": [
+            {"GroupType": "Zone", "Code": code, "Description": f"<p>{name}</p>"},
+            *({"GroupType": "Local Variation (TNV)", "Code": tnv.format(levels=levels_for(valuation)),
+               "Description": f"<p>{label} (detached, semi-detached, row, group, flat)</p>"}
+              for label, tnv in TNV_ITEMS),
+        ]}
+
+    def policies(self, valuation: str) -> list:
+        code, name = zone_for(valuation)
+        return [{
+            "DocTreeText": f"{name} Zone",
+            "HasChildren": True,
+            "Children": [{"DocTreeID": f"{code}-{n}"} for n in range(DOCS_PER_ZONE)],
+        }]
+
+    def chat_completion(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        assessment = self._fixture("chat.json") or LLM_ANSWER
+        text = "\n".join(str(message.get("content", "")) for message in request.get("messages", []))
+        document_ids = list(dict.fromkeys(DOCUMENT_HEADER.findall(text)))
+        answer = json.dumps({"documents": [{"document_id": document_id, "assessment": assessment}
+                                           for document_id in document_ids]} if document_ids else assessment)
+        prompt_tokens = len(text) // 4
+        message: Dict[str, Any] = {"role": "assistant", "content": answer}
+        tools = request.get("tools") or []
+        if tools:  # structured output through function calling
+            name = tools[0].get("function", {}).get("name", "extract")
+            message = {"role": "assistant", "content": None, "tool_calls": [
+                {"id": "call_0", "type": "function", "function": {"name": name, "arguments": answer}}]}
+        return {
+            "id": "chatcmpl-mock",
+            "object": "chat.completion",
+            "created": 0,
+            "model": request.get("model", "mock"),
+            "choices": [{"index": 0, "message": message, "finish_reason": "tool_calls" if tools else "stop"}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": len(answer) // 4,
+                      "total_tokens": prompt_tokens + len(answer) // 4},
+        }
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, target, _ = request_line.decode("latin-1").split()
+                headers: Dict[str, str] = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length") or 0))
+
+                status, content_type, text = await self.respond(method, target, body)
+                payload = text.encode("utf-8")
+                writer.write(
+                    f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                    f"Content-Type: {content_type}\r\n"
+                    f"Content-Length: {len(payload)}\r\n\r\n".encode("ascii") + payload
+                )
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+
+def upstream_settings(base_url: str) -> Dict[str, str]:
+    """Environment that points the pipeline (and an OpenAI-compatible LLM client) at ``base_url``."""
+    return {
+        "PLANSA_GEOHUB_LOCATOR_URL": base_url,
+        "PLANSA_GEOHUB_MAP_URL": base_url,
+        "PLANSA_CODE_URL": base_url,
+        "OPENAI_BASE_URL": f"{base_url}/v1",
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_subprocess(
+    latency: float,
+    jitter: float,
+    llm_latency: float = 1.0,
+    fixtures: Optional[Path] = None,
+    record_latency: float = 0.0002,
+) -> Tuple[subprocess.Popen, int]:
+    """Run the mock in a child process on a free port; returns it once it accepts connections."""
+    port = _free_port()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.mock_upstream", "--port", str(port), "--latency", str(latency),
+         "--jitter", str(jitter), "--llm-latency", str(llm_latency), "--record-latency", str(record_latency),
+         *(["--fixtures", str(fixtures)] if fixtures else [])],
+        stdout=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return process, port
+        except OSError:
+            time.sleep(0.05)
+    process.kill()
+    raise RuntimeError("mock upstream didn't start")
+
+
+async def serve(upstream: MockUpstream, host: str = "127.0.0.1", port: int = DEFAULT_PORT) -> None:
+    server = await asyncio.start_server(upstream.handle, host, port)
+    base_url = f"http://{host}:{server.sockets[0].getsockname()[1]}"
+    print(f"Mock upstream on {base_url}", flush=True)
+    for name, value in upstream_settings(base_url).items():
+        print(f"  {name}={value}", flush=True)
+    async with server:
+        await server.serve_forever()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds per GeoHub/PlanSA response")
+    parser.add_argument("--jitter", type=float, default=0.02, help="Uniform ± seconds added to every response")
+    parser.add_argument("--record-latency", type=float, default=0.0002,
+                        help="Extra seconds per record in geocodeAddresses/query batches")
+    parser.add_argument("--llm-latency", type=float, default=1.0, help="Seconds per fake LLM completion")
+    parser.add_argument("--fixtures", type=Path, help="Directory of recorded responses to replay")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    upstream = MockUpstream(args.latency, args.jitter, args.llm_latency, args.fixtures, args.seed,
+                            args.record_latency)
+    try:
+        asyncio.run(serve(upstream, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Synthetic PlanSA zone policy documents for offline benchmarks.
+
+The markup mirrors the ``_getpolicies`` ``Content`` HTML the parsers are
+written against: a heading row per criterion followed by a row of
+``td.RenderCell.Phase3`` cells holding the PO and DTS/DPF narratives, all
+inside an outer layout table.
+"""
+from __future__ import annotations
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+
+CRITERIA: Dict[str, Tuple[str, str]] = {
+    "Site coverage": (
+        "Building footprints are consistent with the character and pattern of the neighbourhood.",
+        "The development does not result in site coverage exceeding 60%.",
+    ),
+    "Building Height": (
+        "Buildings contribute to a low-rise suburban character.",
+        "Building height (excluding garages, carports and outbuildings) is no greater than: "
+        "(a) the following: Maximum building height is 2 levels "
+        "(b) in all other cases - 2 building levels up to a height of 9m and wall height that is no greater than 7m",
+    ),
+    "Primary Street Setback": (
+        "Buildings are set back from primary street boundaries to contribute to the existing streetscape.",
+        "Buildings setback from the primary street boundary: (a) no more than 1m in front of the average "
+        "(b) where there are no existing buildings, 5m",
+    ),
+    "Secondary Street Setback": (
+        "Buildings are set back from secondary street boundaries.",
+        "Building walls are set back from the secondary street boundary (other than a rear laneway) "
+        "no less than: (a) 900mm or (b) 2m",
+    ),
+    "Boundary walls": (
+        "Dwelling boundary walls are limited in height and length.",
+        "Dwelling walls on side boundaries: (a) do not exceed 3m in height from the top of the footings "
+        "(b) do not exceed 11.5m in length",
+    ),
+    "Side boundary setback": (
+        "Buildings are set back from side boundaries to provide separation.",
+        "Other than walls on a boundary, buildings are set back from side boundaries: "
+        "(a) at least 900mm where the wall height is up to 3m "
+        "(b) at least 900mm plus 1/3 of the wall height above 3m",
+    ),
+    "Rear boundary setback": (
+        "Buildings are set back from rear boundaries to provide separation.",
+        "Dwelling walls are set back from the rear boundary at least: "
+        "(a) 4m for the first building level (b) 6m for any second building level",
+    ),
+    "Overlooking": (
+        "Development mitigates direct overlooking of habitable rooms and private open spaces.",
+        "Upper level windows facing side or rear boundaries have sill heights of at least 1.5m",
+    ),
+    "Private Open Space": (
+        "Dwellings are provided with suitable sized areas of usable private open space.",
+        "Private open space is provided in accordance with Design Table 1 - minimum 24m2.",
+    ),
+    "Car parking": (
+        "Sufficient on-site vehicle parking is provided.",
+        "Dwellings provide a minimum of 2 car parking spaces, 1 of which is covered",
+    ),
+}
+
+
+def _criterion_rows(heading: str, po: str, dts: str, number: int) -> str:
+    return (
+        f'<tr><td colspan="2" class="RenderHeading"><p><strong>{heading}</strong></p></td></tr>'
+        f'<tr><td class="RenderCell Phase3" style="vertical-align:top"><h5>PO {number}.1</h5><p>{po}</p></td>'
+        f'<td class="RenderCell Phase3" style="vertical-align:top"><h5>DTS/DPF {number}.1</h5><p>{dts}</p></td></tr>'
+    )
+
+
+def policy_html(filler_criteria: int = 0, max_levels: int = 2) -> str:
+    """A zone policy document with ``filler_criteria`` extra criteria before the real ones.
+
+    Filler criteria grow the document the way long zones (many overlays,
+    land-use tables) do, so benchmarks can chart cost against size.
+    ``max_levels`` is the building height TNV value PlanSA fills in for the
+    parcel the document was requested for.
+    """
+    rows: List[str] = [
+        _criterion_rows(f"Filler criterion {i}", "Performance outcome text. " * 12,
+                        "Deemed-to-satisfy text. " * 12, 100 + i)
+        for i in range(filler_criteria)
+    ]
+    rows += [_criterion_rows(h, po, dts.replace("is 2 levels", f"is {max_levels} levels"), n)
+             for n, (h, (po, dts)) in enumerate(CRITERIA.items(), start=1)]
+    return (
+        '<html><head><style>.RenderCell{padding:4px}</style><script>var x = 1;</script></head><body>'
+        '<table class="Layout"><tr><td>'
+        '<h2>General Neighbourhood Zone</h2><h3>Planning and Design Code – Quantitative Assessment</h3>'
+        '<table class="Policy"><tbody>' + "".join(rows) + '</tbody></table>'
+        '</td></tr></table></body></html>'
+    )
+
+
+def load_fixtures(directory: Path) -> Dict[str, str]:
+    """Captured ``Content`` HTML files (``*.html``) from ``directory``, keyed by file name."""
+    return {path.name: path.read_text(encoding="utf-8") for path in sorted(Path(directory).glob("*.html"))}
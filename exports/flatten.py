@@ -0,0 +1,97 @@
+from __future__ import annotations
+import json
+from typing import Any, Dict, List, Optional, Tuple, get_args
+
+from ai_parser.output_class import NumericLimit, PlanningQuantitativeAssessment
+
+
+# Columns describing where a row came from, ahead of the assessment fields.
+# ``rule_fields``/``llm_fields`` count the fields each extractor filled and
+# ``llm_source`` is "cache", "llm" or empty when the LLM wasn't needed;
+# ``zone`` is the zone whose shared policy the assessment came from;
+# ``lat``/``lon`` are the input point, or where an address row geocoded to.
+META_COLUMNS: Tuple[Tuple[str, str], ...] = (
+    ("row", "int"),
+    ("valuation_sid", "str"),
+    ("address", "str"),
+    ("lat", "float"),
+    ("lon", "float"),
+    ("error", "str"),
+    ("rule_fields", "int"),
+    ("llm_fields", "int"),
+    ("llm_source", "str"),
+    ("zone", "str"),
+)
+
+LIMIT_PARTS: Tuple[Tuple[str, str], ...] = (("type", "str"), ("value", "float"), ("unit", "str"))
+
+
+def _mentions_limit(annotation: Any) -> bool:
+    return annotation is NumericLimit or any(_mentions_limit(arg) for arg in get_args(annotation))
+
+
+def _flat_args(annotation: Any) -> List[Any]:
+    args = get_args(annotation)
+    if not args:
+        return [annotation]
+    return [flat for arg in args for flat in _flat_args(arg)]
+
+
+def _assessment_columns() -> List[Tuple[str, str]]:
+    """One column per text field; ``<field>_type/_value/_unit`` per ``NumericLimit`` field.
+
+    Fields that may hold either a limit or "TBC"/"N/A" also get ``<field>_text``.
+    """
+    columns = []
+    for name, info in PlanningQuantitativeAssessment.model_fields.items():
+        if not _mentions_limit(info.annotation):
+            columns.append((name, "str"))
+            continue
+        columns.extend((f"{name}_{part}", kind) for part, kind in LIMIT_PARTS)
+        if any(arg is str or isinstance(arg, str) for arg in _flat_args(info.annotation)):
+            columns.append((f"{name}_text", "str"))
+    return columns
+
+
+ASSESSMENT_COLUMNS: Tuple[Tuple[str, str], ...] = tuple(_assessment_columns())
+# The parcel's decoded TNV values (``valuation.tnv``) as JSON; which
+# variations apply differs from parcel to parcel.
+TNV_COLUMNS: Tuple[Tuple[str, str], ...] = (("tnv", "str"),)
+COLUMNS: Tuple[Tuple[str, str], ...] = META_COLUMNS + ASSESSMENT_COLUMNS + TNV_COLUMNS
+COLUMN_NAMES: Tuple[str, ...] = tuple(name for name, _ in COLUMNS)
+
+
+def flatten_assessment(assessment: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Spread an assessment dict (as produced by ``model_dump``) over ``ASSESSMENT_COLUMNS``."""
+    flat: Dict[str, Any] = {name: None for name, _ in ASSESSMENT_COLUMNS}
+    for name, value in (assessment or {}).items():
+        if f"{name}_type" in flat:
+            if isinstance(value, dict):
+                for part, _ in LIMIT_PARTS:
+                    flat[f"{name}_{part}"] = value.get(part)
+            elif value is not None and f"{name}_text" in flat:
+                flat[f"{name}_text"] = str(value)
+        elif name in flat:
+            flat[name] = None if value is None else str(value)
+    return flat
+
+
+def flatten_result(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Turn one batch result row into a flat record with exactly ``COLUMN_NAMES``."""
+    provenance = result.get("provenance") or {}
+    flat = {
+        "row": result.get("row"),
+        "valuation_sid": None if result.get("valuation_sid") is None else str(result["valuation_sid"]),
+        "address": result.get("address"),
+        "lat": result.get("lat"),
+        "lon": result.get("lon"),
+        "error": result.get("error"),
+        "rule_fields": provenance.get("rule_fields"),
+        "llm_fields": provenance.get("llm_fields"),
+        "llm_source": provenance.get("llm_source"),
+        "zone": provenance.get("zone"),
+    }
+    assessment = result.get("assessment") or {}
+    flat.update(flatten_assessment(assessment))
+    flat["tnv"] = json.dumps(assessment["tnv"], separators=(",", ":")) if assessment.get("tnv") else None
+    return flat
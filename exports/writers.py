@@ -0,0 +1,137 @@
+from __future__ import annotations
+import csv
+import json
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from tracing import span
+
+from .flatten import COLUMN_NAMES, COLUMNS, flatten_result
+
+
+# Rows held in memory before they are written out. For Parquet each chunk
+# becomes one row group, so this also sets the row-group size.
+DEFAULT_CHUNK_ROWS = 1000
+
+
+class ExportWriter:
+    """Writes batch result rows to ``path`` in bounded-size chunks.
+
+    Rows are buffered and written ``chunk_rows`` at a time, so memory use
+    doesn't grow with the run and a reader tailing the file sees progress.
+    Use as a context manager, or call ``close`` to write the last chunk.
+    """
+
+    def __init__(self, path: Path, chunk_rows: int = DEFAULT_CHUNK_ROWS):
+        if chunk_rows < 1:
+            raise ValueError("chunk_rows must be at least 1")
+        self.path = Path(path)
+        self.chunk_rows = chunk_rows
+        self.rows = 0
+        self._buffer: List[Dict[str, Any]] = []
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+    def __enter__(self) -> ExportWriter:
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def write(self, result: Dict[str, Any]) -> None:
+        self._buffer.append(result)
+        self.rows += 1
+        if len(self._buffer) >= self.chunk_rows:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._buffer:
+            with span("export.chunk", format=self.path.suffix.lstrip("."), rows=len(self._buffer)):
+                self._write_chunk(self._buffer)
+            self._buffer = []
+
+    def close(self) -> None:
+        self.flush()
+
+    def _write_chunk(self, results: List[Dict[str, Any]]) -> None:
+        raise NotImplementedError
+
+
+class JsonlWriter(ExportWriter):
+    """One JSON object per line, keeping each assessment nested as produced."""
+
+    def __init__(self, path: Path, chunk_rows: int = DEFAULT_CHUNK_ROWS):
+        super().__init__(path, chunk_rows)
+        self._file = self.path.open("w", encoding="utf-8")
+
+    def _write_chunk(self, results: List[Dict[str, Any]]) -> None:
+        self._file.write("".join(json.dumps(result, default=str) + "\n" for result in results))
+        self._file.flush()
+
+    def close(self) -> None:
+        super().close()
+        self._file.close()
+
+
+class CsvWriter(ExportWriter):
+    """Flat rows with ``COLUMN_NAMES`` as the header."""
+
+    def __init__(self, path: Path, chunk_rows: int = DEFAULT_CHUNK_ROWS):
+        super().__init__(path, chunk_rows)
+        self._file = self.path.open("w", encoding="utf-8", newline="")
+        self._writer = csv.DictWriter(self._file, fieldnames=COLUMN_NAMES)
+        self._writer.writeheader()
+
+    def _write_chunk(self, results: List[Dict[str, Any]]) -> None:
+        self._writer.writerows(flatten_result(result) for result in results)
+        self._file.flush()
+
+    def close(self) -> None:
+        super().close()
+        self._file.close()
+
+
+class ParquetWriter(ExportWriter):
+    """Flat columnar rows, one Parquet row group per chunk. Needs ``pyarrow``."""
+
+    def __init__(self, path: Path, chunk_rows: int = DEFAULT_CHUNK_ROWS):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("Parquet export needs pyarrow: pip install pyarrow") from e
+
+        super().__init__(path, chunk_rows)
+        types = {"int": pa.int64(), "float": pa.float64(), "str": pa.string()}
+        self._pa = pa
+        self._schema = pa.schema([(name, types[kind]) for name, kind in COLUMNS])
+        self._writer: Optional[Any] = pq.ParquetWriter(self.path, self._schema)
+
+    def _write_chunk(self, results: List[Dict[str, Any]]) -> None:
+        rows = [flatten_result(result) for result in results]
+        table = self._pa.Table.from_pydict({name: [row[name] for row in rows] for name in COLUMN_NAMES},
+                                           schema=self._schema)
+        self._writer.write_table(table)
+
+    def close(self) -> None:
+        if self._writer is None:
+            return
+        super().close()
+        self._writer.close()
+        self._writer = None
+
+
+WRITERS = {
+    ".jsonl": JsonlWriter,
+    ".ndjson": JsonlWriter,
+    ".csv": CsvWriter,
+    ".parquet": ParquetWriter,
+}
+
+
+def open_writer(path: Path, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> ExportWriter:
+    """Pick a writer from the file extension of ``path``."""
+    suffix = Path(path).suffix.lower()
+    writer = WRITERS.get(suffix)
+    if writer is None:
+        raise ValueError(f"Unsupported export format {suffix or path!r}; use one of {', '.join(WRITERS)}")
+    return writer(path, chunk_rows)
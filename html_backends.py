@@ -0,0 +1,221 @@
+from __future__ import annotations
+import os
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional
+
+if TYPE_CHECKING:
+    from bs4 import BeautifulSoup
+
+
+class HtmlBackend:
+    """The handful of DOM operations the policy parsers need.
+
+    Every backend must return identical strings for the same document:
+    ``text`` joins a node's stripped text fragments with single spaces
+    (script/style content excluded), like ``" ".join(tag.stripped_strings)``.
+    """
+
+    name = "base"
+
+    def parse(self, html: str) -> Any:
+        raise NotImplementedError
+
+    def innermost_rows(self, document: Any) -> List[Any]:
+        """Every ``<tr>`` with no nested ``<tr>``, in document order."""
+        raise NotImplementedError
+
+    def has_rule_cells(self, row: Any) -> bool:
+        raise NotImplementedError
+
+    def rule_cells(self, row: Any) -> Dict[str, str]:
+        """``{h5 heading: narrative}`` for each ``td.RenderCell.Phase3`` cell in ``row``."""
+        raise NotImplementedError
+
+    def text(self, node: Any) -> str:
+        raise NotImplementedError
+
+    def html_to_text(self, html: str) -> str:
+        return self.text(self.parse(html))
+
+    @staticmethod
+    def _cell_entry(heading: str, narrative: str) -> tuple[str, str]:
+        return heading, narrative.replace(heading, "", 1).strip()
+
+
+class SoupBackend(HtmlBackend):
+    """BeautifulSoup with the pure-Python ``html.parser``; always available."""
+
+    name = "html.parser"
+
+    def __init__(self):
+        from bs4 import BeautifulSoup
+
+        self._soup = BeautifulSoup
+
+    def parse(self, html: str) -> BeautifulSoup:
+        return self._soup(html, "html.parser")
+
+    def innermost_rows(self, document: BeautifulSoup) -> List[Any]:
+        rows = document.find_all("tr")
+        outer = set()
+        for row in rows:
+            parent = row.find_parent("tr")
+            if parent is not None:
+                outer.add(id(parent))
+        return [row for row in rows if id(row) not in outer]
+
+    def has_rule_cells(self, row: Any) -> bool:
+        return row.select_one("td.RenderCell.Phase3") is not None
+
+    def rule_cells(self, row: Any) -> Dict[str, str]:
+        values = {}
+        for td in row.select("td.RenderCell.Phase3"):
+            h5 = td.find("h5")
+            if not h5:
+                continue
+            heading, narrative = self._cell_entry(h5.get_text(strip=True), " ".join(td.stripped_strings))
+            values[heading] = narrative
+        return values
+
+    def text(self, node: Any) -> str:
+        return " ".join(node.stripped_strings)
+
+
+class LxmlBackend(HtmlBackend):
+    """Native ``lxml.html`` (libxml2) with precompiled XPath queries."""
+
+    name = "lxml"
+
+    def __init__(self):
+        from lxml import etree, html as lxml_html
+
+        self._etree = etree
+        self._fromstring = lxml_html.document_fromstring
+        cell = ("td[contains(concat(' ', normalize-space(@class), ' '), ' RenderCell ')"
+                " and contains(concat(' ', normalize-space(@class), ' '), ' Phase3 ')]")
+        self._innermost_rows = etree.XPath("//tr[not(.//tr)]")
+        self._rule_cells = etree.XPath(f".//{cell}")
+        self._first_h5 = etree.XPath("(.//h5)[1]")
+
+    def parse(self, html: str) -> Any:
+        document = self._fromstring(html or "<html></html>")
+        self._etree.strip_elements(document, "script", "style", with_tail=False)
+        return document
+
+    def innermost_rows(self, document: Any) -> List[Any]:
+        return self._innermost_rows(document)
+
+    def has_rule_cells(self, row: Any) -> bool:
+        return bool(self._rule_cells(row))
+
+    def rule_cells(self, row: Any) -> Dict[str, str]:
+        values = {}
+        for td in self._rule_cells(row):
+            h5 = self._first_h5(td)
+            if not h5:
+                continue
+            heading = "".join(part.strip() for part in h5[0].itertext())
+            heading, narrative = self._cell_entry(heading, self.text(td))
+            values[heading] = narrative
+        return values
+
+    def text(self, node: Any) -> str:
+        return " ".join(part for part in (fragment.strip() for fragment in node.itertext()) if part)
+
+
+class SelectolaxBackend(HtmlBackend):
+    """``selectolax`` on the Lexbor engine, the fastest option when installed."""
+
+    name = "selectolax"
+
+    def __init__(self):
+        from selectolax.lexbor import LexborHTMLParser
+
+        self._parser = LexborHTMLParser
+
+    def parse(self, html: str) -> Any:
+        document = self._parser(html or "<html></html>")
+        document.strip_tags(["script", "style"])
+        return document
+
+    def innermost_rows(self, document: Any) -> List[Any]:
+        rows = document.css("tr")
+        outer = set()
+        for row in rows:
+            parent = row.parent
+            while parent is not None and parent.tag != "tr":
+                parent = parent.parent
+            if parent is not None:
+                outer.add(parent.mem_id)
+        return [row for row in rows if row.mem_id not in outer]
+
+    def has_rule_cells(self, row: Any) -> bool:
+        return row.css_first("td.RenderCell.Phase3") is not None
+
+    def rule_cells(self, row: Any) -> Dict[str, str]:
+        values = {}
+        for td in row.css("td.RenderCell.Phase3"):
+            h5 = td.css_first("h5")
+            if h5 is None:
+                continue
+            heading = "".join(self._fragments(h5))
+            heading, narrative = self._cell_entry(heading, self.text(td))
+            values[heading] = narrative
+        return values
+
+    @staticmethod
+    def _fragments(node: Any) -> List[str]:
+        fragments = []
+        for child in node.traverse(include_text=True):
+            if child.is_text_node:
+                fragment = child.text_content.strip()
+                if fragment:
+                    fragments.append(fragment)
+        return fragments
+
+    def text(self, node: Any) -> str:
+        root = getattr(node, "root", None)
+        if root is not None:
+            node = root
+        return " ".join(self._fragments(node))
+
+
+BACKENDS: Dict[str, Callable[[], HtmlBackend]] = {
+    SelectolaxBackend.name: SelectolaxBackend,
+    LxmlBackend.name: LxmlBackend,
+    SoupBackend.name: SoupBackend,
+}
+
+_instances: Dict[str, HtmlBackend] = {}
+
+
+def available_backends() -> List[str]:
+    """Names of the backends whose libraries are importable, fastest first."""
+    names = []
+    for name in BACKENDS:
+        try:
+            get_backend(name)
+        except ImportError:
+            continue
+        names.append(name)
+    return names
+
+
+def get_backend(name: Optional[str] = None) -> HtmlBackend:
+    """Return the named backend, or the fastest installed one.
+
+    ``PLANSA_HTML_BACKEND`` overrides the automatic choice. Asking for a
+    backend whose library isn't installed raises ``ImportError``.
+    """
+    name = name or os.getenv("PLANSA_HTML_BACKEND")
+    if name is None:
+        for candidate in BACKENDS:
+            try:
+                return get_backend(candidate)
+            except ImportError:
+                continue
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown HTML backend {name!r}; choose from {sorted(BACKENDS)}")
+    backend = _instances.get(name)
+    if backend is None:
+        backend = _instances[name] = BACKENDS[name]()
+    return backend
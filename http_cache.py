@@ -0,0 +1,262 @@
+from __future__ import annotations
+import hashlib
+import json
+import sqlite3
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+import tracing
+from json_backend import loads
+from settings import CACHE_DIR, HTTP_CACHE_MAX_BYTES
+
+
+DEFAULT_CACHE_PATH = CACHE_DIR / "http_responses.sqlite"
+
+HOUR = 60 * 60
+DAY = 24 * HOUR
+
+# First matching URL fragment wins; URLs matching nothing are never cached.
+# Parcel geometry and valuation numbers change rarely; policy text changes
+# with Code amendments, so it is kept for a shorter time.
+DEFAULT_TTLS: Tuple[Tuple[str, int], ...] = (
+    ("GeocodeServer/findAddressCandidates", 7 * DAY),
+    ("MapServer/identify", 7 * DAY),
+    ("/_getzones", DAY),
+    ("/_getpolicies", DAY),
+)
+
+_VALIDATOR_HEADERS = ("etag", "last-modified", "content-type")
+
+
+class OfflineCacheMiss(Exception):
+    """Offline mode was asked for a request that isn't in the cache."""
+
+    def __init__(self, url: str):
+        super().__init__(f"Offline mode: no cached response for {url}")
+        self.url = url
+
+
+@dataclass
+class CachedResponse:
+    """The subset of ``curl_cffi`` ``Response`` the clients use, rebuilt from the cache."""
+    url: str
+    status_code: int
+    text: str
+    headers: Dict[str, str] = field(default_factory=dict)
+    from_cache: bool = True
+    cache_key: Optional[str] = None
+
+    @property
+    def content(self) -> bytes:
+        return self.text.encode("utf-8")
+
+    def json(self) -> Any:
+        return loads(self.text)
+
+
+@dataclass
+class HttpCacheStats:
+    hits: int = 0
+    misses: int = 0
+    revalidated: int = 0
+    stored: int = 0
+    discarded: int = 0
+    offline_misses: int = 0
+
+
+def request_key(url: str, params: Optional[Mapping[str, Any]] = None) -> str:
+    canonical = json.dumps([url, sorted((str(k), str(v)) for k, v in (params or {}).items())])
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class HttpCache:
+    """SQLite store of GET responses with expiry and validators, LRU-bounded by size."""
+
+    def __init__(self, path: Path = DEFAULT_CACHE_PATH, max_bytes: int = HTTP_CACHE_MAX_BYTES):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.stats = HttpCacheStats()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " url TEXT NOT NULL,"
+            " status INTEGER NOT NULL,"
+            " headers TEXT NOT NULL,"
+            " body TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " expires REAL NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses(last_used)")
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Tuple[CachedResponse, float]]:
+        """Return ``(response, expires_at)`` or ``None``; stale entries are returned too."""
+        row = self._conn.execute(
+            "SELECT url, status, headers, body, expires FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        url, status, headers, body, expires = row
+        self._conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+        self._conn.commit()
+        return CachedResponse(url=url, status_code=status, text=body, headers=json.loads(headers),
+                              cache_key=key), expires
+
+    def put(self, key: str, response: CachedResponse, ttl: float) -> None:
+        now = time.time()
+        self._conn.execute(
+            "INSERT OR REPLACE INTO responses (key, url, status, headers, body, size, expires, last_used)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (key, response.url, response.status_code, json.dumps(response.headers), response.text,
+             len(response.text), now + ttl, now),
+        )
+        self._evict()
+        self._conn.commit()
+        self.stats.stored += 1
+
+    def delete(self, key: str) -> None:
+        self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+        self._conn.commit()
+
+    def touch(self, key: str, ttl: float) -> None:
+        """Extend an entry's freshness after a successful revalidation."""
+        now = time.time()
+        self._conn.execute("UPDATE responses SET expires = ?, last_used = ? WHERE key = ?", (now + ttl, now, key))
+        self._conn.commit()
+
+    def _evict(self) -> None:
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        doomed = []
+        for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY last_used ASC"):
+            if total <= self.max_bytes:
+                break
+            doomed.append((key,))
+            total -= size
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", doomed)
+
+    def clear(self) -> int:
+        removed = self._conn.execute("DELETE FROM responses").rowcount
+        self._conn.commit()
+        self._conn.execute("VACUUM")
+        return removed
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+def _validators(headers: Mapping[str, str]) -> Dict[str, str]:
+    conditional = {}
+    if headers.get("etag"):
+        conditional["If-None-Match"] = headers["etag"]
+    if headers.get("last-modified"):
+        conditional["If-Modified-Since"] = headers["last-modified"]
+    return conditional
+
+
+class CachingSession:
+    """Wraps an ``AsyncSession`` so ``get`` is served from ``HttpCache`` when possible.
+
+    Fresh entries are returned without touching the network; stale entries
+    are revalidated with ``If-None-Match``/``If-Modified-Since`` when the
+    server sent validators. With ``offline=True`` only the cache is used
+    (stale or not) and a miss raises ``OfflineCacheMiss``; ``post`` is never
+    cached, so offline it always raises. Every other attribute is delegated
+    to the wrapped session.
+
+    Any 200 response is stored, but only the caller can tell an answer from
+    an error or empty body that came back as 200, so callers that validate
+    the body hand rejected responses to ``discard``.
+    """
+
+    def __init__(
+        self,
+        session: Any,
+        cache: HttpCache,
+        ttls: Tuple[Tuple[str, int], ...] = DEFAULT_TTLS,
+        offline: bool = False,
+    ):
+        self._session = session
+        self.cache = cache
+        self.ttls = ttls
+        self.offline = offline
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._session, name)
+
+    def ttl_for(self, url: str) -> int:
+        for fragment, ttl in self.ttls:
+            if fragment in url:
+                return ttl
+        return 0
+
+    async def get(self, url: str, params: Optional[Mapping[str, Any]] = None, **kwargs: Any) -> Any:
+        ttl = self.ttl_for(url)
+        if ttl <= 0 and not self.offline:
+            return await self._session.get(url, params=params, **kwargs)
+
+        key = request_key(url, params)
+        entry = self.cache.get(key)
+        stats = self.cache.stats
+        if entry is not None and (self.offline or entry[1] > time.time()):
+            stats.hits += 1
+            tracing.annotate(cache_hit=True)
+            return entry[0]
+        if self.offline:
+            stats.offline_misses += 1
+            raise OfflineCacheMiss(url)
+
+        stats.misses += 1
+        headers = dict(kwargs.pop("headers", None) or {})
+        if entry is not None:
+            headers.update(_validators(entry[0].headers))
+        response = await self._session.get(url, params=params, headers=headers or None, **kwargs)
+
+        if response.status_code == 304 and entry is not None:
+            stats.revalidated += 1
+            tracing.annotate(cache_hit=True, revalidated=True)
+            self.cache.touch(key, ttl)
+            return entry[0]
+        if response.status_code == 200:
+            response_headers = getattr(response, "headers", None) or {}
+            kept = {name: response_headers.get(name) for name in _VALIDATOR_HEADERS if response_headers.get(name)}
+            self.cache.put(key, CachedResponse(url=url, status_code=200, text=response.text,
+                                               headers=kept, from_cache=False), ttl)
+            response.cache_key = key
+        return response
+
+    async def post(self, url: str, **kwargs: Any) -> Any:
+        if self.offline:
+            self.cache.stats.offline_misses += 1
+            raise OfflineCacheMiss(url)
+        return await self._session.post(url, **kwargs)
+
+
+def discard(session: Any, response: Any) -> None:
+    """Drop ``response`` from ``session``'s HTTP cache because its body was unusable.
+
+    A no-op unless ``session`` is a ``CachingSession`` and ``response`` came
+    from (or went into) its cache, so clients can call it unconditionally.
+    """
+    key = getattr(response, "cache_key", None)
+    cache = getattr(session, "cache", None)
+    if key and isinstance(cache, HttpCache):
+        cache.delete(key)
+        cache.stats.discarded += 1
+
+
+_default_cache: Optional[HttpCache] = None
+
+
+def get_default_http_cache() -> HttpCache:
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = HttpCache()
+    return _default_cache
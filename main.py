@@ -1,41 +1,49 @@
+from __future__ import annotations
 import argparse
-import asyncio
-import json
 import os
 from pathlib import Path
-from typing import Tuple
+from typing import TYPE_CHECKING
 
-from dotenv import load_dotenv, set_key
-from curl_cffi.requests import AsyncSession
-from rich import print
-from rich.prompt import Prompt
+if TYPE_CHECKING:
+    from curl_cffi.requests import AsyncSession
 
-from valuation.valuation import get_zone_policies_raw
-from search.address_search import get_address
-from search.coordinate_search import get_address as get_address_from_coordinates
+# Heavy dependencies (curl_cffi, rich, pydantic, pyproj, bs4, scrapegraphai)
+# are imported inside the functions that need them so `--help`, the cache
+# commands and cached lookups don't pay for them up front.
+# benchmarks/bench_startup.py guards the resulting startup budget.
 
 
 # Path to .env file
 ENV_PATH = Path(".env")
 
 
+def echo(*args, **kwargs):
+    """``rich.print``, imported on first use."""
+    from rich import print as rich_print
+
+    rich_print(*args, **kwargs)
+
+
 def ensure_llm_credentials():
     """Ensure LLM credentials are set in the environment, otherwise prompt and save."""
+    from dotenv import load_dotenv, set_key
+    from rich.prompt import Prompt
+
     load_dotenv(ENV_PATH)
 
     provider = os.getenv("LLM_PROVIDER")
     if provider:
-        print(f"[green]LLM Provider already set to:[/green] {provider}")
+        echo(f"[green]LLM Provider already set to:[/green] {provider}")
         return
 
-    print("[bold yellow]No LLM credentials found. Let's configure them.[/bold yellow]")
+    echo("[bold yellow]No LLM credentials found. Let's configure them.[/bold yellow]")
     provider_choice = Prompt.ask("Choose your LLM provider", choices=["openai", "azure"], default="openai")
 
     if provider_choice == "openai":
         api_key = Prompt.ask("[bold cyan]Enter your OpenAI API Key[/bold cyan]")
         set_key(ENV_PATH, "LLM_PROVIDER", "openai")
         set_key(ENV_PATH, "OPENAI_API_KEY", api_key)
-        print("[green]OpenAI credentials saved to .env[/green]")
+        echo("[green]OpenAI credentials saved to .env[/green]")
 
     elif provider_choice == "azure":
         api_key = Prompt.ask("[bold cyan]Enter your Azure OpenAI API Key[/bold cyan]")
@@ -47,7 +55,7 @@ def ensure_llm_credentials():
         set_key(ENV_PATH, "AZURE_ENDPOINT", endpoint)
         set_key(ENV_PATH, "AZURE_API_VERSION", api_version)
 
-        print("[green]Azure OpenAI credentials saved to .env[/green]")
+        echo("[green]Azure OpenAI credentials saved to .env[/green]")
 
 
 def cli():
@@ -56,30 +64,277 @@ def cli():
     group.add_argument('--address', type=str, help='Property address (e.g., "9 ELIZABETH ST NORWOOD SA 5067")')
     group.add_argument('--coords', nargs=2, type=float, metavar=('LAT', 'LON'),
                        help='Latitude and Longitude coordinates')
+    group.add_argument('--batch', type=Path, metavar='FILE',
+                       help='CSV or JSONL file with an "address" or "lat"/"lon" column per row')
+    group.add_argument('--clear-llm-cache', action='store_true',
+                       help='Delete every cached LLM extraction result and exit')
+    group.add_argument('--clear-http-cache', action='store_true',
+                       help='Delete every cached GeoHub/PlanSA response and exit')
+    group.add_argument('--serve', action='store_true',
+                       help='Run a local HTTP/JSON service that keeps one warm session open')
+    parser.add_argument('--host', type=str, default='127.0.0.1',
+                        help='Interface --serve listens on (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8765,
+                        help='Port --serve listens on (default: 8765)')
+    parser.add_argument('--output', type=Path, default=None,
+                        help='Export results to a .jsonl, .csv or .parquet file; --batch defaults to batch_results.jsonl')
+    parser.add_argument('--chunk-rows', type=int, default=1000,
+                        help='Rows buffered before each write to --output (default: 1000)')
+    parser.add_argument('--trace', type=Path, default=None, metavar='FILE',
+                        help='Write every timing span to FILE as JSON lines (OTLP span fields)')
+    parser.add_argument('--trace-otel', action='store_true',
+                        help='Also send spans to OpenTelemetry (needs opentelemetry-api and a configured SDK)')
+    parser.add_argument('--concurrency', type=int, default=8,
+                        help='Maximum properties processed at once in --batch mode (default: 8)')
+    parser.add_argument('--bulk-resolve', action='store_true',
+                        help='In --batch mode, resolve valuation numbers in bulk (geocodeAddresses / parcel query)')
+    parser.add_argument('--policy-concurrency', type=int, default=None,
+                        help='Maximum concurrent policy document requests to PlanSA (default: 4)')
+    parser.add_argument('--llm-concurrency', type=int, default=None,
+                        help='Maximum LLM extractions running at once (default: 8, or PLANSA_LLM_CONCURRENCY)')
+    parser.add_argument('--llm-batch-tokens', type=int, default=None, metavar='N',
+                        help='Pack policy documents into one LLM request up to N document tokens '
+                             '(default: 0 = one per request, or PLANSA_LLM_BATCH_TOKENS)')
+    parser.add_argument('--no-llm', action='store_true',
+                        help='Only use the rule-based extractor; never call the LLM')
+    parser.add_argument('--no-http-cache', action='store_true',
+                        help='Always query GeoHub/PlanSA instead of reusing cached responses')
+    parser.add_argument('--offline', action='store_true',
+                        help='Serve GeoHub/PlanSA responses only from the local cache; never touch the network')
     return parser.parse_args()
 
 
-async def fetch_by_address(session: AsyncSession, address: str):
-    address_response = await get_address(session, address)
-    valuation_sid = json.loads(address_response.model_dump_json()).get('Valuation', {})
-    print(f"[bold green]Valuation SID:[/bold green] {valuation_sid} from address: [cyan]{address_response.full_address}[/cyan]")
-    return valuation_sid
+def clear_llm_cache():
+    from ai_parser.cache import get_default_cache
+
+    cache = get_default_cache()
+    removed = cache.clear()
+    echo(f"[green]Removed {removed} cached LLM extractions from[/green] {cache.path}")
+
+
+def report_llm_cache():
+    from ai_parser.cache import get_default_cache
+
+    summary = get_default_cache().summary()
+    echo(
+        f"[bold]LLM cache:[/bold] {summary['hits']} hits, {summary['misses']} misses "
+        f"(hit rate {summary['hit_rate']:.0%}), {summary['entries']} entries, "
+        f"{summary['bytes'] / 1024:.0f} KiB, {summary['evictions']} evicted"
+    )
+
+
+def report_llm_engine():
+    from ai_parser.engine import get_default_engine
+
+    engine = get_default_engine()
+    stats = engine.stats
+    if not stats.calls:
+        return
+    echo(
+        f"[bold]LLM engine:[/bold] {stats.calls} extractions on {stats.graphs_built} graphs "
+        f"(limit {engine.size}, peak {stats.peak_in_flight} in flight), "
+        f"{stats.waits} waited {stats.wait_seconds:.1f}s for a free graph"
+    )
+
+
+def clear_http_cache():
+    from http_cache import get_default_http_cache
+
+    cache = get_default_http_cache()
+    removed = cache.clear()
+    echo(f"[green]Removed {removed} cached HTTP responses from[/green] {cache.path}")
+
 
+def wrap_session(session: AsyncSession, args):
+    """Add per-host rate limiting/retries, then the HTTP response cache unless disabled.
 
-async def fetch_by_coordinates(session: AsyncSession, coords: Tuple[float, float]):
-    address_response = await get_address_from_coordinates(session, coords)
-    valuation_sid = address_response.attributes.Valuation_No
-    print(f"[bold green]Valuation SID:[/bold green] {valuation_sid} from coordinates: [cyan]{coords}[/cyan]")
-    return valuation_sid
+    The cache sits outermost so cache hits never spend rate-limit tokens.
+    """
+    from resilience import ResilientSession
+
+    session = ResilientSession(session)
+    if args.no_http_cache and not args.offline:
+        return session
+    from http_cache import CachingSession, get_default_http_cache
+
+    return CachingSession(session, get_default_http_cache(), offline=args.offline)
+
+
+def report_llm_batching():
+    from ai_parser.batching import get_default_batcher
+
+    batcher = get_default_batcher()
+    if batcher is None or not (batcher.stats.requests or batcher.stats.singles):
+        return
+    stats = batcher.stats
+    echo(
+        f"[bold]LLM batching:[/bold] {stats.documents} documents in {stats.requests} requests "
+        f"(budget {batcher.token_budget} tokens), {stats.singles} sent alone, "
+        f"{stats.fallbacks} re-extracted alone, {stats.failed_requests} requests failed"
+    )
+
+
+def report_llm_input():
+    from ai_parser.reduce import get_reduction_stats
+
+    stats = get_reduction_stats()
+    if not stats.documents:
+        return
+    saved = 1 - stats.tokens_after / stats.tokens_before if stats.tokens_before else 0.0
+    echo(
+        f"[bold]LLM input:[/bold] {stats.documents} documents reduced from {stats.tokens_before} "
+        f"to {stats.tokens_after} tokens ({saved:.0%} fewer), {stats.fallbacks} without a criteria table"
+    )
+
+
+def report_http_cache(session):
+    stats = getattr(getattr(session, "cache", None), "stats", None)
+    if stats is None:
+        return
+    echo(
+        f"[bold]HTTP cache:[/bold] {stats.hits} hits, {stats.misses} misses, "
+        f"{stats.revalidated} revalidated, {stats.stored} stored"
+    )
+
+
+def report_connections(session):
+    stats = getattr(session, "connections", None)
+    if stats is None or not stats.requests:
+        return
+    echo(
+        f"[bold]Connections:[/bold] {stats.requests} requests over {stats.new_connections} new connections "
+        f"(reuse rate {stats.reuse_rate:.0%}, {stats.handshake_seconds:.2f}s in TLS handshakes)"
+    )
 
 
-async def main():
-    ensure_llm_credentials()
+def report_resilience():
+    from resilience import controllers
 
-    args = cli()
-    from ai_parser.ai_parser import scrape_zone_data
+    for host, controller in controllers().items():
+        stats = controller.stats
+        if not stats.attempts and not stats.rejected:
+            continue
+        echo(
+            f"[bold]{host}:[/bold] {stats.attempts} attempts, {stats.retries} retries, "
+            f"{stats.throttled} throttled, {stats.timeouts} timeouts, {stats.breaker_trips} breaker trips, "
+            f"rate now {controller.bucket.rate:.1f}/s"
+        )
+
+
+def report_zone_cache():
+    from valuation.zone_cache import get_default_zone_cache
+
+    summary = get_default_zone_cache().summary()
+    if not summary["hits"] and not summary["misses"]:
+        return
+    echo(
+        f"[bold]Zone cache:[/bold] {summary['zones']} zones, {summary['hits']} parcels reused a zone's documents, "
+        f"{summary['misses']} fetched them; {summary['assessment_hits']} assessments reused"
+    )
+
+
+def report_single_flight():
+    from singleflight import groups
+
+    for name, group in groups().items():
+        if group.stats.calls:
+            echo(
+                f"[bold]In-flight dedup ({name}):[/bold] {group.stats.saved} of {group.stats.calls} "
+                "calls joined an identical request already running"
+            )
+
+
+def report_tracing():
+    from tracing import get_tracer
+
+    tracer = get_tracer()
+    tracer.report()
+    tracer.close()
+
+
+def report_address_index():
+    from search.address_index import get_default_address_index
+
+    index = get_default_address_index()
+    if index is None:
+        return
+    stats = index.stats
+    echo(
+        f"[bold]Address index:[/bold] {stats.exact} exact, {stats.fuzzy} fuzzy, "
+        f"{stats.misses} sent to GeoHub, {stats.learned} learned"
+    )
+
+
+async def main(args: argparse.Namespace | None = None):
+    args = args or cli()
+    if args.clear_llm_cache:
+        clear_llm_cache()
+        return
+    if args.clear_http_cache:
+        clear_http_cache()
+        return
+
+    if not args.no_llm:
+        ensure_llm_credentials()
+        if args.llm_concurrency is not None:
+            from ai_parser.engine import configure_engine
+
+            configure_engine(args.llm_concurrency)
+        if args.llm_batch_tokens is not None:
+            from ai_parser.batching import configure_batching
+
+            configure_batching(args.llm_batch_tokens)
+
+    from pipeline import assess_zone, fetch_by_address, fetch_by_coordinates, first_policy_html
+    from valuation.valuation import set_host_concurrency
+    from valuation.zone_cache import get_zone_policies
+
+    if args.policy_concurrency is not None:
+        set_host_concurrency(args.policy_concurrency)
+
+    from session_helpers import DEFAULT_MAX_CLIENTS, close_session, creat_session
+    import tracing
+
+    if args.trace or args.trace_otel:
+        tracing.configure(args.trace, otel=args.trace_otel)
+
+    # Each property can have several policy requests in flight at once.
+    raw_session = await creat_session(max_clients=max(DEFAULT_MAX_CLIENTS, args.concurrency * 4))
+    try:
+        session = wrap_session(raw_session, args)
+        if args.serve:
+            from server import serve
+
+            try:
+                await serve(session, args.host, args.port, use_llm=not args.no_llm)
+            finally:
+                report_http_cache(session)
+                report_tracing()
+            return
+
+        if args.batch:
+            from batch import run_batch
+
+            output = args.output or Path('batch_results.jsonl')
+            stats = await run_batch(session, args.batch, output, concurrency=args.concurrency,
+                                    use_llm=not args.no_llm, chunk_rows=args.chunk_rows,
+                                    bulk_resolve=args.bulk_resolve)
+            stats.report()
+            report_tracing()
+            report_http_cache(session)
+            report_address_index()
+            report_zone_cache()
+            report_single_flight()
+            report_resilience()
+            report_connections(session)
+            if not args.no_llm:
+                report_llm_cache()
+                report_llm_engine()
+                report_llm_batching()
+                report_llm_input()
+            echo(f"[green]Results written to[/green] {output}")
+            return
 
-    async with AsyncSession() as session:
         try:
             if args.address:
                 valuation_sid = await fetch_by_address(session, args.address)
@@ -87,17 +342,36 @@ async def main():
                 lat, lon = args.coords
                 valuation_sid = await fetch_by_coordinates(session, (lat, lon))
 
-            zone_policies = await get_zone_policies_raw(session, valuation_sid)
-            html = zone_policies[0][0].get('Content', '') if zone_policies else ''
-            print(f"[bold]Zone Policies Preview:[/bold] {html[:500]} ...")
+            zone = await get_zone_policies(session, valuation_sid)
+            html = first_policy_html(zone.documents)
+            echo(f"[bold]Zone Policies Preview:[/bold] {html[:500]} ...")
+
+            echo("[yellow]Parsing zoning data (rules first, AI for the rest)...[/yellow]")
+            provenance = {}
+            parsed_data = await assess_zone(zone, use_llm=not args.no_llm, provenance=provenance)
+            echo(f"[green]Parsed Zone Data:[/green]\n{parsed_data}")
+            if args.output:
+                from exports.writers import open_writer
 
-            print("[yellow]Parsing zoning data using AI...[/yellow]")
-            parsed_data = await scrape_zone_data(html)
-            print(f"[green]Parsed Zone Data:[/green]\n{parsed_data}")
+                source = {"address": args.address} if args.address else {"lat": lat, "lon": lon}
+                with open_writer(args.output, chunk_rows=args.chunk_rows) as out:
+                    out.write({"row": 1, **source, "valuation_sid": valuation_sid, "assessment": parsed_data,
+                               "provenance": provenance, "error": None})
+                echo(f"[green]Result written to[/green] {args.output}")
+            report_http_cache(session)
+            if not args.no_llm:
+                report_llm_cache()
+                report_llm_input()
 
         except Exception as e:
-            print(f"[red]An error occurred:[/red] {e}")
+            echo(f"[red]An error occurred:[/red] {e}")
+        report_tracing()
+    finally:
+        await close_session(raw_session)
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    parsed_args = cli()
+    import asyncio
+
+    asyncio.run(main(parsed_args))
@@ -10,6 +10,7 @@ class Address_Search(BaseModel):
     latitude: float
     longitude: float
     Valuation: int
+    score: Optional[float] = None
 
 class Attribute(BaseModel):
     Location: str
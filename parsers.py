@@ -1,10 +1,16 @@
+from __future__ import annotations
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Iterator, List, Literal, Optional, Tuple
+
 from search.address_search_erros import AddressParseError
-from bs4 import BeautifulSoup
-from rich import print
+from html_backends import HtmlBackend, SoupBackend, get_backend
+from ai_parser.output_class import NumericLimit, PlanningQuantitativeAssessment
 
 
 
 _JSONP_CALLBACK = "angular.callbacks._5"  
+_WS = re.compile(r"\s+")
 
 
 def _strip_jsonp(text: str, callback: str = _JSONP_CALLBACK) -> str:
@@ -23,82 +29,285 @@ def _strip_jsonp(text: str, callback: str = _JSONP_CALLBACK) -> str:
 
 
 
-def find_code_in_html(next_row:BeautifulSoup) -> str:
-    cells = next_row.select("td.RenderCell.Phase3")
+def find_code_in_html(next_row, backend: Optional[HtmlBackend] = None) -> Dict[str, str]:
+    """``{h5 heading: narrative}`` for the ``td.RenderCell.Phase3`` cells of a rule row.
+
+    ``next_row`` must come from ``backend``; the default is BeautifulSoup, so
+    passing a ``bs4`` tag keeps working.
+    """
+    return (backend or get_backend(SoupBackend.name)).rule_cells(next_row)
+
+
+def normalize_heading(text: str) -> str:
+    """``text`` lower-cased with runs of whitespace collapsed, for matching criterion headings."""
+    return _WS.sub(" ", text).strip().lower()
+
+
+class PolicyTableIndex:
+    """Maps each criterion heading row to the rule row that follows it.
+
+    Built in a single pass over the document's innermost ``<tr>`` elements,
+    so looking up every criterion costs one walk of the table instead of a
+    full-document ``soup.find`` (with ``get_text`` on every enclosing row)
+    per heading. ``document`` must have been parsed by ``backend``.
+    """
+
+    def __init__(self, document, backend: HtmlBackend):
+        innermost = backend.innermost_rows(document)
+        self._rules: Dict[str, Any] = {}
+        self._titles: Dict[str, str] = {}
+        for row, next_row in zip(innermost, innermost[1:]):
+            if backend.has_rule_cells(row):
+                continue
+            text = backend.text(row)
+            heading = normalize_heading(text)
+            if heading and heading not in self._rules:
+                self._rules[heading] = next_row
+                self._titles[heading] = _WS.sub(" ", text).strip()
+
+    def rule_row(self, heading: str):
+        """Rule row for ``heading``; exact match first, then the first heading containing it."""
+        needle = normalize_heading(heading)
+        row = self._rules.get(needle)
+        if row is not None:
+            return row
+        for text, row in self._rules.items():
+            if needle in text:
+                return row
+        return None
+
+    def criteria(self) -> List[Tuple[str, Any]]:
+        """``(heading text, following row)`` for every heading row, in document order."""
+        return [(self._titles[heading], row) for heading, row in self._rules.items()]
+
+    def __len__(self) -> int:
+        return len(self._rules)
+
+
+def parse_zone_policies(
+    response_text: str,
+    headings: Optional[Iterable[str]] = None,
+    backend: Optional[HtmlBackend] = None,
+) -> Dict[str, Dict[str, str]]:
+    """Parse the zone policies from the response text.
+
+    Returns ``{heading: {cell heading: narrative}}`` for every requested
+    criterion heading present in the document (e.g. ``"Site coverage" ->
+    {"PO 3.1": ..., "DTS/DPF 3.1": ...}``). Headings missing from this zone
+    are left out. ``headings`` defaults to every heading in ``FIELD_RULES``;
+    ``backend`` defaults to the fastest installed HTML parser.
+    """
+    backend = backend or get_backend()
+    index = PolicyTableIndex(backend.parse(response_text), backend)
+    policies: Dict[str, Dict[str, str]] = {}
+    for heading in headings or POLICY_HEADINGS:
+        next_row = index.rule_row(heading)
+        if next_row is None:
+            continue
+        cells = find_code_in_html(next_row, backend)
+        if cells:
+            policies[heading] = cells
+    return policies
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Rule-based Quantitative Assessment extraction
+# ─────────────────────────────────────────────────────────────────────────────
+_NUMBER = r"(\d+(?:\.\d+)?)"
+_PATTERNS = {
+    "%": re.compile(_NUMBER + r"\s*%"),
+    "m": re.compile(_NUMBER + r"\s*(mm|m|metres?)\b", re.I),
+    "levels": re.compile(_NUMBER + r"\s*(?:building\s+)?(?:levels?|storeys?)\b", re.I),
+    "spaces": re.compile(_NUMBER + r"\s*(?:on-site\s+)?(?:car\s+)?(?:parking\s+)?spaces?\b", re.I),
+}
+_CLAUSE_SPLIT = re.compile(r";|\.\s|\s\([a-z]{1,3}\)\s")
+# Lettered list items, "(a) 900mm or (b) 2m"; an item ending in "or" offers
+# a choice with the one after it.
+_LETTERED_SPLIT = re.compile(r"(?:^|\s)\([a-z]\)\s")
+_ENDS_WITH_OR = re.compile(r"\bor[\s;,:]*$", re.I)
+_WHICHEVER = re.compile(r"whichever\s+is\s+(?:the\s+)?(greater|larger|higher|lesser|less|smaller|lower)\b", re.I)
 
-    values = {}          
 
-    for td in cells:
-        h5 = td.find("h5")                 
-        if not h5:
+@dataclass(frozen=True)
+class FieldRule:
+    """How to read one ``PlanningQuantitativeAssessment`` field from the policy table.
 
-            continue                     
+    ``headings`` are the criterion rows to look under (first match wins);
+    ``keywords`` narrow the search to clauses mentioning any of them (with
+    ``after_keyword`` the value must follow the keyword) and clauses
+    mentioning any of ``exclude`` are skipped.
+    Numeric rules (``unit`` set) produce a ``NumericLimit``; the rest keep the
+    Deemed-to-Satisfy narrative as text.
+    """
+    field: str
+    headings: Tuple[str, ...]
+    unit: Optional[str] = None
+    limit: Literal["max", "min"] = "max"
+    keywords: Tuple[str, ...] = ()
+    after_keyword: bool = False
+    exclude: Tuple[str, ...] = ()
 
-        heading = h5.get_text(strip=True)  
 
-        narrative = " ".join(td.stripped_strings)
+FIELD_RULES: Tuple[FieldRule, ...] = (
+    FieldRule("site_coverage", ("Site coverage",), "%", "max"),
+    FieldRule("building_height_levels", ("Building Height",), "levels", "max"),
+    FieldRule("building_height_m", ("Building Height",), "m", "max", keywords=("height",)),
+    FieldRule("wall_height_m", ("Wall Height", "Building Height"), "m", "max", keywords=("wall height",), after_keyword=True),
+    FieldRule("primary_street_setback_m", ("Primary Street Setback",), "m", "min",
+              exclude=("average", "in front of")),
+    FieldRule("secondary_street_setback", ("Secondary Street Setback",), "m", "min"),
+    FieldRule("lower_side_boundary_wall_height_m", ("Boundary walls",), "m", "max", keywords=("height",)),
+    FieldRule("lower_side_boundary_wall_length_m", ("Boundary walls",), "m", "max", keywords=("length",)),
+    FieldRule("lower_side_clear_setback_m", ("Side boundary setback",), "m", "min"),
+    FieldRule("upper_side_base_setback_m", ("Side boundary setback",), "m", "min", keywords=("plus",)),
+    FieldRule("upper_side_extra_formula", ("Side boundary setback",), keywords=("plus", "1/3")),
+    FieldRule("lower_rear_setback_m", ("Rear boundary setback",), "m", "min", keywords=("first building level", "ground", "lower")),
+    FieldRule("upper_rear_setback_m", ("Rear boundary setback",), "m", "min",
+              keywords=("second building level", "other building level", "upper", "above")),
+    FieldRule("boundary_walls", ("Boundary walls",)),
+    FieldRule("cut_and_fill", ("Earthworks", "Cut and fill")),
+    FieldRule("overlooking", ("Overlooking",)),
+    FieldRule("tree_planting", ("Tree planting",)),
+    FieldRule("streetscape", ("Street appearance", "Appearance")),
+    FieldRule("garage_setback", ("Garage setback", "Garage appearance")),
+    FieldRule("garage_opening", ("Garage opening", "Garage appearance")),
+    FieldRule("driveway_crossover", ("Vehicle access", "Driveway")),
+    FieldRule("private_open_space", ("Private Open Space",)),
+    FieldRule("soft_landscaping", ("Soft Landscaping", "Landscaping")),
+    FieldRule("street_trees", ("Street trees",)),
+    FieldRule("car_parking_spaces", ("Car parking", "Vehicle parking"), "spaces", "min"),
+)
 
-        narrative = narrative.replace(heading, "", 1).strip()
+POLICY_HEADINGS: Tuple[str, ...] = tuple(dict.fromkeys(h for rule in FIELD_RULES for h in rule.headings))
 
-        values[heading] = narrative
 
-    return values
+def _dts_text(cells: Dict[str, str]) -> str:
+    """Prefer the Deemed-to-Satisfy narrative; fall back to every cell's text."""
+    dts = [text for heading, text in cells.items() if heading.upper().startswith("DTS")]
+    return " ".join(dts or cells.values()).strip()
 
 
-def parse_zone_policies(response_text: str) -> dict:
-    """Parse the zone policies from the response text."""
-    soup= BeautifulSoup(response_text, 'html.parser')
-    site_row = soup.find(
-        lambda tag: tag.name == "tr" and "Site coverage" in tag.get_text(strip=True)
-    )
+def _measure(text: str, unit: str, near: Tuple[str, ...] = ()) -> Optional[float]:
+    """First value of ``unit`` in ``text`` (millimetres converted to metres).
 
-    # 2️⃣  Step to the previous sibling <tr>
-    next_row = site_row.find_next("tr")
+    With ``near``, the value closest to one of those words instead, so
+    "within 900mm of a side boundary do not exceed 3200mm in height" reads
+    as a 3.2m height.
+    """
+    matches = list(_PATTERNS[unit].finditer(text))
+    if not matches:
+        return None
+    match = matches[0]
+    lowered = text.lower()
+    spots = [(found.start(), found.end()) for word in near for found in re.finditer(re.escape(word), lowered)]
+    if spots and len(matches) > 1:
+        match = min(matches, key=lambda m: min(max(start - m.end(), m.start() - end, 0) for start, end in spots))
+    value = float(match.group(1))
+    if unit == "m" and match.group(2).lower() == "mm":
+        value = value / 1000
+    return value if value > 0 else None
 
-    site_coverage = find_code_in_html(next_row)
-    print(f"Site coverage: {site_coverage}")
-    building_height = soup.find(
-        lambda tag: tag.name == "tr" and "Building Height" in tag.get_text(strip=True)
-    )
-    next_row = building_height.find_next("tr")
-    building_height = find_code_in_html(next_row)
-    print(f"Building height: {building_height}")
 
-    primary_street_setback= soup.find(
-        lambda tag: tag.name == "tr" and "Primary Street Setback" in tag.get_text(strip=True)   
-    )
-    next_row = primary_street_setback.find_next("tr")
-    primary_street_setback = find_code_in_html(next_row)
-    print(f"Primary Street Setback: {primary_street_setback}")
-    secondary_street_setback = soup.find(
-        lambda tag: tag.name == "tr" and "Secondary Street Setback" in tag.get_text(strip=True)
-    )
-    next_row = secondary_street_setback.find_next("tr")
-    secondary_street_setback = find_code_in_html(next_row)
-    print(f"Secondary Street Setback: {secondary_street_setback}")
-    appearance = soup.find(
-        lambda tag: tag.name == "tr" and "Appearance" in tag.get_text(strip=True)
-    )
-    next_row = appearance.find_next("tr")
-    appearance = find_code_in_html(next_row)
-    print(f"Appearance: {appearance}")
-    ancillary_buildings_and_structures=soup.find(
-        lambda tag: tag.name == "tr" and "Ancillary buildings and structures" in tag.get_text(strip=True)   
-    )
-    next_row = ancillary_buildings_and_structures.find_next("tr")
-    ancillary_buildings_and_structures = find_code_in_html(next_row)
-    print(f"Ancillary Buildings and Structures: {ancillary_buildings_and_structures}")
-    land_use_and_intensity= soup.find(
-        lambda tag: tag.name == "tr" and "Land Use and Intensity" in tag.get_text(strip=True)   
-    )
-    next_row = land_use_and_intensity.find_next("tr")
-    land_use_and_intensity = find_code_in_html(next_row)
-    print(f"Land Use and Intensity: {land_use_and_intensity}")
-    ancillary_buildings_and_structures= soup.find(
-        lambda tag: tag.name == "tr" and "Ancillary buildings and structures" in tag.get_text(strip=True)   
-    )
+def _options(text: str) -> Tuple[List[str], Optional[str]]:
+    """The alternatives ``text`` offers and, from a "whichever is ..." clause, which one applies.
 
+    Alternatives are lettered items joined by "or" ("(a) 900mm or (b) 2m"),
+    or, for a sentence ending in "whichever is the greater", the parts
+    either side of its "or". Returns ``([], None)`` when there's no choice.
+    """
+    whichever = _WHICHEVER.search(text)
+    pick = None
+    if whichever:
+        pick = "max" if whichever.group(1).lower() in ("greater", "larger", "higher") else "min"
+    items = _LETTERED_SPLIT.split(text)[1:]
+    chosen = [n for n, item in enumerate(items[:-1]) if _ENDS_WITH_OR.search(item)]
+    options = [items[n] for n in sorted(set(chosen) | {n + 1 for n in chosen})]
+    if not options and whichever:
+        sentence = re.split(r"[.;:]\s", text[:whichever.start()])[-1]
+        options = re.split(r"\s+or\s+", sentence)
+        options = options if len(options) > 1 else []
+    return options, pick if options else None
 
 
+def _choose(options: List[str], pick: Optional[str], rule: FieldRule) -> Optional[float]:
+    """``rule``'s value from the alternatives ``_options`` found.
 
+    With "whichever is the greater/lesser" that alternative applies, so every
+    alternative has to be a plain measurement, not e.g. "the average setback
+    of buildings on adjoining sites". Otherwise any alternative satisfies the
+    rule and the least restrictive one is the limit: the smallest minimum or
+    the largest maximum, among the alternatives the rule reads from.
+    """
+    if pick is not None:
+        values = [_measure(option, rule.unit) for option in options]
+        if None in values or any("average" in option.lower() for option in options):
+            return None
+        return max(values) if pick == "max" else min(values)
+    values = [_measure(option, rule.unit) for option in options
+              if not any(word in option.lower() for word in rule.exclude)
+              and (not rule.keywords or any(keyword in option.lower() for keyword in rule.keywords))]
+    values = [value for value in values if value is not None]
+    if not values:
+        return None
+    return min(values) if rule.limit == "min" else max(values)
 
+
+def _clauses(text: str, rule: FieldRule) -> Iterator[str]:
+    """Clauses of ``text`` the rule may read from, narrowed by its keywords."""
+    if not rule.keywords and not rule.exclude:
+        yield text
+        return
+    for clause in _CLAUSE_SPLIT.split(text):
+        lowered = clause.lower()
+        if any(word in lowered for word in rule.exclude):
+            continue
+        if not rule.keywords:
+            yield clause.strip()
+            continue
+        positions = [lowered.find(keyword) for keyword in rule.keywords if keyword in lowered]
+        if positions:
+            yield clause[min(positions):].strip() if rule.after_keyword else clause.strip()
+
+
+def _apply_rule(rule: FieldRule, policies: Dict[str, Dict[str, str]]) -> Any:
+    for heading in rule.headings:
+        cells = policies.get(heading)
+        if not cells:
+            continue
+        text = _dts_text(cells)
+        if rule.unit is not None:
+            options, pick = _options(text)
+            if options:
+                value = _choose(options, pick, rule)
+                if value is not None:
+                    return NumericLimit(type=rule.limit, value=value, unit=rule.unit)
+                if pick is not None:
+                    return None  # "whichever is greater" of something we can't measure
+        for clause in _clauses(text, rule):
+            if rule.unit is None:
+                return clause
+            value = _measure(clause, rule.unit, () if rule.after_keyword else rule.keywords)
+            if value is not None:
+                return NumericLimit(type=rule.limit, value=value, unit=rule.unit)
+    return None
+
+
+def extract_quantitative_assessment(
+    response_text: str,
+    backend: Optional[HtmlBackend] = None,
+) -> Tuple[PlanningQuantitativeAssessment, List[str]]:
+    """Fill ``PlanningQuantitativeAssessment`` from the policy HTML without an LLM.
+
+    Returns the assessment and the names of the fields the rules could not
+    resolve, so callers can hand only those to the LLM.
+    """
+    policies = parse_zone_policies(response_text, backend=backend)
+    values: Dict[str, Any] = {}
+    unresolved: List[str] = []
+    for rule in FIELD_RULES:
+        value = _apply_rule(rule, policies)
+        if value is None:
+            unresolved.append(rule.field)
+        else:
+            values[rule.field] = value
+    return PlanningQuantitativeAssessment(**values), unresolved
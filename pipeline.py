@@ -0,0 +1,109 @@
+from __future__ import annotations
+import json
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
+
+from rich import print
+
+from search.address_index import resolve_address
+from search.parcel_index import resolve_coordinates
+from parsers import extract_quantitative_assessment
+from tracing import span
+
+if TYPE_CHECKING:
+    from curl_cffi.requests import AsyncSession
+
+    from models import Address_Search
+    from valuation.zone_cache import ZoneCache, ZonePolicies
+
+
+async def fetch_address(session: AsyncSession, address: str) -> Address_Search:
+    """Resolve ``address`` to its geocoded match, valuation number and location."""
+    address_response = await resolve_address(session, address)
+    valuation_sid = json.loads(address_response.model_dump_json()).get('Valuation', {})
+    print(f"[bold green]Valuation SID:[/bold green] {valuation_sid} from address: [cyan]{address_response.full_address}[/cyan]")
+    return address_response
+
+
+async def fetch_by_address(session: AsyncSession, address: str):
+    return (await fetch_address(session, address)).Valuation
+
+
+async def fetch_by_coordinates(session: AsyncSession, coords: Tuple[float, float]):
+    address_response = await resolve_coordinates(session, coords)
+    valuation_sid = address_response.attributes.Valuation_No
+    print(f"[bold green]Valuation SID:[/bold green] {valuation_sid} from coordinates: [cyan]{coords}[/cyan]")
+    return valuation_sid
+
+
+def first_policy_html(zone_policies: list[list[dict]]) -> str:
+    """Return the ``Content`` HTML of the first fetched zone policy document."""
+    return zone_policies[0][0].get('Content', '') if zone_policies and zone_policies[0] else ''
+
+
+async def assess_policy_html(
+    html: str,
+    use_llm: bool = True,
+    provenance: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """Build the Quantitative Assessment for one policy document.
+
+    The rule-based extractor runs first; the LLM is only asked for the fields
+    the rules left unresolved, and its answers never overwrite rule values.
+    When ``provenance`` is given it receives ``rule_fields`` and
+    ``llm_fields`` (how many fields each extractor filled) and
+    ``llm_source`` ("cache", "llm", or ``None`` if the LLM wasn't asked).
+    """
+    with span("parse.rules", chars=len(html)) as current:
+        assessment, unresolved = extract_quantitative_assessment(html)
+        current.set(unresolved=len(unresolved))
+    result = assessment.model_dump(mode="json")
+    if provenance is not None:
+        provenance.update(rule_fields=sum(value is not None for value in result.values()),
+                          llm_fields=0, llm_source=None)
+    if not unresolved or not use_llm:
+        return result
+
+    from ai_parser.ai_parser import scrape_zone_data
+    from ai_parser.system_prompt import focused_prompt
+
+    llm_result = await scrape_zone_data(html, prompt=focused_prompt(unresolved), provenance=provenance,
+                                        fields=unresolved)
+    filled = [field for field in unresolved if llm_result.get(field) is not None]
+    for field in filled:
+        result[field] = llm_result[field]
+    if provenance is not None:
+        provenance["llm_fields"] = len(filled)
+    return result
+
+
+async def assess_zone(
+    zone: ZonePolicies,
+    use_llm: bool = True,
+    provenance: Optional[Dict[str, Any]] = None,
+    cache: Optional[ZoneCache] = None,
+) -> Optional[Dict[str, Any]]:
+    """Assessment for a parcel's zone, parsed once per zone and reused for the rest.
+
+    The parcel's own TNV values (see ``valuation.tnv``) are added under
+    ``"tnv"``. Returns ``None`` when the zone has no policy document.
+    ``provenance`` also receives ``zone`` and ``zone_cached`` (whether the
+    assessment was reused from an earlier parcel in the same zone).
+    """
+    from valuation.tnv import merge_tnv
+    from valuation.zone_cache import get_default_zone_cache
+
+    html = first_policy_html(zone.documents)
+    if not html:
+        return None
+    if zone.key is None:
+        return merge_tnv(await assess_policy_html(html, use_llm=use_llm, provenance=provenance), zone.zones)
+
+    async def build() -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        built: Dict[str, Any] = {}
+        return await assess_policy_html(html, use_llm=use_llm, provenance=built), built
+
+    cache = get_default_zone_cache() if cache is None else cache
+    assessment, built, cached = await cache.assessment(zone.key, use_llm, build)
+    if provenance is not None:
+        provenance.update(built, zone=zone.key, zone_cached=cached)
+    return merge_tnv(assessment, zone.zones)
@@ -0,0 +1,316 @@
+from __future__ import annotations
+import asyncio
+import random
+import re
+import time
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Dict, Mapping, Optional, Tuple
+from urllib.parse import urlsplit
+
+
+LLM_HOST = "llm"
+
+# What a call attempt turned out to be.
+OK = "ok"                # done; return it
+THROTTLED = "throttled"  # 429/5xx: back off, slow the host down, retry
+RETRY = "retry"          # transient (timeout, connection reset): retry at the same rate
+FAIL = "fail"            # won't get better by retrying; surface it now
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+_THROTTLE_ERROR = re.compile(r"rate.?limit|\b429\b|too many requests|overloaded|\b503\b", re.IGNORECASE)
+_TRANSIENT_ERROR = re.compile(r"timeout|timed out|connection|temporar|reset|\b5\d\d\b", re.IGNORECASE)
+
+
+@dataclass(frozen=True)
+class HostPolicy:
+    """Rate, retry, timeout and circuit-breaker settings for one upstream."""
+    rate: float = 5.0             # starting requests/sec
+    min_rate: float = 0.5
+    max_rate: float = 20.0
+    burst: int = 5
+    increase: float = 0.1         # added to the rate after each success
+    decrease: float = 0.5         # rate multiplier after a 429/5xx
+    timeout: float = 30.0         # seconds per attempt
+    retry_timeouts: bool = True   # False when a timed-out attempt keeps running (and billing) anyway
+    max_retries: int = 4
+    backoff_base: float = 0.5
+    backoff_max: float = 30.0
+    failure_threshold: int = 5    # consecutive failures that open the breaker
+    cooldown: float = 30.0        # seconds the breaker stays open
+
+
+# GeoHub answers small ArcGIS queries quickly and tolerates more parallel
+# load than PlanSA, whose _getpolicies responses are large. LLM calls are
+# slow and billed, so they start low and get fewer retries. A timed-out
+# extraction isn't retried: its graph keeps running in the engine's thread
+# until the LLM answers, so a retry would run and bill the call twice.
+DEFAULT_POLICIES: Dict[str, HostPolicy] = {
+    "lsa1.geohub.sa.gov.au": HostPolicy(rate=10.0, burst=10, max_rate=40.0, timeout=20.0),
+    "lsa2.geohub.sa.gov.au": HostPolicy(rate=10.0, burst=10, max_rate=40.0, timeout=20.0),
+    "code.plan.sa.gov.au": HostPolicy(rate=5.0, burst=5, max_rate=20.0, timeout=30.0),
+    LLM_HOST: HostPolicy(rate=2.0, burst=4, max_rate=10.0, timeout=120.0, max_retries=3, backoff_base=2.0,
+                         retry_timeouts=False),
+}
+
+
+class CircuitOpenError(Exception):
+    """Calls to a host are suspended after repeated failures."""
+
+    def __init__(self, host: str, retry_in: float):
+        super().__init__(f"Circuit open for {host}; retrying in {retry_in:.1f}s")
+        self.host = host
+        self.retry_in = retry_in
+
+
+class TokenBucket:
+    """Token bucket whose refill rate adapts AIMD-style to upstream pushback."""
+
+    def __init__(self, policy: HostPolicy):
+        self.policy = policy
+        self.rate = min(max(policy.rate, policy.min_rate), policy.max_rate)
+        self.tokens = float(policy.burst)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock: Optional[asyncio.Lock] = None
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(float(self.policy.burst), self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self) -> None:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:  # FIFO: waiters are served in arrival order
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def on_success(self) -> None:
+        self.rate = min(self.policy.max_rate, self.rate + self.policy.increase)
+
+    def on_throttle(self) -> None:
+        self.rate = max(self.policy.min_rate, self.rate * self.policy.decrease)
+
+    def pause(self, seconds: float) -> None:
+        """Hold every caller for ``seconds`` (a Retry-After applies to the whole host)."""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+class CircuitBreaker:
+    """Closed -> open after ``failure_threshold`` failures -> one half-open trial after ``cooldown``."""
+
+    def __init__(self, policy: HostPolicy):
+        self.policy = policy
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial = False
+
+    def retry_in(self) -> float:
+        if self.opened_at is None:
+            return 0.0
+        return max(0.0, self.opened_at + self.policy.cooldown - time.monotonic())
+
+    def allow(self) -> bool:
+        if self.opened_at is None:
+            return True
+        if self.retry_in() > 0 or self._trial:
+            return False
+        self._trial = True
+        return True
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+
+    def record_failure(self) -> bool:
+        """Count a failure; returns True if this opened (or re-opened) the breaker."""
+        self.failures += 1
+        was_trial, self._trial = self._trial, False
+        if was_trial or self.failures >= self.policy.failure_threshold:
+            self.opened_at = time.monotonic()
+            return True
+        return False
+
+
+@dataclass
+class HostStats:
+    attempts: int = 0
+    retries: int = 0
+    throttled: int = 0
+    timeouts: int = 0
+    rejected: int = 0
+    breaker_trips: int = 0
+    wait_seconds: float = field(default=0.0, repr=False)
+
+
+def retry_after_seconds(headers: Optional[Mapping[str, str]]) -> Optional[float]:
+    """Parse a ``Retry-After`` header given either as seconds or as an HTTP date."""
+    if not headers:
+        return None
+    value = headers.get("retry-after") or headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def classify_response(response: Any) -> Tuple[str, Optional[float]]:
+    status = getattr(response, "status_code", None)
+    if status in RETRYABLE_STATUS:
+        return THROTTLED, retry_after_seconds(getattr(response, "headers", None))
+    return OK, None
+
+
+def classify_transport_error(exc: BaseException) -> str:
+    """Retry connection-level failures (curl and socket errors); anything else is a bug or bad data."""
+    if isinstance(exc, OSError) or any(cls.__module__.startswith("curl_cffi") for cls in type(exc).__mro__):
+        return RETRY
+    return FAIL
+
+
+def classify_llm_error(exc: BaseException) -> str:
+    text = f"{type(exc).__name__} {exc}"
+    if _THROTTLE_ERROR.search(text):
+        return THROTTLED
+    if _TRANSIENT_ERROR.search(text):
+        return RETRY
+    return FAIL
+
+
+class HostController:
+    """Rate limiter, retry loop and circuit breaker for one upstream host."""
+
+    def __init__(self, host: str, policy: HostPolicy):
+        self.host = host
+        self.policy = policy
+        self.bucket = TokenBucket(policy)
+        self.breaker = CircuitBreaker(policy)
+        self.stats = HostStats()
+
+    def _backoff(self, attempt: int) -> float:
+        # "Full jitter": spreads retries from many callers instead of syncing them.
+        return random.uniform(0, min(self.policy.backoff_max, self.policy.backoff_base * 2 ** attempt))
+
+    async def call(
+        self,
+        factory: Callable[[], Awaitable[Any]],
+        classify: Callable[[Any], Tuple[str, Optional[float]]] = lambda result: (OK, None),
+        classify_error: Callable[[BaseException], str] = classify_transport_error,
+    ) -> Any:
+        """Run ``factory()`` under this host's limits, retrying as ``classify`` directs.
+
+        Exceptions are retried only when ``classify_error`` says so, and
+        timeouts only if the policy allows. When retries run out the last
+        result is returned (so callers keep their own status handling) or
+        the last exception is re-raised.
+        """
+        attempt = 0
+        while True:
+            if not self.breaker.allow():
+                self.stats.rejected += 1
+                raise CircuitOpenError(self.host, self.breaker.retry_in())
+            started = time.monotonic()
+            await self.bucket.acquire()
+            self.stats.wait_seconds += time.monotonic() - started
+            self.stats.attempts += 1
+
+            result, error, retry_after = None, None, None
+            try:
+                result = await asyncio.wait_for(factory(), self.policy.timeout)
+                outcome, retry_after = classify(result)
+            except asyncio.TimeoutError as exc:
+                self.stats.timeouts += 1
+                if not self.policy.retry_timeouts:
+                    if self.breaker.record_failure():
+                        self.stats.breaker_trips += 1
+                    raise
+                outcome, error = RETRY, exc
+            except Exception as exc:
+                outcome, error = classify_error(exc), exc
+
+            if outcome in (OK, FAIL):
+                # A non-retryable error is the request's fault, not the host's.
+                self.breaker.record_success()
+                if outcome == OK:
+                    self.bucket.on_success()
+                if error is not None:
+                    raise error
+                return result
+
+            if outcome == THROTTLED:
+                self.stats.throttled += 1
+                self.bucket.on_throttle()
+                if retry_after:
+                    self.bucket.pause(retry_after)
+            if self.breaker.record_failure():
+                self.stats.breaker_trips += 1
+            if attempt >= self.policy.max_retries or self.breaker.opened_at is not None:
+                if error is not None:
+                    raise error
+                return result
+
+            self.stats.retries += 1
+            await asyncio.sleep(max(retry_after or 0.0, self._backoff(attempt)))
+            attempt += 1
+
+
+_controllers: Dict[str, HostController] = {}
+
+
+def configure_host(host: str, policy: HostPolicy) -> HostController:
+    """Replace the policy (and reset the state) for ``host``."""
+    controller = _controllers[host] = HostController(host, policy)
+    return controller
+
+
+def get_controller(host: str) -> HostController:
+    controller = _controllers.get(host)
+    if controller is None:
+        controller = configure_host(host, DEFAULT_POLICIES.get(host, HostPolicy()))
+    return controller
+
+
+def controllers() -> Dict[str, HostController]:
+    return dict(_controllers)
+
+
+class ResilientSession:
+    """Wraps an ``AsyncSession`` so every ``get`` and ``post`` goes through its host's controller.
+
+    Requests are rate limited per host, retried with jittered backoff on
+    transport errors, timeouts, 429 and 5xx (honouring ``Retry-After``), and
+    refused with ``CircuitOpenError`` while the host's breaker is open.
+    Every other attribute is delegated to the wrapped session.
+    """
+
+    def __init__(self, session: Any):
+        self._session = session
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._session, name)
+
+    async def get(self, url: str, params: Optional[Mapping[str, Any]] = None, **kwargs: Any) -> Any:
+        controller = get_controller(urlsplit(url).hostname or "")
+        return await controller.call(lambda: self._session.get(url, params=params, **kwargs), classify_response)
+
+    async def post(self, url: str, data: Any = None, **kwargs: Any) -> Any:
+        # Only idempotent ArcGIS operations (geocodeAddresses, query) are
+        # posted, so they are retried like a ``get``.
+        controller = get_controller(urlsplit(url).hostname or "")
+        return await controller.call(lambda: self._session.post(url, data=data, **kwargs), classify_response)
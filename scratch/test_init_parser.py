@@ -8,6 +8,8 @@ from typing import Dict, List, Optional, Tuple, Any
 import pandas as pd
 from bs4 import BeautifulSoup
 
+from html_backends import get_backend
+
 
 
 CRITERIA = [
@@ -83,7 +85,7 @@ def parse_tnv_json(path: Path) -> Dict[str, TNVRecord]:
     for item in data.get("List", []):
         if item.get("GroupType", "").lower().startswith("local variation"):
             desc_html = item.get("Description") or ""
-            desc_txt = clean(BeautifulSoup(desc_html, "html.parser").get_text(" ", strip=True))
+            desc_txt = clean(get_backend().html_to_text(desc_html))
             # label before parenthesis
             label = desc_txt.split("(")[0].strip()
             raw_code = item.get("Code") or ""
@@ -0,0 +1,359 @@
+"""Local address index in front of the SAGAF_Valuation geocoder.
+
+Addresses GeoHub has already resolved (or that were imported from a bulk
+export) are kept in SQLite and loaded into memory on open. Lookups try the
+normalized address first and then a trigram index for near-duplicates
+("19 Palmer Street, Prospect" vs "19 PALMER ST PROSPECT SA 5082"), so only
+genuinely new addresses go to the network. The trailing state and
+postcode are left out of the comparison, since either form may carry them.
+A near-duplicate is only used when its street name, street type and
+locality words match the query's, allowing one typo in a long word
+("PALMR"); a close trigram score alone ("9 ELIZABETH AVE" vs "9 ELIZABETH
+ST") would be another property.
+
+    python -m search.address_index --import addresses.csv
+"""
+from __future__ import annotations
+import argparse
+import csv
+import json
+import re
+import sqlite3
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Set, Tuple
+
+from models import Address_Search
+from search.address_search import get_address_candidates
+from tracing import span
+
+if TYPE_CHECKING:
+    from curl_cffi.requests import AsyncSession
+
+
+# Fuzzy matches at or above this score, with the same street and locality
+# words as the query, are used without asking GeoHub.
+DEFAULT_MIN_SCORE = 0.85
+# Words an address may carry or leave out without naming another property.
+OPTIONAL_WORDS = frozenset({"SA"})
+# Words at least this long may differ by one edit ("PALMR"/"PALMER");
+# shorter ones (street types, directions, "HALL"/"HILL") must be exact.
+TYPO_MIN_LENGTH = 5
+# Only the rarest query trigrams are used to gather candidates; common ones
+# ("ST ", " SA") would pull in most of the index. Postings are also split by
+# house number, since a different house number is never a match.
+SEED_TRIGRAMS = 8
+MAX_CANDIDATES = 64
+
+_PUNCTUATION = re.compile(r"[^\w\s/]")
+_WS = re.compile(r"\s+")
+_DIGITS = re.compile(r"\d+")
+_POSTCODE = re.compile(r"\d{4}")
+
+# Long forms GeoHub abbreviates, so "Street"/"St" and "Road"/"Rd" normalize alike.
+ABBREVIATIONS = {
+    "STREET": "ST", "ROAD": "RD", "AVENUE": "AVE", "AV": "AVE", "TERRACE": "TCE", "DRIVE": "DR",
+    "COURT": "CT", "CRESCENT": "CRES", "PLACE": "PL", "PARADE": "PDE", "HIGHWAY": "HWY",
+    "CLOSE": "CL", "BOULEVARD": "BVD", "CIRCUIT": "CCT", "GROVE": "GR", "SQUARE": "SQ",
+    "NORTH": "N", "SOUTH": "S", "EAST": "E", "WEST": "W", "UNIT": "", "LOT": "LT",
+}
+
+
+def normalize_address(address: str) -> str:
+    """Upper-case, drop punctuation, collapse whitespace and abbreviate street types."""
+    text = _WS.sub(" ", _PUNCTUATION.sub(" ", address.upper())).strip()
+    text = text.replace("SOUTH AUSTRALIA", "SA")
+    return " ".join(word for word in (ABBREVIATIONS.get(token, token) for token in text.split(" ")) if word)
+
+
+def trigrams(normalized: str) -> Set[str]:
+    padded = f"  {normalized} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _core(normalized: str) -> str:
+    """``normalized`` without its trailing state and postcode ("... PROSPECT SA 5082" -> "... PROSPECT")."""
+    tokens = normalized.split(" ")
+    while len(tokens) > 2 and (tokens[-1] in OPTIONAL_WORDS or _POSTCODE.fullmatch(tokens[-1])):
+        tokens.pop()
+    return " ".join(tokens)
+
+
+def _house_number(normalized: str) -> str:
+    match = _DIGITS.search(normalized)
+    return match.group(0) if match else ""
+
+
+def _numbers_compatible(query: str, candidate: str) -> bool:
+    """House number must match and every query number must appear in the candidate.
+
+    Trigram similarity alone would happily match 17 PALMER ST to 19 PALMER ST.
+    """
+    wanted = _DIGITS.findall(query)
+    if not wanted:
+        return True
+    present = _DIGITS.findall(candidate)
+    return bool(present) and present[0] == wanted[0] and set(wanted) <= set(present)
+
+
+def _words(normalized: str) -> List[str]:
+    return [token for token in normalized.split(" ")
+            if token not in OPTIONAL_WORDS and not _DIGITS.search(token)]
+
+
+def _one_edit(a: str, b: str) -> bool:
+    """``a`` and ``b`` differ by at most one inserted, deleted or replaced letter."""
+    if abs(len(a) - len(b)) > 1:
+        return False
+    if len(a) > len(b):
+        a, b = b, a
+    for i, (x, y) in enumerate(zip(a, b)):
+        if x != y:
+            return a[i + 1:] == b[i + 1:] if len(a) == len(b) else a[i:] == b[i + 1:]
+    return True
+
+
+def _words_compatible(query: str, candidate: str) -> bool:
+    """Street name, street type and locality words must match, in order.
+
+    Words of ``TYPO_MIN_LENGTH`` or more letters may differ by one edit.
+    Numbers are left to ``_numbers_compatible``; only the state may differ.
+    """
+    wanted, present = _words(query), _words(candidate)
+    return len(wanted) == len(present) and all(
+        a == b or (min(len(a), len(b)) >= TYPO_MIN_LENGTH - 1 and max(len(a), len(b)) >= TYPO_MIN_LENGTH
+                   and _one_edit(a, b))
+        for a, b in zip(wanted, present))
+
+
+# (full_address, latitude, longitude, valuation)
+Row = Tuple[str, float, float, int]
+
+
+def _address(row: Row, score: float) -> Address_Search:
+    full_address, latitude, longitude, valuation = row
+    return Address_Search(full_address=full_address, latitude=latitude, longitude=longitude,
+                          Valuation=valuation, score=score)
+
+
+@dataclass
+class AddressIndexStats:
+    exact: int = 0
+    fuzzy: int = 0
+    misses: int = 0
+    learned: int = 0
+
+
+class AddressIndex:
+    """Normalized-exact and trigram-fuzzy address matching, persisted in SQLite.
+
+    Exact matches are a primary-key lookup. The trigram postings are built
+    in memory on the first lookup that needs them, so a one-off CLI run
+    with a known address never pays for loading the whole index.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.stats = AddressIndexStats()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS addresses ("
+            " normalized TEXT PRIMARY KEY,"
+            " full_address TEXT NOT NULL,"
+            " latitude REAL NOT NULL,"
+            " longitude REAL NOT NULL,"
+            " valuation INTEGER NOT NULL)"
+        )
+        self._conn.commit()
+        self._loaded = False
+        self._keys: List[str] = []
+        self._entries: Dict[str, Row] = {}
+        self._postings: Dict[Tuple[str, str], List[int]] = {}
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM addresses").fetchone()[0]
+
+    def _load(self) -> None:
+        if self._loaded:
+            return
+        for normalized, *row in self._conn.execute(
+            "SELECT normalized, full_address, latitude, longitude, valuation FROM addresses"
+        ):
+            self._remember(normalized, tuple(row))
+        self._loaded = True
+
+    def _remember(self, normalized: str, row: Row) -> None:
+        if normalized not in self._entries:
+            position = len(self._keys)
+            self._keys.append(normalized)
+            house = _house_number(normalized)
+            for gram in trigrams(normalized):
+                self._postings.setdefault((house, gram), []).append(position)
+        self._entries[normalized] = row
+
+    def add(self, address: Address_Search, aliases: Iterable[str] = ()) -> None:
+        """Store ``address`` under its own normalized form and any ``aliases``."""
+        self.add_many([(address, aliases)])
+
+    def add_many(self, entries: Iterable[Tuple[Address_Search, Iterable[str]]]) -> None:
+        rows = []
+        for address, aliases in entries:
+            row = (address.full_address, address.latitude, address.longitude, address.Valuation)
+            for text in (address.full_address, *aliases):
+                normalized = normalize_address(text)
+                if normalized:
+                    rows.append((normalized, *row))
+                    if self._loaded:
+                        self._remember(normalized, row)
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO addresses (normalized, full_address, latitude, longitude, valuation)"
+            " VALUES (?, ?, ?, ?, ?)", rows)
+        self._conn.commit()
+        self.stats.learned += len(rows)
+
+    def exact(self, address: str) -> Optional[Address_Search]:
+        row = self._conn.execute(
+            "SELECT full_address, latitude, longitude, valuation FROM addresses WHERE normalized = ?",
+            (normalize_address(address),),
+        ).fetchone()
+        return None if row is None else _address(row, 1.0)
+
+    def search(self, address: str, limit: int = 5, strict: bool = False) -> List[Address_Search]:
+        """Local candidates for ``address`` with ``score`` in 0-1, best first.
+
+        Scores compare the addresses without state and postcode. With
+        ``strict`` only candidates naming the same street and locality are
+        returned (see ``_words_compatible``).
+        """
+        self._load()
+        normalized = normalize_address(address)
+        core = _core(normalized)
+        query = trigrams(normalized)
+        house = _house_number(normalized)
+        postings = [self._postings[(house, gram)] for gram in query if (house, gram) in self._postings]
+        postings.sort(key=len)
+        counts: Counter = Counter()
+        for posting in postings[:SEED_TRIGRAMS]:
+            counts.update(posting)
+
+        wanted = trigrams(core)
+        scored = []
+        for position, _ in counts.most_common(MAX_CANDIDATES):
+            key = self._keys[position]
+            other_core = _core(key)
+            if not _numbers_compatible(core, other_core) or (strict and not _words_compatible(core, other_core)):
+                continue
+            other = trigrams(other_core)
+            score = 2 * len(wanted & other) / (len(wanted) + len(other))
+            scored.append((score, key))
+        scored.sort(key=lambda item: item[0], reverse=True)
+
+        results, seen = [], set()
+        for score, key in scored:
+            row = self._entries[key]
+            if row[3] in seen:
+                continue  # aliases of one property collapse to its best score
+            seen.add(row[3])
+            results.append(_address(row, round(score, 3)))
+            if len(results) == limit:
+                break
+        return results
+
+    def match(self, address: str, min_score: float = DEFAULT_MIN_SCORE) -> Optional[Address_Search]:
+        """The best local candidate if it is confident enough, counting hits and misses.
+
+        Beyond an exact normalized match, a candidate must score at least
+        ``min_score`` and name the same street and locality.
+        """
+        found = self.exact(address)
+        if found is not None:
+            self.stats.exact += 1
+            return found
+        candidates = self.search(address, limit=1, strict=True)
+        if candidates and candidates[0].score >= min_score:
+            self.stats.fuzzy += 1
+            return candidates[0]
+        self.stats.misses += 1
+        return None
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+_default_index: Optional[AddressIndex] = None
+
+
+def get_default_address_index() -> Optional[AddressIndex]:
+    """The index at ``ADDRESS_INDEX_PATH``, or ``None`` when it is switched off."""
+    global _default_index
+    if _default_index is None:
+        from settings import ADDRESS_INDEX_PATH
+
+        if ADDRESS_INDEX_PATH is None:
+            return None
+        _default_index = AddressIndex(ADDRESS_INDEX_PATH)
+    return _default_index
+
+
+async def resolve_address(
+    session: AsyncSession,
+    address: str,
+    index: Optional[AddressIndex] = None,
+    min_score: float = DEFAULT_MIN_SCORE,
+) -> Address_Search:
+    """Resolve ``address`` locally when possible, otherwise through GeoHub.
+
+    Every GeoHub candidate is added to the index. The query text itself is
+    only stored as an alias when GeoHub's top candidate met ``min_score``, so
+    a poor geocode isn't replayed as if it were exact.
+    """
+    with span("resolve.address") as current:
+        index = get_default_address_index() if index is None else index
+        if index is not None:
+            found = index.match(address, min_score=min_score)
+            if found is not None:
+                current.set(cache_hit=True, score=found.score)
+                return found
+
+        candidates = await get_address_candidates(session, address)
+        best = candidates[0]
+        if index is not None:
+            confident = best.score is None or best.score >= min_score
+            index.add_many([(best, [address] if confident else []), *((candidate, ()) for candidate in candidates[1:])])
+        return best
+
+
+def _import_rows(path: Path) -> Iterable[Address_Search]:
+    with path.open("r", encoding="utf-8", newline="") as f:
+        rows = (json.loads(line) for line in f if line.strip()) if path.suffix.lower() in (".jsonl", ".ndjson") \
+            else csv.DictReader(f)
+        for row in rows:
+            yield Address_Search(
+                full_address=row.get("full_address") or row["address"],
+                latitude=float(row["latitude"]),
+                longitude=float(row["longitude"]),
+                Valuation=int(row.get("Valuation") or row.get("valuation") or row["valuation_sid"]),
+            )
+
+
+def main() -> None:
+    from settings import ADDRESS_INDEX_PATH, CACHE_DIR
+
+    parser = argparse.ArgumentParser(description="Load addresses into the local address index")
+    parser.add_argument("--import", dest="source", type=Path, required=True,
+                        help='CSV or JSONL with "full_address" (or "address"), "latitude", "longitude" and "valuation"')
+    parser.add_argument("--index", type=Path, default=ADDRESS_INDEX_PATH or CACHE_DIR / "addresses.sqlite")
+    args = parser.parse_args()
+
+    index = AddressIndex(args.index)
+    before = len(index)
+    index.add_many((address, ()) for address in _import_rows(args.source))
+    print(f"Address index at {args.index}: {len(index) - before} new, {len(index)} total")
+    index.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,26 +2,33 @@
 
 from __future__ import annotations
 import json
+from typing import TYPE_CHECKING, List
+from http_cache import discard
 from models import Address_Search
-from curl_cffi.requests import AsyncSession
+from settings import GEOHUB_LOCATOR_URL
 from search.address_search_erros import (
     AddressServiceError,
     AddressParseError,
     AddressNotFoundError
 )
 from parsers import _strip_jsonp, _JSONP_CALLBACK
+from tracing import span
 
+if TYPE_CHECKING:
+    from curl_cffi.requests import AsyncSession
 
 
 
 
-async def get_address(session: AsyncSession, address: str) -> Address_Search:
-    """Fetch address details from the remote geocoder.
 
-    Raises one of the custom *Address* exceptions defined above.
+async def get_address_candidates(session: AsyncSession, address: str) -> List[Address_Search]:
+    """Fetch every candidate the remote geocoder returns, best first.
+
+    ``score`` is the geocoder's match score scaled to 0-1. Raises one of
+    the custom *Address* exceptions defined above.
     """
     url = (
-        "https://lsa1.geohub.sa.gov.au/"
+        f"{GEOHUB_LOCATOR_URL}/"
         "arcgis/rest/services/Locators/SAGAF_Valuation/"
         "GeocodeServer/findAddressCandidates"
     )
@@ -34,14 +41,23 @@ async def get_address(session: AsyncSession, address: str) -> Address_Search:
     }
 
     try:
-        response = await session.get(url, params=params, impersonate="chrome")
+        with span("geohub.find_address"):
+            response = await session.get(url, params=params, impersonate="chrome")
     except Exception as exc:  # transport error
         raise AddressServiceError(msg="Couldn't reach address service.", detail=exc) from exc
 
     if getattr(response, "status_code", None) != 200:
         raise AddressServiceError(status_code=response.status_code, detail=response.text)
 
-    raw_body = response.text
+    try:
+        return _parse_candidates(response.text, address)
+    except (AddressNotFoundError, AddressParseError):
+        discard(session, response)  # a no-match or garbled body must not be replayed from the cache
+        raise
+
+
+def _parse_candidates(raw_body: str, address: str) -> List[Address_Search]:
+    """Decode a ``findAddressCandidates`` JSONP body into its candidates."""
     try:
         json_text = _strip_jsonp(raw_body)
         data = json.loads(json_text)
@@ -54,16 +70,28 @@ async def get_address(session: AsyncSession, address: str) -> Address_Search:
     if not candidates:
         raise AddressNotFoundError(address)
 
-    candidate = candidates[0]
-    try:
-        return Address_Search(
-            full_address=candidate["address"],
-            latitude=candidate["location"]["y"],
-            longitude=candidate["location"]["x"],
-            Valuation=candidate["attributes"]["Valuation"],
-        )
-    except Exception as exc:
-        raise AddressParseError(detail=candidate) from exc
+    results = []
+    for candidate in candidates:
+        try:
+            score = candidate.get("score")
+            results.append(Address_Search(
+                full_address=candidate["address"],
+                latitude=candidate["location"]["y"],
+                longitude=candidate["location"]["x"],
+                Valuation=candidate["attributes"]["Valuation"],
+                score=None if score is None else float(score) / 100,
+            ))
+        except Exception as exc:
+            parse_error = exc  # a malformed runner-up shouldn't hide good candidates
+    if not results:
+        raise AddressParseError(detail=candidates[0]) from parse_error
+    return results
 
 
+async def get_address(session: AsyncSession, address: str) -> Address_Search:
+    """Fetch the best match from the remote geocoder.
 
+    Raises one of the custom *Address* exceptions defined above.
+    """
+    candidates = await get_address_candidates(session, address)
+    return candidates[0]
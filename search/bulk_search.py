@@ -0,0 +1,321 @@
+"""Bulk resolution through ArcGIS's batch operations instead of one call per property.
+
+``geocodeAddresses`` on the SAGAF_Valuation locator geocodes a whole batch
+of addresses per request, and the parcel layer's ``query`` returns every
+parcel under a multipoint geometry (or matching a ``where`` clause) in one
+response. Inputs are deduplicated, split into chunks no larger than the
+limit each service advertises (``MaxBatchSize``/``maxRecordCount``), sent
+a few chunks at a time, and mapped back to input order with ``None`` for
+anything that didn't resolve, so callers can fall back per item.
+"""
+from __future__ import annotations
+import asyncio
+import json
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from models import Address_Search, Coordinate_Search
+from search.parcel_index import QUERY_URL, _pick_fields, parcel_record, rings_contain
+from settings import GEOHUB_LOCATOR_URL
+from tracing import span
+
+if TYPE_CHECKING:
+    from curl_cffi.requests import AsyncSession
+
+    from search.address_index import AddressIndex
+    from search.parcel_index import ParcelIndex
+
+
+GEOCODER_URL = f"{GEOHUB_LOCATOR_URL}/arcgis/rest/services/Locators/SAGAF_Valuation/GeocodeServer"
+GEOCODE_ADDRESSES_URL = f"{GEOCODER_URL}/geocodeAddresses"
+PARCEL_LAYER_URL = QUERY_URL.rsplit("/", 1)[0]
+
+# Used when a service's info page doesn't say; both are ArcGIS defaults.
+DEFAULT_GEOCODE_BATCH = 1000
+DEFAULT_QUERY_BATCH = 1000
+# ``VALUATION_NO IN (...)`` clauses are kept well under URL/POST limits.
+MAX_WHERE_VALUES = 250
+DEFAULT_CONCURRENCY = 4
+
+_service_limits: Dict[str, int] = {}
+
+
+async def service_limit(session: AsyncSession, url: str, keys: Sequence[str], default: int) -> int:
+    """The first positive ``keys`` path (dotted) in ``url?f=json``, cached per URL.
+
+    Only an answer the service actually gave is cached. When the info page
+    can't be read (network error, non-200, an ArcGIS ``error`` body), this
+    call uses ``default`` and the next one asks again.
+    """
+    cache_key = f"{url}#{','.join(keys)}"
+    if cache_key in _service_limits:
+        return _service_limits[cache_key]
+    try:
+        response = await session.get(url, params={"f": "json"}, impersonate="chrome")
+        info = response.json() if response.status_code == 200 else None
+    except Exception:
+        info = None
+    if not isinstance(info, dict) or "error" in info:
+        return default
+    limit = default  # the service answered but doesn't advertise a limit
+    for key in keys:
+        value: Any = info
+        for part in key.split("."):
+            value = value.get(part) if isinstance(value, dict) else None
+        if isinstance(value, (int, float)) and value > 0:
+            limit = int(value)
+            break
+    _service_limits[cache_key] = limit
+    return limit
+
+
+def _chunks(items: Sequence[Any], size: int) -> Iterable[Sequence[Any]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+async def _post(session: AsyncSession, url: str, data: Dict[str, str], what: str) -> Dict[str, Any]:
+    response = await session.post(url, data=data, impersonate="chrome")
+    if response.status_code != 200:
+        raise ValueError(f"Error {what}: {response.status_code} - {response.text}")
+    payload = response.json()
+    if "error" in payload:
+        raise ValueError(f"Error {what}: {payload['error']}")
+    return payload
+
+
+async def _gather_bounded(calls: List[Any], concurrency: int) -> List[Any]:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def bounded(call: Any) -> Any:
+        async with semaphore:
+            return await call()
+
+    return await asyncio.gather(*(bounded(call) for call in calls))
+
+
+async def geocode_addresses(
+    session: AsyncSession,
+    addresses: Sequence[str],
+    batch_size: Optional[int] = None,
+    concurrency: int = DEFAULT_CONCURRENCY,
+) -> List[Optional[Address_Search]]:
+    """Geocode many addresses with ``geocodeAddresses``; the result lines up with ``addresses``.
+
+    Unmatched addresses, and matches without a valuation number, map to
+    ``None``. ``score`` is scaled to 0-1 like ``get_address_candidates``.
+    """
+    if concurrency < 1:
+        raise ValueError("concurrency must be at least 1")
+    unique = list(dict.fromkeys(addresses))
+    if not unique:
+        return [None] * len(addresses)
+    size = batch_size or await service_limit(
+        session, GEOCODER_URL, ("locatorProperties.SuggestedBatchSize", "locatorProperties.MaxBatchSize"),
+        DEFAULT_GEOCODE_BATCH)
+
+    async def geocode(start: int, chunk: Sequence[str]) -> Dict[int, Address_Search]:
+        records = [{"attributes": {"OBJECTID": start + n, "SingleLine": address}} for n, address in enumerate(chunk)]
+        with span("geohub.geocode_addresses", records=len(records)):
+            data = await _post(session, GEOCODE_ADDRESSES_URL, {
+                "addresses": json.dumps({"records": records}),
+                "outFields": "Valuation",
+                "outSR": "4326",
+                "f": "json",
+            }, "geocoding addresses")
+        found: Dict[int, Address_Search] = {}
+        for location in data.get("locations") or []:
+            attributes = location.get("attributes") or {}
+            valuation = attributes.get("Valuation")
+            if attributes.get("Status", "M") == "U" or valuation in (None, "") or not location.get("location"):
+                continue
+            score = location.get("score", attributes.get("Score"))
+            found[int(attributes["ResultID"])] = Address_Search(
+                full_address=location.get("address") or attributes.get("Match_addr") or "",
+                latitude=location["location"]["y"],
+                longitude=location["location"]["x"],
+                Valuation=valuation,
+                score=None if score is None else float(score) / 100,
+            )
+        return found
+
+    starts = range(0, len(unique), size)
+    results = await _gather_bounded(
+        [lambda start=start: geocode(start, unique[start:start + size]) for start in starts], concurrency)
+    by_id = {key: value for found in results for key, value in found.items()}
+    by_address = {address: by_id.get(n) for n, address in enumerate(unique)}
+    return [by_address[address] for address in addresses]
+
+
+def _match_points(
+    points: Sequence[Tuple[float, float]],
+    features: List[Dict[str, Any]],
+) -> List[Optional[Dict[str, Any]]]:
+    """The feature whose rings contain each point, bounding boxes first."""
+    import numpy as np
+
+    rings = [(feature.get("geometry") or {}).get("rings") or [] for feature in features]
+    boxes = np.array([
+        (min(x for ring in parcel for x, _ in ring), min(y for ring in parcel for _, y in ring),
+         max(x for ring in parcel for x, _ in ring), max(y for ring in parcel for _, y in ring))
+        if any(parcel) else (np.inf, np.inf, -np.inf, -np.inf)
+        for parcel in rings
+    ], dtype=np.float64).reshape(-1, 4)
+    matched: List[Optional[Dict[str, Any]]] = []
+    for x, y in points:
+        near = ((boxes[:, 0] <= x) & (boxes[:, 1] <= y) & (boxes[:, 2] >= x) & (boxes[:, 3] >= y)).nonzero()[0]
+        matched.append(next((features[i] for i in near.tolist() if rings_contain(rings[i], x, y)), None))
+    return matched
+
+
+async def query_points(
+    session: AsyncSession,
+    lats: Any,
+    lons: Any,
+    batch_size: Optional[int] = None,
+    concurrency: int = DEFAULT_CONCURRENCY,
+) -> List[Optional[Coordinate_Search]]:
+    """Resolve many points with multipoint ``query`` calls on the parcel layer.
+
+    Each request sends up to ``maxRecordCount`` points and gets back the
+    parcels they intersect; points are matched to parcels locally. A chunk
+    whose answer was truncated is split and retried. Points outside the SA
+    map extent or on no parcel map to ``None``.
+    """
+    from search.coordinate_search import transform_points, within_map_extent
+
+    if concurrency < 1:
+        raise ValueError("concurrency must be at least 1")
+    x, y = transform_points(lats, lons)
+    unique: Dict[Tuple[float, float], List[int]] = {}
+    for index in within_map_extent(x, y).nonzero()[0].tolist():
+        unique.setdefault((float(x[index]), float(y[index])), []).append(index)
+    points = list(unique)
+    resolved: List[Optional[Coordinate_Search]] = [None] * len(x)
+    if not points:
+        return resolved
+    size = batch_size or await service_limit(session, PARCEL_LAYER_URL, ("maxRecordCount",), DEFAULT_QUERY_BATCH)
+
+    async def query(chunk: Sequence[Tuple[float, float]]) -> List[Optional[Coordinate_Search]]:
+        with span("geohub.query", points=len(chunk)):
+            data = await _post(session, QUERY_URL, {
+                "f": "json",
+                "where": "1=1",
+                "geometry": json.dumps({"points": [list(point) for point in chunk],
+                                        "spatialReference": {"wkid": 3857}}),
+                "geometryType": "esriGeometryMultipoint",
+                "spatialRel": "esriSpatialRelIntersects",
+                "inSR": "3857",
+                "outSR": "3857",
+                "outFields": "*",
+                "returnGeometry": "true",
+            }, "querying parcels")
+        if data.get("exceededTransferLimit") and len(chunk) > 1:
+            half = len(chunk) // 2
+            first, second = await asyncio.gather(query(chunk[:half]), query(chunk[half:]))
+            return first + second
+        return [None if feature is None else parcel_record(_pick_fields(feature.get("attributes") or {}))
+                for feature in _match_points(chunk, data.get("features") or [])]
+
+    results = await _gather_bounded([lambda chunk=chunk: query(chunk) for chunk in _chunks(points, size)],
+                                    concurrency)
+    for point, found in zip(points, (found for chunk in results for found in chunk)):
+        for index in unique[point]:
+            resolved[index] = found
+    return resolved
+
+
+async def query_valuations(
+    session: AsyncSession,
+    valuation_numbers: Sequence[str],
+    concurrency: int = DEFAULT_CONCURRENCY,
+) -> List[Optional[Coordinate_Search]]:
+    """Parcel attributes for many valuation numbers via ``where VALUATION_NO IN (...)``."""
+    if concurrency < 1:
+        raise ValueError("concurrency must be at least 1")
+    unique = list(dict.fromkeys(str(number) for number in valuation_numbers))
+    if not unique:
+        return [None] * len(valuation_numbers)
+    limit = await service_limit(session, PARCEL_LAYER_URL, ("maxRecordCount",), DEFAULT_QUERY_BATCH)
+    size = min(limit, MAX_WHERE_VALUES)
+
+    async def query(chunk: Sequence[str]) -> Dict[str, Coordinate_Search]:
+        quoted = ",".join("'" + number.replace("'", "''") + "'" for number in chunk)
+        with span("geohub.query", valuations=len(chunk)):
+            data = await _post(session, QUERY_URL, {
+                "f": "json",
+                "where": f"VALUATION_NO IN ({quoted})",
+                "outFields": "*",
+                "returnGeometry": "false",
+            }, "querying parcels")
+        records = (parcel_record(_pick_fields(feature.get("attributes") or {}))
+                   for feature in data.get("features") or [])
+        return {record.value: record for record in records if record.value}
+
+    results = await _gather_bounded([lambda chunk=chunk: query(chunk) for chunk in _chunks(unique, size)],
+                                    concurrency)
+    by_number = {key: value for found in results for key, value in found.items()}
+    return [by_number.get(str(number)) for number in valuation_numbers]
+
+
+async def resolve_addresses(
+    session: AsyncSession,
+    addresses: Sequence[str],
+    index: Optional[AddressIndex] = None,
+    min_score: Optional[float] = None,
+) -> List[Optional[Address_Search]]:
+    """Bulk counterpart of ``resolve_address``: local index first, one batch geocode for the rest.
+
+    Geocoded matches are added to the index, with the query text as an
+    alias only when the match met ``min_score``.
+    """
+    from search.address_index import DEFAULT_MIN_SCORE, get_default_address_index
+
+    min_score = DEFAULT_MIN_SCORE if min_score is None else min_score
+    with span("resolve.addresses", count=len(addresses)) as current:
+        index = get_default_address_index() if index is None else index
+        resolved: List[Optional[Address_Search]] = [None] * len(addresses)
+        pending: Dict[str, List[int]] = {}
+        for n, address in enumerate(addresses):
+            found = index.match(address, min_score=min_score) if index is not None else None
+            if found is not None:
+                resolved[n] = found
+            else:
+                pending.setdefault(address, []).append(n)
+        current.set(cache_hits=len(addresses) - sum(len(rows) for rows in pending.values()))
+
+        queries = list(pending)
+        geocoded = await geocode_addresses(session, queries)
+        learned = []
+        for address, found in zip(queries, geocoded):
+            if found is None:
+                continue
+            for n in pending[address]:
+                resolved[n] = found
+            confident = found.score is None or found.score >= min_score
+            learned.append((found, [address] if confident else []))
+        if index is not None and learned:
+            index.add_many(learned)
+        return resolved
+
+
+async def resolve_points(
+    session: AsyncSession,
+    coordinates: Sequence[Tuple[float, float]],
+    index: Optional[ParcelIndex] = None,
+) -> List[Optional[Coordinate_Search]]:
+    """Bulk counterpart of ``resolve_coordinates``: local parcel index first, multipoint query for the rest."""
+    from search.parcel_index import get_default_parcel_index
+
+    with span("resolve.points", count=len(coordinates)) as current:
+        lats = [lat for lat, _ in coordinates]
+        lons = [lon for _, lon in coordinates]
+        index = get_default_parcel_index() if index is None else index
+        resolved = index.lookup_many(lats, lons) if index is not None else [None] * len(coordinates)
+        missing = [n for n, found in enumerate(resolved) if found is None]
+        current.set(cache_hits=len(coordinates) - len(missing))
+        if missing:
+            queried = await query_points(session, [lats[n] for n in missing], [lons[n] for n in missing])
+            for n, found in zip(missing, queried):
+                resolved[n] = found
+        return resolved
+
@@ -1,25 +1,82 @@
 from __future__ import annotations
-from curl_cffi.requests import AsyncSession
+import asyncio
+from functools import lru_cache
 from models import Coordinate_Search, Attribute
-from typing import Tuple
-from pyproj import Transformer
+from search.address_search_erros import AddressNotFoundError
+from settings import GEOHUB_MAP_URL
+from tracing import span
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
 
+if TYPE_CHECKING:
+    import numpy as np
+    from curl_cffi.requests import AsyncSession
+    from pyproj import Transformer
 
 
-to_3857 = Transformer.from_crs("EPSG:4326", "EPSG:3857", always_xy=True)
-to_4326 = Transformer.from_crs("EPSG:3857", "EPSG:4326", always_xy=True)
+IDENTIFY_URL = f'{GEOHUB_MAP_URL}/arcgis/rest/services/SAPPA/PropertyPlanningAtlasV16/MapServer/identify'
 
+# (xmin, ymin, xmax, ymax) in EPSG:3857 — the South Australia extent sent as
+# ``mapExtent`` with every identify call. Points outside it can't hit a parcel.
+SA_MAP_EXTENT = (12031445.498769322, -5605751.822245056, 17906701.24087955, -860541.106302574)
 
 
-async def get_address(session: AsyncSession, coordinate:Tuple) -> Coordinate_Search:
-    """Fetch address details from the remote geocoder using coordinates.
+@lru_cache(maxsize=None)
+def get_transformer(source: str, target: str) -> Transformer:
+    """Build (once) and return a lon/lat-ordered pyproj transformer.
 
-    Returns a Coordinate_Search object with address details.
+    pyproj and its CRS database are only loaded the first time a coordinate
+    actually needs converting.
     """
+    from pyproj import Transformer
 
-    lat,lon = coordinate
-    x, y = to_3857.transform(lon, lat)
-    params = {
+    return Transformer.from_crs(source, target, always_xy=True)
+
+
+_TRANSFORMERS = {
+    "to_3857": ("EPSG:4326", "EPSG:3857"),
+    "to_4326": ("EPSG:3857", "EPSG:4326"),
+}
+
+
+def __getattr__(name: str):
+    # Keeps ``coordinate_search.to_3857`` / ``to_4326`` working without
+    # building them at import time.
+    if name in _TRANSFORMERS:
+        return get_transformer(*_TRANSFORMERS[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def transform_points(lats: Any, lons: Any) -> Tuple[np.ndarray, np.ndarray]:
+    """Project arrays of WGS84 lat/lon to EPSG:3857 ``(x, y)`` in one pyproj call."""
+    import numpy as np
+
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+    if lats.shape != lons.shape:
+        raise ValueError(f"lat/lon arrays differ in shape: {lats.shape} vs {lons.shape}")
+    x, y = get_transformer("EPSG:4326", "EPSG:3857").transform(lons, lats)
+    return np.asarray(x), np.asarray(y)
+
+
+def points_from_frame(frame: Any, lat_column: str = "lat", lon_column: str = "lon") -> Tuple[np.ndarray, np.ndarray]:
+    """Pull lat/lon columns out of a pandas DataFrame (or any mapping of arrays)."""
+    import numpy as np
+
+    return np.asarray(frame[lat_column], dtype=np.float64), np.asarray(frame[lon_column], dtype=np.float64)
+
+
+def within_map_extent(x: Any, y: Any) -> np.ndarray:
+    """Boolean mask of projected points that fall inside ``SA_MAP_EXTENT`` (NaNs are outside)."""
+    import numpy as np
+
+    x = np.asarray(x)
+    y = np.asarray(y)
+    xmin, ymin, xmax, ymax = SA_MAP_EXTENT
+    return (x >= xmin) & (x <= xmax) & (y >= ymin) & (y <= ymax)
+
+
+def _identify_params(x: float, y: float) -> Dict[str, str]:
+    return {
       'f': 'json',
       'tolerance': '0',
       'returnGeometry': 'false',
@@ -29,22 +86,20 @@ async def get_address(session: AsyncSession, coordinate:Tuple) -> Coordinate_Sea
       'geometry': f'{{"x":{x},"y":{y}}}',
       'geometryType': 'esriGeometryPoint',
       'sr': '3857',
-      'mapExtent': '12031445.498769322, -5605751.822245056, 17906701.24087955, -860541.106302574',
+      'mapExtent': ', '.join(str(bound) for bound in SA_MAP_EXTENT),
       'layers': 'all:43',
     }
-    response =await session.get(
-          'https://lsa2.geohub.sa.gov.au/arcgis/rest/services/SAPPA/PropertyPlanningAtlasV16/MapServer/identify',
-          params=params,
-          impersonate='chrome'
-      )
-    
+
+
+async def _identify(session: AsyncSession, x: float, y: float) -> List[dict]:
+    with span("geohub.identify"):
+        response = await session.get(IDENTIFY_URL, params=_identify_params(x, y), impersonate='chrome')
     if response.status_code != 200:
         raise ValueError(f"Error fetching address data: {response.status_code} - {response.text}")
-    response_json = response.json()
-    result = response_json.get('results', [])
-    if len(result) == 0:
-        raise ValueError(f"No address found for coordinates: {coordinate}")
-    print(result[0])
+    return response.json().get('results', [])
+
+
+def _coordinate_search(result: List[dict]) -> Coordinate_Search:
     return Coordinate_Search(
         layerId= result[0]['layerId'],
         layerName=result[0]['layerName'],
@@ -62,6 +117,59 @@ async def get_address(session: AsyncSession, coordinate:Tuple) -> Coordinate_Sea
     )
 
 
+async def get_address(session: AsyncSession, coordinate:Tuple) -> Coordinate_Search:
+    """Fetch address details from the remote geocoder using coordinates.
+
+    Returns a Coordinate_Search object with address details.
+    """
+
+    lat,lon = coordinate
+    x, y = get_transformer("EPSG:4326", "EPSG:3857").transform(lon, lat)
+    result = await _identify(session, x, y)
+    if len(result) == 0:
+        raise AddressNotFoundError(str(coordinate), f"No address found for coordinates: {coordinate}")
+    print(result[0])
+    return _coordinate_search(result)
+
+
+async def get_addresses(
+    session: AsyncSession,
+    lats: Any,
+    lons: Any,
+    concurrency: int = 8,
+) -> List[Optional[Coordinate_Search]]:
+    """Resolve many points at once; the result lines up with the input arrays.
+
+    All points are projected in one vectorized call, points outside the SA
+    map extent are dropped before any request is made, and duplicate points
+    share one identify call. At most ``concurrency`` calls run at a time.
+    Points outside the extent or without a parcel map to ``None``.
+    """
+    if concurrency < 1:
+        raise ValueError("concurrency must be at least 1")
+
+    x, y = transform_points(lats, lons)
+    inside = within_map_extent(x, y)
+    unique: Dict[Tuple[float, float], List[int]] = {}
+    for index in inside.nonzero()[0].tolist():
+        unique.setdefault((float(x[index]), float(y[index])), []).append(index)
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def resolve(point: Tuple[float, float]) -> Optional[Coordinate_Search]:
+        async with semaphore:
+            result = await _identify(session, *point)
+        return _coordinate_search(result) if result else None
+
+    points = list(unique)
+    found = await asyncio.gather(*(resolve(point) for point in points))
+    resolved: List[Optional[Coordinate_Search]] = [None] * len(x)
+    for point, address in zip(points, found):
+        for index in unique[point]:
+            resolved[index] = address
+    return resolved
+
+
 
 
 
@@ -0,0 +1,428 @@
+"""Offline point-in-parcel index over the PropertyPlanningAtlas parcel layer (43).
+
+The index is a directory of ``.npy`` files opened memory-mapped, so opening
+it is instant and only the pages a lookup touches are read:
+
+    meta.json          grid origin and cell sizes
+    vertices.npy       (V, 2) float64 ring vertices in EPSG:3857
+    ring_offsets.npy   (R + 1,) start of each ring in ``vertices``
+    parcel_rings.npy   (P + 1,) first ring of each parcel
+    bboxes.npy         (P, 4) parcel bounding boxes
+    cell_keys.npy      sorted ids of the non-empty grid cells
+    cell_offsets.npy   (K + 1,) start of each cell's run in ``cell_parcels``
+    cell_parcels.npy   parcel ids per cell, grouped by cell
+    coarse_*.npy       the same three for the coarse grid
+    overflow.npy       parcels too large for either grid, checked by bbox
+    attributes.npy     (P,) structured array of the identify attributes
+
+A parcel is posted to every cell its bounding box covers, on the fine grid
+when that's at most ``MAX_CELLS_PER_PARCEL`` cells, else on a grid
+``COARSE_FACTOR`` times coarser, else to the overflow list. Rural and
+pastoral parcels span thousands of fine cells, so this keeps the postings
+(and the build) proportional to the number of parcels.
+
+Build it once with ``python -m search.parcel_index --output DIR``.
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import math
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from models import Attribute, Coordinate_Search
+from search.coordinate_search import IDENTIFY_URL, SA_MAP_EXTENT, get_address, get_transformer
+from tracing import span
+
+if TYPE_CHECKING:
+    import numpy as np
+    from curl_cffi.requests import AsyncSession
+
+
+QUERY_URL = IDENTIFY_URL.rsplit("/", 1)[0] + "/43/query"
+LAYER_ID = 43
+LAYER_NAME = "Parcels"
+DEFAULT_CELL_SIZE = 100.0
+MAX_CELLS_PER_PARCEL = 64
+COARSE_FACTOR = 64
+
+# Attribute fields kept per parcel, in identify's alias spelling.
+FIELDS = ("Location", "OBJECTID", "Valuation No", "Title Prefix", "Title Volume", "Title Folio")
+
+Ring = Sequence[Tuple[float, float]]
+
+
+@dataclass
+class ParcelIndexStats:
+    hits: int = 0
+    misses: int = 0
+
+
+def _normalize_field(name: str) -> str:
+    return "".join(ch for ch in name.lower() if ch.isalnum())
+
+
+def _pick_fields(attributes: Dict[str, Any]) -> Dict[str, str]:
+    """Map a query/identify attribute dict onto ``FIELDS``.
+
+    ``query`` returns field names (``VALUATION_NO``) where ``identify``
+    returns aliases (``Valuation No``), so both are matched loosely.
+    """
+    by_name = {_normalize_field(key): value for key, value in attributes.items()}
+    return {field: "" if by_name.get(_normalize_field(field)) is None else str(by_name[_normalize_field(field)])
+            for field in FIELDS}
+
+
+def _ring_contains(ring: List[List[float]], x: float, y: float) -> bool:
+    inside = False
+    xj, yj = ring[-1]
+    for xi, yi in ring:
+        if (yi > y) != (yj > y) and x < (xj - xi) * (y - yi) / (yj - yi) + xi:
+            inside = not inside
+        xj, yj = xi, yi
+    return inside
+
+
+def rings_contain(rings: Sequence[Ring], x: float, y: float) -> bool:
+    """Point-in-polygon for an ArcGIS ``rings`` list; even-odd across rings handles holes."""
+    inside = False
+    for ring in rings:
+        if ring and _ring_contains(ring, x, y):
+            inside = not inside
+    return inside
+
+
+def parcel_record(values: Dict[str, str]) -> Coordinate_Search:
+    """A ``Coordinate_Search`` shaped like an ``identify`` hit, from ``FIELDS`` values."""
+    return Coordinate_Search(
+        layerId=LAYER_ID,
+        layerName=LAYER_NAME,
+        displayFieldName="Valuation No",
+        value=values["Valuation No"],
+        attributes=Attribute(
+            Location=values["Location"],
+            OBJECTID=values["OBJECTID"],
+            Shape="Polygon",
+            Valuation_No=values["Valuation No"],
+            Title_Prefix=values["Title Prefix"],
+            Title_Volume=values["Title Volume"],
+            Title_Folio=values["Title Folio"],
+        ),
+    )
+
+
+def _postings(
+    boxes: np.ndarray,
+    parcels: np.ndarray,
+    origin: Tuple[float, float],
+    cell_size: float,
+    columns: int,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """``(cell keys, offsets, parcel ids)`` posting each of ``parcels`` to every cell its bbox covers."""
+    import numpy as np
+
+    first = ((boxes[parcels, :2] - origin) // cell_size).astype(np.int64)
+    last = ((boxes[parcels, 2:] - origin) // cell_size).astype(np.int64)
+    widths = last[:, 0] - first[:, 0] + 1
+    counts = widths * (last[:, 1] - first[:, 1] + 1)
+    # One row per (parcel, cell): n-th cell of a parcel is (n % width, n // width) from its first cell.
+    nth = np.arange(int(counts.sum()), dtype=np.int64) - np.repeat(np.cumsum(counts) - counts, counts)
+    width = np.repeat(widths, counts)
+    keys = ((np.repeat(first[:, 1], counts) + nth // width) * columns
+            + np.repeat(first[:, 0], counts) + nth % width)
+    order = np.argsort(keys, kind="stable")
+    cell_keys, starts = np.unique(keys[order], return_index=True)
+    offsets = np.append(starts, len(keys)).astype(np.int64)
+    return cell_keys, offsets, np.repeat(parcels, counts)[order].astype(np.int32)
+
+
+def _cell_count(boxes: np.ndarray, origin: Tuple[float, float], cell_size: float) -> np.ndarray:
+    import numpy as np
+
+    first = ((boxes[:, :2] - origin) // cell_size).astype(np.int64)
+    last = ((boxes[:, 2:] - origin) // cell_size).astype(np.int64)
+    return np.prod(last - first + 1, axis=1)
+
+
+class ParcelIndex:
+    """Memory-mapped grid index answering "which parcel contains this point?"."""
+
+    def __init__(self, directory: Path):
+        import numpy as np
+
+        self.directory = Path(directory)
+        meta = json.loads((self.directory / "meta.json").read_text(encoding="utf-8"))
+        self.cell_size = float(meta["cell_size"])
+        self.origin_x, self.origin_y = meta["origin"]
+        self.columns = int(meta["columns"])
+        # Indexes built before the coarse grid have everything on the fine one.
+        self.coarse_cell_size = float(meta.get("coarse_cell_size", self.cell_size))
+        self.coarse_columns = int(meta.get("coarse_columns", 1))
+        self.stats = ParcelIndexStats()
+
+        def load(name: str, dtype: str = "int64") -> np.ndarray:
+            # Plain ndarray views of the mapping: slicing an ``np.memmap``
+            # subclass costs several times more per lookup.
+            path = self.directory / f"{name}.npy"
+            if not path.exists():
+                return np.zeros(1 if name == "coarse_offsets" else 0, dtype=dtype)
+            return np.asarray(np.load(path, mmap_mode="r"))
+
+        self.vertices = load("vertices")
+        self.ring_offsets = load("ring_offsets")
+        self.parcel_rings = load("parcel_rings")
+        self.bboxes = load("bboxes")
+        self.cell_keys = load("cell_keys")
+        self.cell_offsets = load("cell_offsets")
+        self.cell_parcels = load("cell_parcels")
+        self.coarse_keys = load("coarse_keys")
+        self.coarse_offsets = load("coarse_offsets")
+        self.coarse_parcels = load("coarse_parcels", "int32")
+        self.overflow = load("overflow", "int32")
+        self.attributes = load("attributes")
+        self._np = np
+
+    def __len__(self) -> int:
+        return len(self.bboxes)
+
+    def _contains(self, parcel: int, x: float, y: float) -> bool:
+        inside = False
+        for ring in range(int(self.parcel_rings[parcel]), int(self.parcel_rings[parcel + 1])):
+            vertices = self.vertices[int(self.ring_offsets[ring]):int(self.ring_offsets[ring + 1])].tolist()
+            if vertices and _ring_contains(vertices, x, y):
+                inside = not inside  # even-odd across rings handles holes
+        return inside
+
+    def _cell(self, keys: np.ndarray, offsets: np.ndarray, parcels: np.ndarray,
+              cell_size: float, columns: int, x: float, y: float) -> np.ndarray:
+        """Parcels posted to the cell of one grid that holds ``(x, y)``."""
+        column = int((x - self.origin_x) // cell_size)
+        if column >= columns:
+            return parcels[:0]
+        key = int((y - self.origin_y) // cell_size) * columns + column
+        position = int(self._np.searchsorted(keys, key))
+        if position >= len(keys) or int(keys[position]) != key:
+            return parcels[:0]
+        return parcels[int(offsets[position]):int(offsets[position + 1])]
+
+    def _first_containing(self, candidates: np.ndarray, x: float, y: float) -> Optional[int]:
+        boxes = self.bboxes[candidates]
+        near = (boxes[:, 0] <= x) & (boxes[:, 1] <= y) & (boxes[:, 2] >= x) & (boxes[:, 3] >= y)
+        for parcel in candidates[near].tolist():
+            if self._contains(parcel, x, y):
+                return parcel
+        return None
+
+    def parcel_at(self, x: float, y: float) -> Optional[int]:
+        """Id of the parcel containing the EPSG:3857 point ``(x, y)``, or ``None``."""
+        if not (math.isfinite(x) and math.isfinite(y)) or x < self.origin_x or y < self.origin_y:
+            return None
+        for candidates in (
+            self._cell(self.cell_keys, self.cell_offsets, self.cell_parcels, self.cell_size, self.columns, x, y),
+            self._cell(self.coarse_keys, self.coarse_offsets, self.coarse_parcels,
+                       self.coarse_cell_size, self.coarse_columns, x, y),
+            self.overflow,
+        ):
+            if len(candidates):
+                parcel = self._first_containing(candidates, x, y)
+                if parcel is not None:
+                    return parcel
+        return None
+
+    def record(self, parcel: int) -> Coordinate_Search:
+        return parcel_record({field: value.decode("utf-8")
+                              for field, value in zip(FIELDS, self.attributes[parcel].tolist())})
+
+    def lookup(self, lat: float, lon: float) -> Optional[Coordinate_Search]:
+        x, y = get_transformer("EPSG:4326", "EPSG:3857").transform(lon, lat)
+        parcel = self.parcel_at(x, y)
+        if parcel is None:
+            self.stats.misses += 1
+            return None
+        self.stats.hits += 1
+        return self.record(parcel)
+
+    def lookup_many(self, lats: Any, lons: Any) -> List[Optional[Coordinate_Search]]:
+        """Resolve arrays of points locally; projection happens in one vectorized call."""
+        from search.coordinate_search import transform_points
+
+        x, y = transform_points(lats, lons)
+        found = []
+        for px, py in zip(x.tolist(), y.tolist()):
+            parcel = self.parcel_at(px, py)
+            if parcel is None:
+                self.stats.misses += 1
+                found.append(None)
+            else:
+                self.stats.hits += 1
+                found.append(self.record(parcel))
+        return found
+
+    @classmethod
+    def build(
+        cls,
+        parcels: Iterable[Tuple[Sequence[Ring], Dict[str, Any]]],
+        directory: Path,
+        cell_size: float = DEFAULT_CELL_SIZE,
+    ) -> ParcelIndex:
+        """Write an index for ``(rings in EPSG:3857, attributes)`` pairs and open it."""
+        import numpy as np
+
+        vertices: List[Tuple[float, float]] = []
+        ring_offsets = [0]
+        parcel_rings = [0]
+        bboxes: List[Tuple[float, float, float, float]] = []
+        attributes: List[Tuple[bytes, ...]] = []
+        for rings, attrs in parcels:
+            rings = [ring for ring in rings if len(ring) >= 3]
+            if not rings:
+                continue
+            for ring in rings:
+                vertices.extend((float(px), float(py)) for px, py in ring)
+                ring_offsets.append(len(vertices))
+            parcel_rings.append(len(ring_offsets) - 1)
+            xs = [px for ring in rings for px, _ in ring]
+            ys = [py for ring in rings for _, py in ring]
+            bboxes.append((min(xs), min(ys), max(xs), max(ys)))
+            attributes.append(tuple(value.encode("utf-8") for value in _pick_fields(attrs).values()))
+
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        boxes = np.asarray(bboxes, dtype=np.float64).reshape(-1, 4)
+        origin = (float(boxes[:, 0].min()), float(boxes[:, 1].min())) if len(boxes) else (0.0, 0.0)
+        width = float(boxes[:, 2].max()) - origin[0] if len(boxes) else 0.0
+        coarse_cell_size = cell_size * COARSE_FACTOR
+        columns = int(width // cell_size) + 1
+        coarse_columns = int(width // coarse_cell_size) + 1
+
+        ids = np.arange(len(boxes), dtype=np.int64)
+        fine = _cell_count(boxes, origin, cell_size) <= MAX_CELLS_PER_PARCEL
+        coarse = ~fine & (_cell_count(boxes, origin, coarse_cell_size) <= MAX_CELLS_PER_PARCEL)
+        grids = {
+            "cell": _postings(boxes, ids[fine], origin, cell_size, columns),
+            "coarse": _postings(boxes, ids[coarse], origin, coarse_cell_size, coarse_columns),
+        }
+
+        widths = [max((len(row[i]) for row in attributes), default=1) or 1 for i in range(len(FIELDS))]
+        table = np.array(attributes, dtype=[(field, f"S{width}") for field, width in zip(FIELDS, widths)])
+
+        np.save(directory / "vertices.npy", np.asarray(vertices, dtype=np.float64).reshape(-1, 2))
+        np.save(directory / "ring_offsets.npy", np.asarray(ring_offsets, dtype=np.int64))
+        np.save(directory / "parcel_rings.npy", np.asarray(parcel_rings, dtype=np.int64))
+        np.save(directory / "bboxes.npy", boxes)
+        for grid, (keys, offsets, owners) in grids.items():
+            np.save(directory / f"{grid}_keys.npy", keys)
+            np.save(directory / f"{grid}_offsets.npy", offsets)
+            np.save(directory / f"{grid}_parcels.npy", owners)
+        np.save(directory / "overflow.npy", ids[~fine & ~coarse].astype(np.int32))
+        np.save(directory / "attributes.npy", table)
+        (directory / "meta.json").write_text(json.dumps({
+            "layer": LAYER_ID,
+            "cell_size": cell_size,
+            "coarse_cell_size": coarse_cell_size,
+            "origin": list(origin),
+            "columns": columns,
+            "coarse_columns": coarse_columns,
+            "parcels": len(boxes),
+        }), encoding="utf-8")
+        return cls(directory)
+
+
+async def fetch_parcels(
+    session: AsyncSession,
+    extent: Tuple[float, float, float, float] = SA_MAP_EXTENT,
+    page_size: int = 1000,
+) -> List[Tuple[List[Ring], Dict[str, Any]]]:
+    """Download every parcel polygon of layer 43 inside ``extent`` (EPSG:3857)."""
+    parcels: List[Tuple[List[Ring], Dict[str, Any]]] = []
+    offset = 0
+    while True:
+        params = {
+            'f': 'json',
+            'where': '1=1',
+            'outFields': '*',
+            'returnGeometry': 'true',
+            'geometry': ','.join(str(bound) for bound in extent),
+            'geometryType': 'esriGeometryEnvelope',
+            'spatialRel': 'esriSpatialRelIntersects',
+            'inSR': '3857',
+            'outSR': '3857',
+            'resultOffset': str(offset),
+            'resultRecordCount': str(page_size),
+        }
+        response = await session.get(QUERY_URL, params=params, impersonate='chrome')
+        if response.status_code != 200:
+            raise ValueError(f"Error fetching parcels: {response.status_code} - {response.text}")
+        data = response.json()
+        if 'error' in data:
+            raise ValueError(f"Error fetching parcels: {data['error']}")
+        features = data.get('features', [])
+        for feature in features:
+            rings = (feature.get('geometry') or {}).get('rings') or []
+            parcels.append((rings, feature.get('attributes') or {}))
+        offset += len(features)
+        if not features or not data.get('exceededTransferLimit'):
+            return parcels
+
+
+_default_index: Optional[ParcelIndex] = None
+
+
+def get_default_parcel_index() -> Optional[ParcelIndex]:
+    """The index at ``PARCEL_INDEX_DIR``, or ``None`` when none has been built."""
+    global _default_index
+    if _default_index is None:
+        from settings import PARCEL_INDEX_DIR
+
+        if not (PARCEL_INDEX_DIR / "meta.json").exists():
+            return None
+        _default_index = ParcelIndex(PARCEL_INDEX_DIR)
+    return _default_index
+
+
+async def resolve_coordinates(
+    session: AsyncSession,
+    coordinate: Tuple[float, float],
+    index: Optional[ParcelIndex] = None,
+) -> Coordinate_Search:
+    """Resolve ``(lat, lon)`` from the local index, falling back to remote ``identify``."""
+    with span("resolve.coordinates") as current:
+        index = get_default_parcel_index() if index is None else index
+        if index is not None:
+            found = index.lookup(*coordinate)
+            if found is not None:
+                current.set(cache_hit=True)
+                return found
+        return await get_address(session, coordinate)
+
+
+async def _build(output: Path, extent: Tuple[float, float, float, float], cell_size: float, page_size: int) -> None:
+    from resilience import ResilientSession
+    from session_helpers import close_session, creat_session
+
+    session = await creat_session()
+    try:
+        parcels = await fetch_parcels(ResilientSession(session), extent, page_size=page_size)
+    finally:
+        await close_session(session)
+    index = ParcelIndex.build(parcels, output, cell_size=cell_size)
+    print(f"Indexed {len(index)} parcels into {output}")
+
+
+def main() -> None:
+    from settings import PARCEL_INDEX_DIR
+
+    parser = argparse.ArgumentParser(description="Export layer 43 parcels into a local point-in-parcel index")
+    parser.add_argument("--output", type=Path, default=PARCEL_INDEX_DIR)
+    parser.add_argument("--extent", nargs=4, type=float, metavar=("XMIN", "YMIN", "XMAX", "YMAX"),
+                        default=SA_MAP_EXTENT, help="EPSG:3857 envelope to export (default: all of SA)")
+    parser.add_argument("--cell-size", type=float, default=DEFAULT_CELL_SIZE, help="Grid cell size in metres")
+    parser.add_argument("--page-size", type=int, default=1000)
+    args = parser.parse_args()
+    asyncio.run(_build(args.output, tuple(args.extent), args.cell_size, args.page_size))
+
+
+if __name__ == "__main__":
+    main()
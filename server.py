@@ -0,0 +1,255 @@
+from __future__ import annotations
+import asyncio
+import json
+import math
+from dataclasses import dataclass, field
+from http import HTTPStatus
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from rich import print
+
+from pipeline import assess_zone, fetch_by_address, fetch_by_coordinates
+from search.address_index import DEFAULT_MIN_SCORE, get_default_address_index
+from search.address_search import get_address_candidates
+from search.address_search_erros import AddressNotFoundError
+from singleflight import SingleFlight, groups
+from tracing import get_tracer, span
+from valuation.zone_cache import ZonePolicies, get_default_zone_cache, get_zone_policies
+
+if TYPE_CHECKING:
+    from curl_cffi.requests import AsyncSession
+
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+MAX_HEADER_LINES = 100
+
+
+class RequestError(Exception):
+    """A request the service can't answer; rendered as a JSON error body."""
+
+    def __init__(self, status: HTTPStatus, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+@dataclass
+class ServiceStats:
+    requests: int = 0
+    errors: int = 0
+    by_route: Dict[str, int] = field(default_factory=dict)
+
+
+class LookupService:
+    """The lookup pipeline kept warm behind one long-lived session.
+
+    Identical lookups that arrive while one is already running share its
+    result instead of repeating the network and LLM work.
+    """
+
+    def __init__(self, session: AsyncSession, use_llm: bool = True):
+        self.session = session
+        self.use_llm = use_llm
+        self.stats = ServiceStats()
+        self.flights = SingleFlight("server")
+
+    def health(self) -> Dict[str, Any]:
+        return {
+            "status": "ok",
+            **self.stats.__dict__,
+            "in_flight": len(self.flights),
+            "saved_calls": {name: group.stats.saved for name, group in [("server", self.flights), *groups().items()]},
+            "zones": get_default_zone_cache().summary(),
+            "timings": get_tracer().summary(),
+        }
+
+    async def valuation_by_address(self, address: str) -> Dict[str, Any]:
+        valuation_sid = await self.flights.do(("address", address.strip().upper()),
+                                             lambda: fetch_by_address(self.session, address))
+        return {"address": address, "valuation_sid": valuation_sid}
+
+    async def valuation_by_coordinates(self, lat: float, lon: float) -> Dict[str, Any]:
+        valuation_sid = await self.flights.do(("coords", lat, lon),
+                                             lambda: fetch_by_coordinates(self.session, (lat, lon)))
+        return {"lat": lat, "lon": lon, "valuation_sid": valuation_sid}
+
+    async def address_candidates(self, address: str) -> Dict[str, Any]:
+        """Every candidate for ``address``: local matches if confident, else GeoHub's list."""
+        index = get_default_address_index()
+        local = index.search(address, strict=True) if index is not None else []
+        if local and local[0].score >= DEFAULT_MIN_SCORE:
+            source, candidates = "local", local
+        else:
+            source = "geohub"
+            candidates = await self.flights.do(("candidates", address.strip().upper()),
+                                              lambda: get_address_candidates(self.session, address))
+        return {"address": address, "source": source,
+                "candidates": [candidate.model_dump() for candidate in candidates]}
+
+    async def zone(self, valuation_sid: str) -> ZonePolicies:
+        return await self.flights.do(("zone", valuation_sid),
+                                    lambda: get_zone_policies(self.session, valuation_sid))
+
+    async def policies(self, valuation_sid: str) -> list[list[dict]]:
+        return (await self.zone(valuation_sid)).documents
+
+    async def assessment(self, valuation_sid: str, use_llm: Optional[bool] = None) -> Dict[str, Any]:
+        use_llm = self.use_llm if use_llm is None else use_llm
+
+        async def run() -> Dict[str, Any]:
+            assessment = await assess_zone(await self.zone(valuation_sid), use_llm=use_llm)
+            if assessment is None:
+                raise RequestError(HTTPStatus.NOT_FOUND, f"No zone policy found for {valuation_sid}")
+            return assessment
+
+        return await self.flights.do(("assessment", valuation_sid, use_llm), run)
+
+
+def _flag(query: Dict[str, list], name: str) -> Optional[bool]:
+    if name not in query:
+        return None
+    return query[name][0].lower() not in ("0", "false", "no")
+
+
+async def route(service: LookupService, method: str, target: str) -> Tuple[str, Any]:
+    """Dispatch one request; returns ``(route name, JSON-able body)``."""
+    if method != "GET":
+        raise RequestError(HTTPStatus.METHOD_NOT_ALLOWED, "Only GET is supported")
+
+    url = urlsplit(target)
+    query = parse_qs(url.query)
+    parts = [unquote(part) for part in url.path.strip("/").split("/") if part]
+
+    if parts == ["health"]:
+        return "health", service.health()
+
+    if parts == ["valuation"]:
+        if "address" in query:
+            if not query["address"][0].strip():
+                raise RequestError(HTTPStatus.BAD_REQUEST, "address must not be empty")
+            return "valuation", await service.valuation_by_address(query["address"][0])
+        if "lat" in query and "lon" in query:
+            try:
+                lat, lon = float(query["lat"][0]), float(query["lon"][0])
+            except ValueError:
+                raise RequestError(HTTPStatus.BAD_REQUEST, "lat and lon must be numbers")
+            if not (math.isfinite(lat) and math.isfinite(lon) and -90 <= lat <= 90 and -180 <= lon <= 180):
+                raise RequestError(HTTPStatus.BAD_REQUEST, "lat and lon must be a point on the map")
+            return "valuation", await service.valuation_by_coordinates(lat, lon)
+        raise RequestError(HTTPStatus.BAD_REQUEST, "Pass either address= or lat= and lon=")
+
+    if parts == ["addresses"]:
+        if "q" not in query or not query["q"][0].strip():
+            raise RequestError(HTTPStatus.BAD_REQUEST, "Pass q=<address>")
+        return "addresses", await service.address_candidates(query["q"][0])
+
+    if len(parts) == 2 and parts[0] == "policies":
+        return "policies", {"valuation_sid": parts[1], "documents": await service.policies(parts[1])}
+
+    if len(parts) == 2 and parts[0] == "assessment":
+        assessment = await service.assessment(parts[1], use_llm=_flag(query, "llm"))
+        return "assessment", {"valuation_sid": parts[1], "assessment": assessment}
+
+    raise RequestError(HTTPStatus.NOT_FOUND, f"No route for {url.path}")
+
+
+def _render(status: HTTPStatus, body: Any, keep_alive: bool) -> bytes:
+    payload = json.dumps(body, default=str).encode("utf-8")
+    head = (
+        f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+        "Content-Type: application/json\r\n"
+        f"Content-Length: {len(payload)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    )
+    return head.encode("ascii") + payload
+
+
+async def _read_request(reader: asyncio.StreamReader) -> Optional[Tuple[str, str, Dict[str, str]]]:
+    request_line = await reader.readline()
+    if not request_line.strip():
+        return None
+    try:
+        method, target, version = request_line.decode("latin-1").split()
+    except ValueError:
+        raise RequestError(HTTPStatus.BAD_REQUEST, "Malformed request line")
+
+    headers: Dict[str, str] = {}
+    for _ in range(MAX_HEADER_LINES):
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    else:
+        raise RequestError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, "Too many headers")
+
+    try:
+        content_length = int(headers.get("content-length") or 0)
+    except ValueError:
+        content_length = -1
+    if content_length < 0:
+        raise RequestError(HTTPStatus.BAD_REQUEST, "Invalid Content-Length")
+    if content_length:
+        await reader.readexactly(content_length)
+    if version == "HTTP/1.0" and headers.get("connection", "").lower() != "keep-alive":
+        headers["connection"] = "close"
+    return method, target, headers
+
+
+def _error_status(error: Exception) -> HTTPStatus:
+    """The status for a failed request: its own for ``RequestError``, 404 when
+    the address or point doesn't exist, and 502 for upstream failures."""
+    if isinstance(error, RequestError):
+        return error.status
+    if isinstance(error, AddressNotFoundError):
+        return HTTPStatus.NOT_FOUND
+    return HTTPStatus.BAD_GATEWAY
+
+
+def make_handler(service: LookupService):
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                keep_alive = False
+                try:
+                    request = await _read_request(reader)
+                    if request is None:
+                        break
+                    method, target, headers = request
+                    keep_alive = headers.get("connection", "").lower() != "close"
+                    service.stats.requests += 1
+                    with span("request", method=method) as current:
+                        name, body = await route(service, method, target)
+                        current.set(route=name)
+                    service.stats.by_route[name] = service.stats.by_route.get(name, 0) + 1
+                    status = HTTPStatus.OK
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except Exception as e:
+                    service.stats.errors += 1
+                    status, body = _error_status(e), {"error": str(e)}
+
+                writer.write(_render(status, body, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        finally:
+            writer.close()
+
+    return handle
+
+
+async def serve(
+    session: AsyncSession,
+    host: str = DEFAULT_HOST,
+    port: int = DEFAULT_PORT,
+    use_llm: bool = True,
+) -> None:
+    """Serve the lookup pipeline over HTTP until cancelled."""
+    service = LookupService(session, use_llm=use_llm)
+    server = await asyncio.start_server(make_handler(service), host, port)
+    print(f"[green]Serving on[/green] http://{host}:{port} "
+          "(GET /valuation?address=… | /valuation?lat=…&lon=… | /addresses?q=… | /policies/{sid} | /assessment/{sid} | /health)")
+    async with server:
+        await server.serve_forever()
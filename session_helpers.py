@@ -1,9 +1,133 @@
 from __future__ import annotations
-from curl_cffi.requests import AsyncSession
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Dict, Mapping, Optional, Set, Tuple
+from urllib.parse import urlsplit
+
+import tracing
+
+if TYPE_CHECKING:
+    from curl_cffi.requests import AsyncSession
+
+
+# Easy handles (concurrent transfers) in the session, and connections kept
+# open per host. Requests beyond the per-host cap queue inside libcurl and
+# take the next free connection instead of handshaking a new one.
+DEFAULT_MAX_CLIENTS = 32
+DEFAULT_MAX_HOST_CONNECTIONS = 8
+DNS_CACHE_SECONDS = 600
+KEEPALIVE_IDLE_SECONDS = 60
+
+
+@dataclass
+class ConnectionStats:
+    """How often requests rode an existing connection instead of opening one."""
+    requests: int = 0
+    new_connections: int = 0
+    handshake_seconds: float = 0.0
+    by_host: Dict[str, Tuple[int, int]] = field(default_factory=dict)  # host -> (requests, new connections)
+    _seen: Set[Tuple[str, int]] = field(default_factory=set, repr=False)
+
+    @property
+    def reused(self) -> int:
+        return self.requests - self.new_connections
+
+    @property
+    def reuse_rate(self) -> float:
+        return self.reused / self.requests if self.requests else 0.0
+
+    def record(self, url: str, response: Any) -> None:
+        from curl_cffi import CurlInfo
+
+        infos: Mapping[Any, Any] = getattr(response, "infos", None) or {}
+        connects = infos.get(CurlInfo.NUM_CONNECTS)
+        if connects is None:
+            # No curl info (e.g. a stub session): a (remote ip, local port)
+            # pair that was seen before must be the same socket.
+            endpoint = (getattr(response, "primary_ip", ""), getattr(response, "local_port", 0))
+            connects = 0 if endpoint in self._seen else 1
+            self._seen.add(endpoint)
+        new = 1 if connects else 0
+        self.requests += 1
+        self.new_connections += new
+        self.handshake_seconds += float(infos.get(CurlInfo.APPCONNECT_TIME) or 0.0)
+        host = urlsplit(url).hostname or ""
+        requests, opened = self.by_host.get(host, (0, 0))
+        self.by_host[host] = (requests + 1, opened + new)
+
+
+class MeteredSession:
+    """Wraps an ``AsyncSession`` and records connection reuse for every ``get`` and ``post``.
+
+    Response sizes are added to the current tracing span as ``bytes``, so
+    only bytes that actually crossed the network are counted. Every other
+    attribute is delegated to the wrapped session.
+    """
+
+    def __init__(self, session: Any):
+        self._session = session
+        self.connections = ConnectionStats()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._session, name)
+
+    async def get(self, url: str, params: Optional[Mapping[str, Any]] = None, **kwargs: Any) -> Any:
+        response = await self._session.get(url, params=params, **kwargs)
+        self.connections.record(url, response)
+        tracing.add("bytes", len(getattr(response, "content", b"") or b""))
+        return response
+
+    async def post(self, url: str, data: Any = None, **kwargs: Any) -> Any:
+        response = await self._session.post(url, data=data, **kwargs)
+        self.connections.record(url, response)
+        tracing.add("bytes", len(getattr(response, "content", b"") or b""))
+        return response
+
+
+async def creat_session(
+    max_clients: int = DEFAULT_MAX_CLIENTS,
+    max_host_connections: int = DEFAULT_MAX_HOST_CONNECTIONS,
+    http2: bool = True,
+) -> MeteredSession:
+    """Create the shared asynchronous HTTP session every client should use.
+
+    One libcurl multi handle backs the session, so all clients share its
+    connection pool and DNS cache. Connections are kept alive, HTTP/2 is
+    negotiated over TLS where the server offers it (with streams multiplexed
+    onto an existing connection rather than opening another), and pooled
+    handles keep their TLS session-ID cache so reconnects resume instead of
+    doing a full handshake.
+    """
+    import asyncio
+
+    from curl_cffi import CurlHttpVersion, CurlInfo, CurlMOpt, CurlOpt
+    from curl_cffi._wrapper import ffi
+    from curl_cffi.aio import AsyncCurl
+    from curl_cffi.requests import AsyncSession
+
+    async_curl = AsyncCurl(loop=asyncio.get_running_loop())
+    # curl_multi_setopt is bound with a ``void *`` value; long options are
+    # passed the way a C vararg call would pass them.
+    async_curl.setopt(CurlMOpt.MAX_HOST_CONNECTIONS, ffi.cast("void *", max_host_connections))
+    async_curl.setopt(CurlMOpt.MAXCONNECTS, ffi.cast("void *", max_clients))
+
+    curl_options = {
+        CurlOpt.DNS_CACHE_TIMEOUT: DNS_CACHE_SECONDS,
+        CurlOpt.TCP_KEEPALIVE: 1,
+        CurlOpt.TCP_KEEPIDLE: KEEPALIVE_IDLE_SECONDS,
+        CurlOpt.TCP_KEEPINTVL: KEEPALIVE_IDLE_SECONDS,
+        CurlOpt.SSL_SESSIONID_CACHE: 1,
+    }
+    if http2:
+        curl_options[CurlOpt.PIPEWAIT] = 1
+    session = AsyncSession(
+        async_curl=async_curl,
+        max_clients=max_clients,
+        http_version=CurlHttpVersion.V2TLS if http2 else CurlHttpVersion.V1_1,
+        curl_options=curl_options,
+        curl_infos=[CurlInfo.NUM_CONNECTS, CurlInfo.APPCONNECT_TIME],
+    )
+    return MeteredSession(session)
 
-async def creat_session() -> AsyncSession:  
-    """Create an asynchronous HTTP session."""
-    return AsyncSession()
 
 async def close_session(session: AsyncSession) -> None:
     """Close the asynchronous HTTP session."""
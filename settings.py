@@ -1,11 +1,35 @@
 from __future__ import annotations
 from dotenv import load_dotenv
+from pathlib import Path
 import os
 
 
 load_dotenv()
 
 
+CACHE_DIR = Path(os.getenv("PLANSA_CACHE_DIR", ".cache"))
+LLM_CACHE_MAX_BYTES = int(os.getenv("PLANSA_LLM_CACHE_MAX_MB", "256")) * 1024 * 1024
+HTTP_CACHE_MAX_BYTES = int(os.getenv("PLANSA_HTTP_CACHE_MAX_MB", "1024")) * 1024 * 1024
+PARCEL_INDEX_DIR = Path(os.getenv("PLANSA_PARCEL_INDEX", CACHE_DIR / "parcels"))
+_address_index = os.getenv("PLANSA_ADDRESS_INDEX", str(CACHE_DIR / "addresses.sqlite"))
+ADDRESS_INDEX_PATH = None if _address_index.lower() in ("", "0", "off", "false") else Path(_address_index)
+
+# Extractions the LLM engine runs at once (one reusable graph each).
+LLM_CONCURRENCY = int(os.getenv("PLANSA_LLM_CONCURRENCY", "8"))
+
+# Document tokens packed into one multi-document LLM request; 0 sends one document per request.
+LLM_BATCH_TOKENS = int(os.getenv("PLANSA_LLM_BATCH_TOKENS", "0"))
+
+# Zones whose policy documents and assessments are kept in memory.
+ZONE_CACHE_MAX_ZONES = int(os.getenv("PLANSA_ZONE_CACHE_ZONES", "128"))
+
+# Upstream base URLs. Point them at a local stand-in (benchmarks/mock_upstream.py)
+# to run the pipeline without network access.
+GEOHUB_LOCATOR_URL = os.getenv("PLANSA_GEOHUB_LOCATOR_URL", "https://lsa1.geohub.sa.gov.au").rstrip("/")
+GEOHUB_MAP_URL = os.getenv("PLANSA_GEOHUB_MAP_URL", "https://lsa2.geohub.sa.gov.au").rstrip("/")
+PLANSA_CODE_URL = os.getenv("PLANSA_CODE_URL", "https://code.plan.sa.gov.au").rstrip("/")
+
+
 LLM_PROVIDER=os.getenv("LLM_PROVIDER", None)
 if LLM_PROVIDER=="openai":
     api_key = os.getenv("OPENAI_API_KEY", None)
@@ -14,6 +38,8 @@ if LLM_PROVIDER=="openai":
         "api_key": api_key,
         "temperature": 0,
     }
+    if os.getenv("OPENAI_BASE_URL"):
+        LLM_CONFIG["base_url"] = os.getenv("OPENAI_BASE_URL")
 elif LLM_PROVIDER=="azure":
     api_key = os.getenv("AZURE_API_KEY", None)
     api_version = os.getenv("AZURE_API_VERSION",None )
@@ -0,0 +1,69 @@
+from __future__ import annotations
+import asyncio
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Hashable, Mapping, Optional, Tuple
+
+
+@dataclass
+class SingleFlightStats:
+    calls: int = 0
+    executed: int = 0
+
+    @property
+    def saved(self) -> int:
+        """Calls answered by joining a request that was already in flight."""
+        return self.calls - self.executed
+
+
+class SingleFlight:
+    """Collapse identical concurrent calls onto one underlying future.
+
+    The first caller for a key starts the work; callers arriving while it is
+    still running await the same result (or exception). Nothing is kept
+    once the call finishes, so this only deduplicates in-flight work; the
+    on-disk caches handle repeats over time. The shared work is shielded,
+    so one caller being cancelled doesn't cancel it for the others.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.stats = SingleFlightStats()
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    async def do(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Any:
+        self.stats.calls += 1
+        future = self._inflight.get(key)
+        if future is None:
+            self.stats.executed += 1
+            future = asyncio.ensure_future(factory())
+            self._inflight[key] = future
+            future.add_done_callback(lambda done: self._finish(key, done))
+        return await asyncio.shield(future)
+
+    def _finish(self, key: Hashable, future: asyncio.Future) -> None:
+        self._inflight.pop(key, None)
+        if not future.cancelled():
+            future.exception()  # every waiter may have been cancelled; don't log it as unretrieved
+
+
+_groups: Dict[str, SingleFlight] = {}
+
+
+def get_group(name: str) -> SingleFlight:
+    """The process-wide group called ``name`` (created on first use)."""
+    group = _groups.get(name)
+    if group is None:
+        group = _groups[name] = SingleFlight(name)
+    return group
+
+
+def groups() -> Dict[str, SingleFlight]:
+    return dict(_groups)
+
+
+def request_key(url: str, params: Optional[Mapping[str, Any]] = None) -> Tuple[str, Tuple[Tuple[str, str], ...]]:
+    """Hashable key for a GET: the URL plus its params in a stable order."""
+    return url, tuple(sorted((str(k), str(v)) for k, v in (params or {}).items()))
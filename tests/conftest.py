@@ -0,0 +1,8 @@
+"""Settings are read at import time, so point them somewhere harmless before any test imports the pipeline."""
+import os
+import tempfile
+
+os.environ.setdefault("PLANSA_CACHE_DIR", tempfile.mkdtemp(prefix="plansa-tests-"))
+os.environ.setdefault("LLM_PROVIDER", "openai")
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("PLANSA_ADDRESS_INDEX", "off")
@@ -0,0 +1,86 @@
+"""``search.address_index``: exact and fuzzy local address matching."""
+import asyncio
+
+import pytest
+
+from models import Address_Search
+from search import address_index as address_index_module
+from search.address_index import AddressIndex, normalize_address, resolve_address
+
+
+def _address(full_address: str, valuation: int) -> Address_Search:
+    return Address_Search(full_address=full_address, latitude=-34.88, longitude=138.59, Valuation=valuation)
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = AddressIndex(tmp_path / "addresses.sqlite")
+    index.add_many([
+        (_address("19 PALMER ST PROSPECT SA 5082", 1915), ()),
+        (_address("17 PALMER ST PROSPECT SA 5082", 1715), ()),
+        (_address("9 ELIZABETH ST NORWOOD SA 5067", 905), ()),
+        (_address("3 HALL ST GOODWOOD SA 5034", 305), ()),
+    ])
+    yield index
+    index.close()
+
+
+def test_normalize_address():
+    assert normalize_address("19 Palmer Street, Prospect, South Australia") == "19 PALMER ST PROSPECT SA"
+
+
+def test_exact_match(index):
+    assert index.match("19 palmer street prospect sa 5082").Valuation == 1915
+    assert index.stats.exact == 1
+
+
+@pytest.mark.parametrize("query, valuation", [
+    ("19 Palmer Street, Prospect", 1915),           # the module docstring's example
+    ("19 PALMER ST PROSPECT 5082", 1915),           # postcode without state
+    ("19 Palmr Street, Prospect SA 5082", 1915),    # one-letter typo in the street
+    ("19 Palmer St Prospct", 1915),                 # ... or in the locality
+    ("9 Elizabeth Street Norwood", 905),
+])
+def test_fuzzy_matches(index, query, valuation):
+    found = index.match(query)
+    assert found is not None and found.Valuation == valuation
+    assert index.stats.fuzzy == 1
+
+
+@pytest.mark.parametrize("query", [
+    "21 Palmer Street, Prospect",        # another house number
+    "9 Elizabeth Avenue Norwood",        # another street type
+    "9 Elizabeth Street Kensington",     # another locality
+    "3 Hill Street Goodwood",            # short words must be exact
+    "19 Plamer Street Prospect",         # transposition is two edits
+])
+def test_other_properties_fall_through(index, query):
+    assert index.match(query) is None
+    assert index.stats.misses == 1
+
+
+def test_alias_matches_query_with_postcode(index):
+    index.add(_address("5 KING WILLIAM ST ADELAIDE SA 5000", 500), aliases=["5 King William Street Adelaide"])
+    assert index.match("5 King William St, Adelaide SA 5000").Valuation == 500
+
+
+def test_search_ranks_and_collapses_aliases(index):
+    index.add(_address("19 PALMER ST PROSPECT SA 5082", 1915), aliases=["19 Palmer Street Prospect"])
+    results = index.search("19 Palmer St Prospect", limit=5)
+    assert [result.Valuation for result in results] == [1915]
+    assert results[0].score == 1.0
+
+
+def test_resolve_learns_into_an_empty_index(tmp_path, monkeypatch):
+    calls = []
+
+    async def get_address_candidates(session, address):
+        calls.append(address)
+        return [_address("19 PALMER ST PROSPECT SA 5082", 1915).model_copy(update={"score": 1.0})]
+
+    monkeypatch.setattr(address_index_module, "get_address_candidates", get_address_candidates)
+    index = AddressIndex(tmp_path / "empty.sqlite")
+    for _ in range(2):
+        assert asyncio.run(resolve_address(None, "19 Palmer Street Prospect", index=index)).Valuation == 1915
+    assert calls == ["19 Palmer Street Prospect"]
+    index.close()
@@ -0,0 +1,53 @@
+"""``batch``: where each result row's coordinates come from."""
+import asyncio
+
+import pytest
+
+import batch
+from batch import BatchItem, BatchStats, process_item
+from exports.flatten import flatten_result
+from models import Address_Search
+
+
+@pytest.fixture(autouse=True)
+def offline_pipeline(monkeypatch):
+    async def fetch_address(session, address):
+        return Address_Search(full_address=address, latitude=-34.88, longitude=138.58, Valuation=123)
+
+    async def fetch_by_coordinates(session, coords):
+        return "456"
+
+    async def get_zone_policies(session, valuation_sid):
+        return None
+
+    async def assess_zone(zone, use_llm=True, provenance=None):
+        return None
+
+    monkeypatch.setattr(batch, "fetch_address", fetch_address)
+    monkeypatch.setattr(batch, "fetch_by_coordinates", fetch_by_coordinates)
+    monkeypatch.setattr(batch, "get_zone_policies", get_zone_policies)
+    monkeypatch.setattr(batch, "assess_zone", assess_zone)
+
+
+def _flat(item: BatchItem):
+    return flatten_result(asyncio.run(process_item(None, item, BatchStats())))
+
+
+def test_address_rows_carry_the_geocoded_location():
+    flat = _flat(BatchItem(row=1, address="19 PALMER ST PROSPECT"))
+    assert (flat["valuation_sid"], flat["lat"], flat["lon"]) == ("123", -34.88, 138.58)
+
+
+def test_bulk_resolved_address_rows_carry_the_bulk_location():
+    flat = _flat(BatchItem(row=1, address="19 PALMER ST PROSPECT", valuation_sid=789, location=(-34.9, 138.6)))
+    assert (flat["valuation_sid"], flat["lat"], flat["lon"]) == ("789", -34.9, 138.6)
+
+
+def test_coordinate_rows_carry_the_input_point():
+    flat = _flat(BatchItem(row=1, coords=(-34.1, 138.2)))
+    assert (flat["valuation_sid"], flat["lat"], flat["lon"]) == ("456", -34.1, 138.2)
+
+
+def test_unresolved_address_rows_have_no_location():
+    flat = _flat(BatchItem(row=1, error="input: row has neither an address nor valid lat/lon"))
+    assert flat["lat"] is None and flat["lon"] is None and flat["error"]
@@ -0,0 +1,110 @@
+"""``ai_parser.batching``: packing documents, and falling back to single extractions."""
+import asyncio
+from typing import Dict, List
+
+import pytest
+
+pytest.importorskip("scrapegraphai")
+
+from ai_parser.batching import ExtractionBatcher, batch_source, parse_batched  # noqa: E402
+from ai_parser.cache import ExtractionCache  # noqa: E402
+
+ANSWER = {"site_coverage": {"type": "max", "value": 60, "unit": "%"}}
+
+
+def _entry(document_id: str, **assessment) -> Dict:
+    return {"document_id": document_id, "assessment": assessment or ANSWER}
+
+
+class FakeRequests:
+    """Replaces ``ExtractionBatcher._request``: answers with ``answer(document_ids)`` and records each request."""
+
+    def __init__(self, answer):
+        self.answer = answer
+        self.requests: List[List[str]] = []
+
+    async def __call__(self, document_ids, jobs):
+        self.requests.append([job.text for job in jobs])
+        result = self.answer(document_ids)
+        if isinstance(result, Exception):
+            raise result
+        return parse_batched(result, document_ids)
+
+
+def _run(batcher: ExtractionBatcher, texts: List[str], cache=None):
+    singles: List[str] = []
+
+    def single(text):
+        async def run():
+            singles.append(text)
+            return {"single": text}
+        return run
+
+    async def main():
+        return await asyncio.gather(*(batcher.extract(text, None, f"key-{text}", cache, single(text))
+                                      for text in texts))
+
+    return asyncio.run(main()), singles
+
+
+def _batcher(answer, **kwargs) -> ExtractionBatcher:
+    batcher = ExtractionBatcher(token_budget=kwargs.pop("token_budget", 1000), max_wait=0.01, **kwargs)
+    batcher._request = FakeRequests(answer)
+    return batcher
+
+
+def test_source_heads_each_document():
+    assert batch_source(["D1", "D2"], ["a", "b"]) == "=== DOCUMENT D1 ===\na\n\n=== DOCUMENT D2 ===\nb"
+
+
+def test_parse_skips_invalid_unknown_and_repeated_entries():
+    raw = {"documents": [_entry("D1"), _entry("D1", site_coverage="TBC"), _entry("D9"),
+                         {"document_id": "D2", "assessment": {"site_coverage": {"type": "max"}}}]}
+    assert list(parse_batched(raw, ["D1", "D2"])) == ["D1"]
+    assert parse_batched({"content": {"documents": [_entry("D2")]}}, ["D1", "D2"]).keys() == {"D2"}
+    assert parse_batched("not json", ["D1"]) == {}
+
+
+def test_concurrent_documents_share_one_request(tmp_path):
+    cache = ExtractionCache(tmp_path / "llm.sqlite")
+    batcher = _batcher(lambda ids: {"documents": [_entry(document_id) for document_id in ids]})
+    results, singles = _run(batcher, ["a", "b", "c"], cache)
+    assert results[0]["site_coverage"]["value"] == 60 and singles == []
+    assert batcher._request.requests == [["a", "b", "c"]]
+    assert cache.get("key-b")["site_coverage"]["value"] == 60  # shared with single-document extractions
+    cache.close()
+
+
+def test_missing_and_invalid_answers_fall_back_to_single_extractions():
+    batcher = _batcher(lambda ids: {"documents": [_entry("D1"), {"document_id": "D2", "assessment": "?"}]})
+    results, singles = _run(batcher, ["a", "b", "c"])
+    assert results[0]["site_coverage"]["value"] == 60
+    assert results[1:] == [{"single": "b"}, {"single": "c"}]
+    assert sorted(singles) == ["b", "c"] and batcher.stats.fallbacks == 2
+
+
+def test_failed_request_falls_back_for_every_document():
+    batcher = _batcher(lambda ids: RuntimeError("context length exceeded"))
+    results, singles = _run(batcher, ["a", "b"])
+    assert results == [{"single": "a"}, {"single": "b"}]
+    assert batcher.stats.failed_requests == 1 and batcher.stats.fallbacks == 2
+
+
+def test_single_extraction_errors_reach_the_caller():
+    batcher = _batcher(lambda ids: {"documents": []})
+
+    async def failing():
+        raise ValueError("LLM answer didn't validate")
+
+    async def main():
+        return await asyncio.gather(batcher.extract("a", None, "key-a", None, failing),
+                                    batcher.extract("b", None, "key-b", None, failing), return_exceptions=True)
+
+    assert all(isinstance(result, ValueError) for result in asyncio.run(main()))
+
+
+def test_budget_splits_requests_and_a_lone_document_goes_alone():
+    batcher = _batcher(lambda ids: {"documents": [_entry(document_id) for document_id in ids]}, token_budget=2)
+    results, singles = _run(batcher, ["one", "two", "three"])
+    assert batcher._request.requests == [["one", "two"]]
+    assert singles == ["three"] and batcher.stats.singles == 1
@@ -0,0 +1,95 @@
+"""``ai_parser.engine``: graph pooling, and what the LLM timeout covers."""
+import asyncio
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("scrapegraphai")
+
+from ai_parser import ai_parser, engine as engine_module  # noqa: E402
+from ai_parser.engine import ExtractionEngine, configure_engine  # noqa: E402
+from resilience import LLM_HOST, DEFAULT_POLICIES, HostPolicy, configure_host  # noqa: E402
+
+
+class FakeGraph:
+    """Stands in for ``SmartScraperGraph``: sleeps ``delay`` seconds, then echoes its source."""
+    delay = 0.1
+    built = 0
+    running = set()
+    overlapped = 0
+    lock = threading.Lock()
+
+    def __init__(self, prompt, source, config, schema):
+        self.prompt, self.source = prompt, source
+        type(self).built += 1
+
+    def run(self):
+        with self.lock:
+            if id(self) in self.running:
+                type(self).overlapped += 1
+            self.running.add(id(self))
+        time.sleep(self.delay)
+        with self.lock:
+            self.running.discard(id(self))
+        return {"source": self.source}
+
+    def get_execution_info(self):
+        return [{"node_name": "TOTAL RESULT", "total_tokens": 7}]
+
+
+@pytest.fixture(autouse=True)
+def fake_graph(monkeypatch):
+    monkeypatch.setattr(engine_module, "SmartScraperGraph", FakeGraph)
+    FakeGraph.built = FakeGraph.overlapped = 0
+    yield
+    configure_host(LLM_HOST, DEFAULT_POLICIES[LLM_HOST])
+
+
+def test_graphs_are_pooled_and_results_stay_in_order():
+    engine = ExtractionEngine(size=3, config={})
+
+    async def run():
+        return await asyncio.gather(*(engine.extract(f"doc {n}", "prompt") for n in range(12)))
+
+    results = asyncio.run(run())
+    assert [result.raw["source"] for result in results] == [f"doc {n}" for n in range(12)]
+    assert results[0].tokens == 7
+    assert FakeGraph.built == 3 and engine.stats.peak_in_flight == 3
+    engine.close()
+
+
+def test_timed_out_graphs_are_not_reused_while_running():
+    engine = ExtractionEngine(size=2, config={})
+
+    async def run():
+        async def impatient(n):
+            try:
+                return await asyncio.wait_for(engine.extract(f"slow {n}", "prompt"), 0.01)
+            except asyncio.TimeoutError:
+                return None
+
+        await asyncio.gather(*(impatient(n) for n in range(4)))
+        return await asyncio.gather(*(engine.extract(f"doc {n}", "prompt") for n in range(4)))
+
+    assert len(asyncio.run(run())) == 4
+    assert FakeGraph.overlapped == 0 and FakeGraph.built <= 2
+    engine.close()
+
+
+def test_waiting_for_a_graph_is_not_timed():
+    # Eight calls queue for one graph; each run takes well under the LLM
+    # timeout, but the queue as a whole takes far longer.
+    engine = configure_engine(1)
+    controller = configure_host(LLM_HOST, HostPolicy(rate=1e6, max_rate=1e6, burst=1000, timeout=0.3,
+                                                     retry_timeouts=False, failure_threshold=2))
+
+    async def run():
+        return await asyncio.gather(*(ai_parser._run_scraper(f"doc {n}", "prompt", None, f"key {n}")
+                                      for n in range(8)))
+
+    results = asyncio.run(run())
+    assert [result["source"] for result in results] == [f"doc {n}" for n in range(8)]
+    assert controller.stats.timeouts == 0 and controller.stats.breaker_trips == 0
+    assert engine.stats.waits == 7
+    engine.close()
@@ -0,0 +1,51 @@
+"""``html_backends``: choosing a backend, and every backend reading markup the same way."""
+import pytest
+
+import html_backends
+from html_backends import BACKENDS, SoupBackend, available_backends, get_backend
+
+NESTED = (
+    "<table><tr><td><table>"
+    "<tr><td><p><strong>Site coverage</strong></p></td></tr>"
+    '<tr><td class="RenderCell Phase3"><h5>PO 3.1</h5><p>Buildings are sited.</p></td>'
+    '<td class="RenderCell Phase3"><h5>DTS/DPF 3.1</h5><p>Coverage does not exceed</p><p>60%</p></td></tr>'
+    "</table></td></tr></table>"
+    "<script>var x = 1;</script>"
+)
+
+
+def test_html_parser_is_always_available_and_the_fastest_comes_first():
+    names = available_backends()
+    assert names[-1] == SoupBackend.name
+    assert names == [name for name in BACKENDS if name in names]
+    assert get_backend().name == names[0]
+
+
+def test_environment_overrides_the_choice(monkeypatch):
+    monkeypatch.setenv("PLANSA_HTML_BACKEND", SoupBackend.name)
+    assert get_backend().name == SoupBackend.name
+
+
+def test_unknown_and_missing_backends(monkeypatch):
+    with pytest.raises(ValueError, match="Unknown HTML backend"):
+        get_backend("html5lib")
+
+    def missing():
+        raise ImportError("No module named 'selectolax'")
+
+    monkeypatch.setitem(BACKENDS, "selectolax", missing)
+    monkeypatch.setattr(html_backends, "_instances", {})
+    assert "selectolax" not in available_backends()
+
+
+@pytest.mark.parametrize("name", available_backends())
+def test_backends_read_rows_cells_and_text_alike(name):
+    backend = get_backend(name)
+    document = backend.parse(NESTED)
+    rows = backend.innermost_rows(document)
+    assert [backend.text(row) for row in rows] == [
+        "Site coverage", "PO 3.1 Buildings are sited. DTS/DPF 3.1 Coverage does not exceed 60%"]
+    assert [backend.has_rule_cells(row) for row in rows] == [False, True]
+    assert backend.rule_cells(rows[1]) == {"PO 3.1": "Buildings are sited.",
+                                           "DTS/DPF 3.1": "Coverage does not exceed 60%"}
+    assert "var x" not in backend.html_to_text(NESTED)
@@ -0,0 +1,145 @@
+"""``http_cache``: TTLs, revalidation, eviction, discarding and offline mode."""
+import asyncio
+import json
+from dataclasses import dataclass, field
+from typing import Any, Dict, List
+
+import pytest
+
+from http_cache import DAY, CachedResponse, CachingSession, HttpCache, OfflineCacheMiss, discard, request_key
+from search import bulk_search
+
+URL = "https://lsa1.geohub.sa.gov.au/server/rest/services/Locators/SAGAF_PLUS/GeocodeServer/findAddressCandidates"
+
+
+@dataclass
+class FakeResponse:
+    status_code: int
+    text: str = "{}"
+    headers: Dict[str, str] = field(default_factory=dict)
+
+    def json(self):
+        return json.loads(self.text)
+
+
+class FakeSession:
+    """Answers every request with the next of ``responses`` and records what was asked."""
+
+    def __init__(self, *responses: FakeResponse):
+        self.responses = list(responses)
+        self.requests: List[Dict[str, Any]] = []
+
+    async def get(self, url, params=None, headers=None, **kwargs):
+        self.requests.append({"method": "GET", "url": url, "params": params, "headers": headers})
+        return self.responses.pop(0)
+
+    async def post(self, url, data=None, **kwargs):
+        self.requests.append({"method": "POST", "url": url, "data": data})
+        return self.responses.pop(0)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = HttpCache(tmp_path / "http.sqlite")
+    yield cache
+    cache.close()
+
+
+def _get(session, params=None):
+    return asyncio.run(session.get(URL, params=params or {"SingleLine": "19 PALMER ST"}))
+
+
+def test_fresh_entry_is_served_without_the_network(cache):
+    upstream = FakeSession(FakeResponse(200, '{"candidates": [1]}'))
+    session = CachingSession(upstream, cache)
+    assert _get(session).text == '{"candidates": [1]}'
+    cached = _get(session)
+    assert cached.from_cache and cached.json() == {"candidates": [1]}
+    assert len(upstream.requests) == 1
+    assert (cache.stats.misses, cache.stats.hits, cache.stats.stored) == (1, 1, 1)
+
+
+def test_uncached_urls_pass_through(cache):
+    upstream = FakeSession(FakeResponse(200), FakeResponse(200))
+    session = CachingSession(upstream, cache)
+    for _ in range(2):
+        asyncio.run(session.get("https://example.com/other"))
+    assert len(upstream.requests) == 2 and cache.stats.stored == 0
+
+
+def test_stale_entry_is_revalidated(cache):
+    upstream = FakeSession(FakeResponse(200, '{"v": 1}', {"etag": '"abc"'}), FakeResponse(304))
+    session = CachingSession(upstream, cache, ttls=((URL, 0.0001),))
+    _get(session)
+    cache.touch(request_key(URL, {"SingleLine": "19 PALMER ST"}), -1)  # expire it
+    assert _get(session).json() == {"v": 1}
+    assert upstream.requests[1]["headers"] == {"If-None-Match": '"abc"'}
+    assert cache.stats.revalidated == 1
+
+
+def test_stale_entry_without_validators_is_refetched(cache):
+    upstream = FakeSession(FakeResponse(200, '{"v": 1}'), FakeResponse(200, '{"v": 2}'))
+    session = CachingSession(upstream, cache)
+    _get(session)
+    cache.touch(request_key(URL, {"SingleLine": "19 PALMER ST"}), -1)
+    assert _get(session).json() == {"v": 2}
+    assert upstream.requests[1]["headers"] is None
+    assert _get(session).json() == {"v": 2} and len(upstream.requests) == 2
+
+
+@pytest.mark.parametrize("url, ttl", [
+    (URL, 7 * DAY),
+    ("https://code.plan.sa.gov.au/home/_getzones?sid=1", DAY),
+    ("https://example.com/other", 0),
+])
+def test_each_endpoint_has_its_own_ttl(cache, url, ttl):
+    assert CachingSession(FakeSession(), cache).ttl_for(url) == ttl
+
+
+def test_error_bodies_can_be_discarded(cache):
+    upstream = FakeSession(FakeResponse(200, '{"status": "error"}'), FakeResponse(200, '{"v": 2}'))
+    session = CachingSession(upstream, cache)
+    discard(session, _get(session))
+    assert cache.stats.discarded == 1
+    assert _get(session).json() == {"v": 2}
+    assert len(upstream.requests) == 2
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = HttpCache(tmp_path / "http.sqlite", max_bytes=25)
+    for key in ("a", "b", "c"):
+        cache.put(key, CachedResponse(url=URL, status_code=200, text="x" * 10), ttl=60)
+    assert cache.get("a") is None
+    assert cache.get("b") is not None and cache.get("c") is not None
+    cache.close()
+
+
+def test_offline_get_miss_raises(cache):
+    session = CachingSession(FakeSession(), cache, offline=True)
+    with pytest.raises(OfflineCacheMiss):
+        _get(session)
+    assert cache.stats.offline_misses == 1
+
+
+def test_offline_post_never_reaches_the_network(cache):
+    upstream = FakeSession(FakeResponse(200))
+    session = CachingSession(upstream, cache, offline=True)
+    with pytest.raises(OfflineCacheMiss):
+        asyncio.run(session.post(URL, data={"addresses": "{}"}))
+    assert upstream.requests == []
+    assert cache.stats.offline_misses == 1
+
+
+def test_online_post_is_passed_through(cache):
+    upstream = FakeSession(FakeResponse(200, '{"locations": []}'))
+    session = CachingSession(upstream, cache)
+    assert asyncio.run(session.post(URL, data={"f": "json"})).text == '{"locations": []}'
+    assert upstream.requests[0]["method"] == "POST" and cache.stats.stored == 0
+
+
+def test_offline_bulk_geocode_fails_without_posting(cache):
+    upstream = FakeSession()
+    session = CachingSession(upstream, cache, offline=True)
+    with pytest.raises(OfflineCacheMiss):
+        asyncio.run(bulk_search.geocode_addresses(session, ["19 PALMER ST PROSPECT SA 5082"], batch_size=10))
+    assert upstream.requests == []
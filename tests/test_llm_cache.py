@@ -0,0 +1,67 @@
+"""``ai_parser.cache``: extraction keys and least-recently-used eviction."""
+import itertools
+
+import pytest
+
+from ai_parser import cache as cache_module
+from ai_parser.cache import ExtractionCache, extraction_key
+
+HTML = "<table>\n  <tr><td>Maximum height</td>\n  <td>2 levels</td></tr>\n</table>"
+
+
+class FakeClock:
+    """``time`` stand-in that advances one second per call, so recency is unambiguous."""
+    ticks = itertools.count()
+
+    @classmethod
+    def time(cls) -> float:
+        return float(next(cls.ticks))
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache_module, "time", FakeClock)
+    cache = ExtractionCache(tmp_path / "llm.sqlite")
+    yield cache
+    cache.close()
+
+
+def test_key_ignores_whitespace_between_tags():
+    reindented = "<table><tr><td>Maximum height</td> <td>2 levels</td></tr></table>"
+    assert extraction_key(HTML, "prompt", "gpt-4o-mini") == extraction_key(reindented, "prompt", "gpt-4o-mini")
+
+
+@pytest.mark.parametrize("changed", [
+    (HTML.replace("2 levels", "3 levels"), "prompt", "gpt-4o-mini", cache_module.SCHEMA_VERSION),
+    (HTML, "other prompt", "gpt-4o-mini", cache_module.SCHEMA_VERSION),
+    (HTML, "prompt", "gpt-4o", cache_module.SCHEMA_VERSION),
+    (HTML, "prompt", "gpt-4o-mini", "older-schema"),
+])
+def test_key_changes_with_content_prompt_model_and_schema(changed):
+    assert extraction_key(*changed) != extraction_key(HTML, "prompt", "gpt-4o-mini")
+
+
+def test_round_trip_and_stats(cache):
+    assert cache.get("k") is None
+    cache.put("k", {"maximum_building_height": {"type": "max", "value": 2, "unit": "levels"}})
+    assert cache.get("k") == {"maximum_building_height": {"type": "max", "value": 2, "unit": "levels"}}
+    summary = cache.summary()
+    assert (summary["entries"], summary["hits"], summary["misses"], summary["hit_rate"]) == (1, 1, 1, 0.5)
+
+
+def test_least_recently_used_entry_is_evicted(cache):
+    cache.max_bytes = 2 * len('{"v": "aaaa"}')
+    cache.put("a", {"v": "aaaa"})
+    cache.put("b", {"v": "bbbb"})
+    assert cache.get("a") is not None  # "b" is now the least recently used
+    cache.put("c", {"v": "cccc"})
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.stats.evictions == 1
+
+
+def test_clear_removes_everything(cache):
+    cache.put("a", {"v": 1})
+    cache.put("b", {"v": 2})
+    assert cache.clear() == 2
+    assert cache.summary()["entries"] == 0
@@ -0,0 +1,78 @@
+"""``benchmarks.mock_upstream``: its answers are ones the real clients accept, end to end."""
+import asyncio
+import json
+from http import HTTPStatus
+
+import pytest
+
+from benchmarks.mock_upstream import LLM_ANSWER, MockUpstream, valuation_for
+from pipeline import assess_zone, fetch_by_address
+from session_helpers import close_session, creat_session
+from settings import GEOHUB_LOCATOR_URL, GEOHUB_MAP_URL, PLANSA_CODE_URL
+from valuation import valuation
+from valuation.zone_cache import ZoneCache, get_zone_policies
+
+
+class RedirectingSession:
+    """Sends requests for the configured upstreams to ``base_url`` instead."""
+
+    def __init__(self, session, base_url: str):
+        self._session = session
+        self.base_url = base_url
+
+    def _url(self, url: str) -> str:
+        for upstream in (GEOHUB_LOCATOR_URL, GEOHUB_MAP_URL, PLANSA_CODE_URL):
+            if url.startswith(upstream):
+                return self.base_url + url[len(upstream):]
+        return url
+
+    async def get(self, url, **kwargs):
+        return await self._session.get(self._url(url), **kwargs)
+
+    async def post(self, url, **kwargs):
+        return await self._session.post(self._url(url), **kwargs)
+
+
+def _respond(upstream: MockUpstream, method: str, target: str, body: bytes = b""):
+    status, _, text = asyncio.run(upstream.respond(method, target, body))
+    return status, text
+
+
+def test_address_to_rule_based_assessment_against_the_mock(monkeypatch):
+    monkeypatch.setattr(valuation, "_host_semaphores", {})
+    upstream = MockUpstream(latency=0.0, jitter=0.0)
+
+    async def main():
+        server = await asyncio.start_server(upstream.handle, "127.0.0.1", 0)
+        session = await creat_session()
+        try:
+            redirected = RedirectingSession(session, f"http://127.0.0.1:{server.sockets[0].getsockname()[1]}")
+            valuation_sid = await fetch_by_address(redirected, "19 Mock St Prospect")
+            zone = await get_zone_policies(redirected, valuation_sid, ZoneCache())
+            return valuation_sid, zone, await assess_zone(zone, use_llm=False, cache=ZoneCache())
+        finally:
+            await close_session(session)
+            server.close()
+            await server.wait_closed()
+
+    valuation_sid, zone, assessment = asyncio.run(main())
+    assert str(valuation_sid) == str(int(valuation_for("19 MOCK ST PROSPECT")))
+    assert len(zone.documents) == 2
+    assert assessment["site_coverage"] is not None
+    assert set(assessment["tnv"]) >= {"minimum_frontage", "maximum_building_height_levels"}
+    assert {"findAddressCandidates", "_getzones", "_getpolicies"} <= set(upstream.stats.by_route)
+
+
+def test_llm_answers_once_per_packed_document():
+    upstream = MockUpstream(llm_latency=0.0, jitter=0.0)
+    request = {"model": "mock", "messages": [{"role": "user", "content": "=== DOCUMENT D1 ===\na\n=== DOCUMENT D2 ===\nb"}]}
+    status, text = _respond(upstream, "POST", "/v1/chat/completions", json.dumps(request).encode())
+    answer = json.loads(json.loads(text)["choices"][0]["message"]["content"])
+    assert status == HTTPStatus.OK
+    assert answer == {"documents": [{"document_id": "D1", "assessment": LLM_ANSWER},
+                                    {"document_id": "D2", "assessment": LLM_ANSWER}]}
+
+
+@pytest.mark.parametrize("target", ["/int/_getnothing", "/elsewhere"])
+def test_unknown_routes_are_404(target):
+    assert _respond(MockUpstream(latency=0.0, jitter=0.0), "GET", target)[0] == HTTPStatus.NOT_FOUND
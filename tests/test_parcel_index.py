@@ -0,0 +1,90 @@
+"""``search.parcel_index``: grid levels, oversized parcels and bad points."""
+import asyncio
+import math
+
+import numpy as np
+import pytest
+
+from search import parcel_index as parcel_index_module
+from search.coordinate_search import get_transformer
+from search.parcel_index import (
+    COARSE_FACTOR, DEFAULT_CELL_SIZE, MAX_CELLS_PER_PARCEL, ParcelIndex, resolve_coordinates,
+)
+
+
+def _square(x: float, y: float, size: float):
+    return [(x, y), (x + size, y), (x + size, y + size), (x, y + size), (x, y)]
+
+
+@pytest.fixture
+def index(tmp_path):
+    parcels = [
+        # Urban lots, one fine cell or so each.
+        ([_square(0, 0, 20)], {"Valuation No": "0000000001"}),
+        ([_square(20, 0, 20)], {"Valuation No": "0000000002"}),
+        # A farm spanning hundreds of fine cells: coarse grid.
+        ([_square(1_000, 0, 3_000)], {"Valuation No": "0000000003"}),
+        # A pastoral lease too big even for the coarse grid: overflow list.
+        ([_square(10_000, 0, 200_000)], {"Valuation No": "0000000004"}),
+        # A lot with a hole in it.
+        ([_square(0, 100, 50), _square(10, 110, 10)], {"Valuation No": "0000000005"}),
+    ]
+    return ParcelIndex.build(parcels, tmp_path)
+
+
+def _valuation(index, x, y):
+    parcel = index.parcel_at(x, y)
+    return None if parcel is None else index.record(parcel).attributes.Valuation_No
+
+
+@pytest.mark.parametrize("x, y, expected", [
+    (10, 10, "0000000001"),
+    (30, 10, "0000000002"),
+    (2_500, 1_500, "0000000003"),
+    (150_000, 100_000, "0000000004"),
+    (5, 105, "0000000005"),
+    (15, 115, None),          # in the hole
+    (500, 500, None),         # between parcels
+    (-1, 10, None),           # west of the index
+    (1e9, 10, None),          # east of the index
+])
+def test_parcel_at(index, x, y, expected):
+    assert _valuation(index, x, y) == expected
+
+
+@pytest.mark.parametrize("x, y", [(math.nan, 10), (10, math.nan), (math.inf, 10), (10, -math.inf)])
+def test_non_finite_points_miss(index, x, y):
+    assert index.parcel_at(x, y) is None
+
+
+def test_postings_stay_bounded(index):
+    # Every parcel lands on exactly one level, and none is posted to more
+    # than MAX_CELLS_PER_PARCEL cells.
+    fine = np.bincount(index.cell_parcels, minlength=len(index))
+    coarse = np.bincount(index.coarse_parcels, minlength=len(index))
+    overflow = np.bincount(index.overflow, minlength=len(index))
+    assert ((fine > 0).astype(int) + (coarse > 0) + (overflow > 0)).tolist() == [1] * len(index)
+    assert max(fine.max(), coarse.max()) <= MAX_CELLS_PER_PARCEL
+    assert index.overflow.tolist() == [3]
+    assert index.coarse_cell_size == DEFAULT_CELL_SIZE * COARSE_FACTOR
+
+
+def test_resolve_falls_back_to_identify_only_for_misses(index, tmp_path, monkeypatch):
+    asked = []
+
+    async def get_address(session, coordinate):
+        asked.append(coordinate)
+        return "identify"
+
+    def no_default():
+        raise AssertionError("the index passed in should be used")
+
+    monkeypatch.setattr(parcel_index_module, "get_address", get_address)
+    monkeypatch.setattr(parcel_index_module, "get_default_parcel_index", no_default)
+    lon, lat = get_transformer("EPSG:3857", "EPSG:4326").transform(10, 10)
+    found = asyncio.run(resolve_coordinates(None, (lat, lon), index=index))
+    assert found.attributes.Valuation_No == "0000000001" and asked == []
+
+    empty = ParcelIndex.build([], tmp_path / "empty")
+    assert asyncio.run(resolve_coordinates(None, (lat, lon), index=empty)) == "identify"
+    assert asked == [(lat, lon)]
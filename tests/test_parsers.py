@@ -0,0 +1,139 @@
+"""Rule-based extraction (``parsers.FIELD_RULES``) against policy ``Content`` HTML.
+
+``fixtures/general_neighbourhood.html`` is the Quantitative Assessment table
+of a General Neighbourhood Zone ``_getpolicies`` document. Clauses other
+zones word differently are checked one criterion at a time.
+"""
+from pathlib import Path
+
+import pytest
+
+from ai_parser.output_class import NumericLimit
+from html_backends import SoupBackend, available_backends, get_backend
+from parsers import PolicyTableIndex, extract_quantitative_assessment, parse_zone_policies
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+
+def _content(heading: str, dts: str) -> str:
+    """One criterion in the ``Content`` markup: a heading row, then its PO and DTS/DPF cells."""
+    return (
+        '<table class="RenderTable Policy"><tbody>'
+        f'<tr><td colspan="2" class="RenderHeading"><p><strong>{heading}</strong></p></td></tr>'
+        '<tr><td class="RenderCell Phase3"><h5>PO 1.1</h5><p>Performance outcome.</p></td>'
+        f'<td class="RenderCell Phase3"><h5>DTS/DPF 1.1</h5>{dts}</td></tr>'
+        '</tbody></table>'
+    )
+
+
+@pytest.fixture(scope="module")
+def general_neighbourhood():
+    return (FIXTURES / "general_neighbourhood.html").read_text(encoding="utf-8")
+
+
+@pytest.mark.parametrize("field, expected", [
+    ("site_coverage", NumericLimit(type="max", value=60, unit="%")),
+    ("building_height_levels", NumericLimit(type="max", value=2, unit="levels")),
+    ("building_height_m", NumericLimit(type="max", value=9, unit="m")),
+    ("wall_height_m", NumericLimit(type="max", value=7, unit="m")),
+    # (a) and (b) are relative to the neighbours' building lines; only (c) is a number.
+    ("primary_street_setback_m", NumericLimit(type="min", value=5, unit="m")),
+    # "(a) 900mm or (b) 2m": either satisfies, so the smaller minimum, in metres.
+    ("secondary_street_setback", NumericLimit(type="min", value=0.9, unit="m")),
+    ("lower_side_boundary_wall_height_m", NumericLimit(type="max", value=3, unit="m")),
+    ("lower_side_boundary_wall_length_m", NumericLimit(type="max", value=11.5, unit="m")),
+    ("lower_side_clear_setback_m", NumericLimit(type="min", value=0.9, unit="m")),
+    ("upper_side_base_setback_m", NumericLimit(type="min", value=0.9, unit="m")),
+    ("lower_rear_setback_m", NumericLimit(type="min", value=3, unit="m")),
+    ("upper_rear_setback_m", NumericLimit(type="min", value=5, unit="m")),
+])
+def test_general_neighbourhood_limits(general_neighbourhood, field, expected):
+    assessment, unresolved = extract_quantitative_assessment(general_neighbourhood)
+    assert getattr(assessment, field) == expected
+    assert field not in unresolved
+
+
+def test_general_neighbourhood_text_fields(general_neighbourhood):
+    assessment, unresolved = extract_quantitative_assessment(general_neighbourhood)
+    assert assessment.boundary_walls.startswith("Except where the dwelling is located on a central site")
+    assert "11.5m in length" in assessment.boundary_walls
+    assert assessment.upper_side_extra_formula.startswith("other than for a wall facing a southern side boundary")
+    assert "overlooking" in unresolved and "car_parking_spaces" in unresolved
+
+
+@pytest.mark.parametrize("backend", available_backends())
+def test_backends_agree(general_neighbourhood, backend):
+    expected = extract_quantitative_assessment(general_neighbourhood, backend=get_backend(SoupBackend.name))
+    assert extract_quantitative_assessment(general_neighbourhood, backend=get_backend(backend)) == expected
+
+
+def test_policy_cells(general_neighbourhood):
+    policies = parse_zone_policies(general_neighbourhood, headings=["Secondary Street Setback"])
+    assert list(policies["Secondary Street Setback"]) == ["PO 7.1", "DTS/DPF 7.1"]
+    assert policies["Secondary Street Setback"]["DTS/DPF 7.1"].endswith("(a) 900mm or (b) 2m")
+
+
+@pytest.mark.parametrize("heading, dts, field, expected", [
+    # Alternatives in either order: the least restrictive minimum.
+    ("Secondary Street Setback",
+     "<p>Building walls are set back from the secondary street boundary no less than:</p><p>(a) 2m or</p><p>(b) 900mm</p>",
+     "secondary_street_setback", NumericLimit(type="min", value=0.9, unit="m")),
+    # ... unless the clause says which one applies.
+    ("Secondary Street Setback",
+     "<p>Building walls are set back from the secondary street boundary no less than:</p>"
+     "<p>(a) 900mm or</p><p>(b) 2m,</p><p>whichever is the greater.</p>",
+     "secondary_street_setback", NumericLimit(type="min", value=2, unit="m")),
+    ("Primary Street Setback",
+     "<p>Buildings are set back at least 8m or 6000mm from the primary street boundary, whichever is the lesser.</p>",
+     "primary_street_setback_m", NumericLimit(type="min", value=6, unit="m")),
+    ("Rear Boundary Setback",
+     "<p>Dwelling walls are set back from the rear boundary at least 3m or 20% of the depth of the site, "
+     "whichever is greater.</p>",
+     "lower_rear_setback_m", None),
+    # Relative to the neighbours: nothing to read, left to the LLM.
+    ("Primary Street Setback",
+     "<p>Buildings are set back from the primary street boundary at least the average setback of the "
+     "buildings on the adjoining sites or 8m, whichever is the lesser.</p>",
+     "primary_street_setback_m", None),
+    ("Primary Street Setback",
+     "<p>The building line of a building set back from the primary street boundary is no more than 1m in "
+     "front of the average setback to the building line of existing buildings on adjoining sites.</p>",
+     "primary_street_setback_m", None),
+    # Millimetres, and a height that isn't the first measurement in the clause.
+    ("Boundary Walls",
+     "<p>Dwellings with side boundary walls satisfy (a) or (b) below:</p>"
+     "<p>(a) side boundary walls adjoin a boundary wall of a building on adjoining land</p>"
+     "<p>(b) side boundary walls located within 900mm of a side boundary do not exceed 3200mm in height "
+     "from the top of footings</p>",
+     "lower_side_boundary_wall_height_m", NumericLimit(type="max", value=3.2, unit="m")),
+])
+def test_clauses(heading, dts, field, expected):
+    assessment, unresolved = extract_quantitative_assessment(_content(heading, dts))
+    assert getattr(assessment, field) == expected
+    assert (field in unresolved) == (expected is None)
+
+
+def _index(html: str) -> PolicyTableIndex:
+    backend = get_backend(SoupBackend.name)
+    return PolicyTableIndex(backend.parse(html), backend)
+
+
+def test_index_maps_each_heading_to_its_rule_row():
+    html = _content("Site  Coverage", "<p>60%</p>") + _content("Building Height", "<p>2 levels</p>") \
+        + _content("Site Coverage", "<p>a later duplicate</p>")
+    index = _index(html)
+    assert [title for title, _ in index.criteria()] == ["Site Coverage", "Building Height"]
+    assert len(index) == 2  # rule rows aren't headings, and the first duplicate wins
+    cells = get_backend(SoupBackend.name).rule_cells(index.rule_row("site coverage"))
+    assert cells["DTS/DPF 1.1"] == "60%"
+
+
+def test_index_falls_back_to_the_first_heading_containing_the_name():
+    index = _index(_content("Building Height (Levels)", "<p>2 levels</p>"))
+    assert index.rule_row("building height") is index.rule_row("Building Height (Levels)") is not None
+    assert index.rule_row("Site Coverage") is None
+
+
+def test_missing_headings_are_left_out(general_neighbourhood):
+    policies = parse_zone_policies(general_neighbourhood, headings=["Site coverage", "No such criterion"])
+    assert list(policies) == ["Site coverage"]
@@ -0,0 +1,129 @@
+"""``resilience``: error classification, retries and the circuit breaker."""
+import asyncio
+import time
+from email.utils import formatdate
+
+import pytest
+
+from resilience import (
+    FAIL, OK, RETRY, THROTTLED, CircuitOpenError, HostController, HostPolicy,
+    classify_llm_error, classify_response, classify_transport_error, retry_after_seconds,
+)
+
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+def _controller(**overrides) -> HostController:
+    settings = dict(rate=1000.0, burst=1000, max_rate=1000.0, backoff_base=0.0, max_retries=2,
+                    failure_threshold=3, cooldown=60.0, timeout=1.0)
+    settings.update(overrides)
+    return HostController("test", HostPolicy(**settings))
+
+
+def _call(controller, *outcomes, classify=classify_response, classify_error=classify_transport_error):
+    """Run ``controller.call`` over a factory that yields (or raises) each of ``outcomes`` in turn."""
+    remaining = list(outcomes)
+
+    async def factory():
+        outcome = remaining.pop(0)
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return outcome
+
+    return asyncio.run(controller.call(factory, classify, classify_error))
+
+
+def test_transport_errors_are_retried_and_bugs_are_not():
+    curl_error = type("ConnectionError", (Exception,), {"__module__": "curl_cffi.requests.exceptions"})
+    assert classify_transport_error(ConnectionResetError()) == RETRY
+    assert classify_transport_error(curl_error("Recv failure")) == RETRY
+    assert classify_transport_error(KeyError("Valuation")) == FAIL
+    assert classify_transport_error(ValueError("Error fetching address data: 503")) == FAIL
+
+
+@pytest.mark.parametrize("error, outcome", [
+    (Exception("RateLimitError: Error code: 429"), THROTTLED),
+    (Exception("The model is overloaded"), THROTTLED),
+    (Exception("Request timed out"), RETRY),
+    (Exception("Connection reset by peer"), RETRY),
+    (ValueError("1 validation error for PlanningQuantitativeAssessment"), FAIL),
+])
+def test_llm_errors(error, outcome):
+    assert classify_llm_error(error) == outcome
+
+
+def test_response_classification_and_retry_after():
+    assert classify_response(FakeResponse(200)) == (OK, None)
+    assert classify_response(FakeResponse(404)) == (OK, None)
+    assert classify_response(FakeResponse(503, {"Retry-After": "2"})) == (THROTTLED, 2.0)
+    assert 8 <= retry_after_seconds({"retry-after": formatdate(time.time() + 10, usegmt=True)}) <= 10
+    assert retry_after_seconds({"retry-after": "soon"}) is None
+
+
+def test_transient_errors_are_retried_until_success():
+    controller = _controller()
+    response = FakeResponse(200)
+    assert _call(controller, ConnectionResetError(), FakeResponse(503), response) is response
+    assert (controller.stats.attempts, controller.stats.retries, controller.stats.throttled) == (3, 2, 1)
+    assert controller.breaker.failures == 0
+
+
+def test_non_retryable_errors_surface_at_once_without_tripping_the_breaker():
+    controller = _controller(failure_threshold=1)
+    with pytest.raises(KeyError):
+        _call(controller, KeyError("Valuation"))
+    assert controller.stats.attempts == 1
+    assert controller.breaker.opened_at is None
+
+
+def test_last_response_is_returned_when_retries_run_out():
+    controller = _controller(failure_threshold=10)
+    assert _call(controller, *(FakeResponse(503) for _ in range(3))).status_code == 503
+    assert controller.stats.attempts == 3
+
+
+def test_breaker_opens_then_allows_one_trial_after_cooldown():
+    controller = _controller(max_retries=5, cooldown=0.05)
+    with pytest.raises(ConnectionResetError):
+        _call(controller, *(ConnectionResetError() for _ in range(3)))
+    assert controller.stats.breaker_trips == 1
+    with pytest.raises(CircuitOpenError):
+        _call(controller, FakeResponse(200))
+
+    time.sleep(0.06)
+    assert controller.breaker.allow()
+    assert not controller.breaker.allow()  # only one trial at a time
+    controller.breaker.record_failure()
+    assert controller.breaker.retry_in() > 0  # a failed trial re-opens it
+
+
+def test_timeouts_are_not_retried_when_the_policy_says_so():
+    controller = _controller(timeout=0.01, retry_timeouts=False)
+    started = []
+
+    async def slow():
+        started.append(1)
+        await asyncio.sleep(1)
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(controller.call(slow, classify_error=classify_llm_error))
+    assert len(started) == 1 and controller.stats.timeouts == 1
+    assert controller.breaker.failures == 1
+
+
+def test_timeouts_are_retried_by_default():
+    controller = _controller(timeout=0.01)
+    calls = []
+
+    async def slow_then_fast():
+        calls.append(1)
+        if len(calls) == 1:
+            await asyncio.sleep(1)
+        return "done"
+
+    assert asyncio.run(controller.call(slow_then_fast)) == "done"
+    assert controller.stats.timeouts == 1 and controller.stats.retries == 1
@@ -0,0 +1,123 @@
+"""``server``: routing and the status each kind of failure is answered with."""
+import asyncio
+import json
+from http import HTTPStatus
+from typing import List
+
+import pytest
+
+from search.address_search_erros import AddressNotFoundError, AddressServiceError
+from server import LookupService, RequestError, make_handler
+
+
+class FakeService(LookupService):
+    """A ``LookupService`` whose lookups answer from a dict instead of the network."""
+
+    def __init__(self):
+        super().__init__(session=None, use_llm=False)
+
+    async def valuation_by_address(self, address):
+        if address == "NOWHERE":
+            raise AddressNotFoundError(address)
+        if address == "DOWN":
+            raise AddressServiceError(status_code=503)
+        return {"address": address, "valuation_sid": "123"}
+
+    async def valuation_by_coordinates(self, lat, lon):
+        return {"lat": lat, "lon": lon, "valuation_sid": "456"}
+
+    async def assessment(self, valuation_sid, use_llm=None):
+        raise RequestError(HTTPStatus.NOT_FOUND, f"No zone policy found for {valuation_sid}")
+
+
+class FakeWriter:
+    def __init__(self):
+        self.written: List[bytes] = []
+        self.closed = False
+
+    def write(self, data: bytes) -> None:
+        self.written.append(data)
+
+    async def drain(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+
+def _exchange(raw: bytes, service=None):
+    """Feed ``raw`` to the handler; returns ``[(status, body), ...]`` for each response written."""
+    async def run():
+        reader = asyncio.StreamReader()
+        reader.feed_data(raw)
+        reader.feed_eof()
+        writer = FakeWriter()
+        await make_handler(service or FakeService())(reader, writer)
+        assert writer.closed
+        return writer.written
+
+    responses = []
+    for response in asyncio.run(run()):
+        head, _, payload = response.partition(b"\r\n\r\n")
+        responses.append((int(head.split()[1]), json.loads(payload)))
+    return responses
+
+
+def _get(target: str, service=None):
+    [response] = _exchange(f"GET {target} HTTP/1.1\r\nConnection: close\r\n\r\n".encode(), service)
+    return response
+
+
+def test_valuation_by_address():
+    assert _get("/valuation?address=19%20PALMER%20ST") == (200, {"address": "19 PALMER ST", "valuation_sid": "123"})
+
+
+def test_valuation_by_coordinates():
+    status, body = _get("/valuation?lat=-34.88&lon=138.58")
+    assert status == 200 and body["valuation_sid"] == "456"
+
+
+@pytest.mark.parametrize("target", [
+    "/valuation",
+    "/valuation?address=%20",
+    "/valuation?lat=north&lon=138.58",
+    "/valuation?lat=nan&lon=138.58",
+    "/valuation?lat=-34.88&lon=inf",
+    "/valuation?lat=-134.88&lon=138.58",
+    "/addresses",
+])
+def test_bad_parameters_are_400(target):
+    assert _get(target)[0] == 400
+
+
+def test_missing_address_is_404():
+    status, body = _get("/valuation?address=NOWHERE")
+    assert status == 404 and "NOWHERE" in body["error"]
+
+
+def test_missing_zone_policy_and_unknown_route_are_404():
+    assert _get("/assessment/789")[0] == 404
+    assert _get("/nothing/here")[0] == 404
+
+
+def test_upstream_failure_is_502():
+    assert _get("/valuation?address=DOWN")[0] == 502
+
+
+def test_only_get_is_allowed():
+    [(status, _)] = _exchange(b"POST /valuation HTTP/1.1\r\nContent-Length: 2\r\nConnection: close\r\n\r\n{}")
+    assert status == 405
+
+
+@pytest.mark.parametrize("length", ["ten", "-1"])
+def test_invalid_content_length_is_400(length):
+    [(status, body)] = _exchange(f"GET /health HTTP/1.1\r\nContent-Length: {length}\r\n\r\n".encode())
+    assert status == 400 and body == {"error": "Invalid Content-Length"}
+
+
+def test_keep_alive_answers_each_request():
+    service = FakeService()
+    responses = _exchange(b"GET /valuation?address=A HTTP/1.1\r\n\r\n"
+                          b"GET /valuation?address=NOWHERE HTTP/1.1\r\n\r\n", service)
+    assert [status for status, _ in responses] == [200, 404]
+    assert service.stats.requests == 2 and service.stats.errors == 1
@@ -0,0 +1,52 @@
+"""``session_helpers``: the shared session reuses its connections."""
+import asyncio
+
+from benchmarks.mock_upstream import MockUpstream
+from session_helpers import ConnectionStats, MeteredSession, close_session, creat_session
+
+
+class FakeResponse:
+    def __init__(self, primary_ip="127.0.0.1", local_port=50000, content=b"{}"):
+        self.primary_ip, self.local_port, self.content = primary_ip, local_port, content
+
+
+def test_connections_are_told_apart_by_socket_without_curl_infos():
+    stats = ConnectionStats()
+    for port in (50000, 50000, 50001):
+        stats.record("https://code.plan.sa.gov.au/int/_getzones", FakeResponse(local_port=port))
+    assert (stats.requests, stats.new_connections, stats.reused) == (3, 2, 1)
+    assert stats.by_host == {"code.plan.sa.gov.au": (3, 2)}
+
+
+def test_metered_session_delegates_and_records():
+    class Upstream:
+        closed = False
+
+        async def get(self, url, params=None, **kwargs):
+            return FakeResponse()
+
+    session = MeteredSession(Upstream())
+    asyncio.run(session.get("https://lsa1.geohub.sa.gov.au/identify"))
+    assert session.connections.requests == 1
+    assert session.closed is False  # anything else reaches the wrapped session
+
+
+def test_concurrent_requests_share_a_few_connections():
+    async def main():
+        upstream = MockUpstream(latency=0.02, jitter=0.0)
+        server = await asyncio.start_server(upstream.handle, "127.0.0.1", 0)
+        url = f"http://127.0.0.1:{server.sockets[0].getsockname()[1]}/int/_getzones"
+        session = await creat_session(max_clients=8, max_host_connections=4)
+        try:
+            for _ in range(2):  # the second round should need no new connections
+                responses = await asyncio.gather(*(session.get(url, params={"term": str(n)}) for n in range(16)))
+                assert all(response.status_code == 200 for response in responses)
+        finally:
+            await close_session(session)
+            server.close()
+            await server.wait_closed()
+        return session.connections
+
+    connections = asyncio.run(main())
+    assert connections.requests == 32
+    assert connections.new_connections <= 4
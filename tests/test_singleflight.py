@@ -0,0 +1,78 @@
+"""``singleflight``: sharing in-flight work, its errors, and cancellation."""
+import asyncio
+
+import pytest
+
+from singleflight import SingleFlight, request_key
+
+
+def test_concurrent_calls_share_one_execution():
+    flights = SingleFlight("test")
+    runs = []
+
+    async def work():
+        runs.append(1)
+        await asyncio.sleep(0.01)
+        return "sid"
+
+    async def main():
+        return await asyncio.gather(*(flights.do("key", work) for _ in range(5)))
+
+    assert asyncio.run(main()) == ["sid"] * 5
+    assert len(runs) == 1
+    assert (flights.stats.calls, flights.stats.executed, flights.stats.saved) == (5, 1, 4)
+    assert len(flights) == 0
+
+
+def test_every_waiter_sees_the_error_and_the_next_call_retries():
+    flights = SingleFlight("test")
+    runs = []
+
+    async def failing():
+        runs.append(1)
+        await asyncio.sleep(0.01)
+        raise LookupError("upstream down")
+
+    async def main():
+        results = await asyncio.gather(*(flights.do("key", failing) for _ in range(3)), return_exceptions=True)
+        assert all(isinstance(result, LookupError) for result in results)
+        assert len(flights) == 0
+        with pytest.raises(LookupError):
+            await flights.do("key", failing)
+
+    asyncio.run(main())
+    assert len(runs) == 2  # the failure wasn't kept
+
+
+def test_different_keys_run_separately():
+    flights = SingleFlight("test")
+
+    async def main():
+        return await asyncio.gather(flights.do("a", lambda: asyncio.sleep(0, "a")),
+                                    flights.do("b", lambda: asyncio.sleep(0, "b")))
+
+    assert asyncio.run(main()) == ["a", "b"]
+    assert flights.stats.executed == 2
+
+
+def test_cancelling_one_waiter_leaves_the_others_their_result():
+    flights = SingleFlight("test")
+
+    async def work():
+        await asyncio.sleep(0.02)
+        return "sid"
+
+    async def main():
+        first = asyncio.ensure_future(flights.do("key", work))
+        second = asyncio.ensure_future(flights.do("key", work))
+        await asyncio.sleep(0.005)
+        first.cancel()
+        assert await second == "sid"
+        assert first.cancelled()
+
+    asyncio.run(main())
+
+
+def test_request_key_ignores_param_order():
+    assert request_key("u", {"a": 1, "b": "2"}) == request_key("u", {"b": 2, "a": "1"})
+    assert request_key("u") == request_key("u", {})
@@ -0,0 +1,49 @@
+"""``valuation.tnv``: decoding ``_getzones`` TNV items and merging them into assessments."""
+import math
+
+from valuation.tnv import decode_tnv, decode_tnv_many, merge_tnv, tnv_code, tnv_label
+
+FRONTAGE = {"GroupType": "Local Variation (TNV)", "Code": "V0004|_9_8_6_18_18",
+            "Description": "<p>Minimum Frontage <span>(detached, semi-detached, row, group, flat)</span></p>"}
+HEIGHT = {"GroupType": "Local Variation (TNV)", "Code": "V0006|_2",
+          "Description": "<div><p>Maximum Building Height (Levels)</p></div>"}
+ZONE = {"GroupType": "Zone", "Code": "Z0204", "Description": "<p>General Neighbourhood</p>"}
+
+
+def test_code_has_one_value_per_dwelling_type():
+    assert tnv_code("V0004|_9_8_6_18_18") == ("V0004", (9.0, 8.0, 6.0, 18.0, 18.0))
+    variation, values = tnv_code("V0006|_2__x")
+    assert variation == "V0006" and values[0] == 2.0
+    assert all(math.isnan(value) for value in values[1:])
+
+
+def test_label_drops_markup_and_the_dwelling_note():
+    assert tnv_label(FRONTAGE["Description"]) == "Minimum Frontage"
+    assert tnv_label("<p>Maximum Building Height (Levels)</p>") == "Maximum Building Height (Levels)"
+    assert tnv_label("<p>Site&nbsp;Area</p>") == "Site Area"
+
+
+def test_decode_keys_entries_by_variation_name():
+    decoded = decode_tnv({"List": [ZONE, FRONTAGE, HEIGHT]})
+    assert decoded["minimum_frontage"] == {"code": "V0004", "label": "Minimum Frontage", "detached": 9.0,
+                                           "semi_detached": 8.0, "row": 6.0, "group": 18.0, "flat": 18.0}
+    assert decoded["maximum_building_height_levels"]["detached"] == 2.0
+    assert decoded["maximum_building_height_levels"]["flat"] is None
+    assert decode_tnv({"List": [ZONE]}) == {} and decode_tnv(None) == {}
+
+
+def test_decode_many_agrees_with_decoding_each_parcel():
+    payloads = [{"List": [ZONE, FRONTAGE, HEIGHT]}, {"List": [ZONE]}, {}, {"List": [HEIGHT]}]
+    table = decode_tnv_many(payloads)
+    assert table.parcels == 4 and len(table) == 3
+    for parcel, zones in enumerate(payloads):
+        assert table.for_parcel(parcel) == decode_tnv(zones)
+    assert list(table.to_frame()["parcel"]) == [0, 0, 3]
+
+
+def test_merge_adds_tnv_only_when_there_is_some():
+    assessment = {"site_coverage": None}
+    assert merge_tnv(assessment, {"List": [ZONE, HEIGHT]}) is assessment
+    assert set(assessment["tnv"]) == {"maximum_building_height_levels"}
+    assert merge_tnv({"site_coverage": None}, {"List": [ZONE]}) == {"site_coverage": None}
+    assert merge_tnv(None, {"List": [HEIGHT]}) is None
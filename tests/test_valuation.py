@@ -0,0 +1,92 @@
+"""``valuation.valuation``: decoding PlanSA responses once, and sharing identical fetches."""
+import asyncio
+import json
+
+import pytest
+
+from http_cache import CachingSession, HttpCache
+from valuation import valuation
+from valuation.valuation import _decode_response, get_tnv_raw, get_zone_policies_raw
+
+
+class FakeResponse:
+    """Counts how often its body is read or decoded."""
+
+    def __init__(self, status_code=200, body=None, text=None):
+        self.status_code = status_code
+        self.text = json.dumps(body) if text is None else text
+        self.headers = {}
+        self.reads = 0
+
+    @property
+    def content(self) -> bytes:
+        self.reads += 1
+        return self.text.encode("utf-8")
+
+    def json(self):
+        self.reads += 1
+        return json.loads(self.text)
+
+
+class FakeSession:
+    """Answers with ``by_doc[docId]`` (or ``default``), later docIds sooner, counting requests."""
+
+    def __init__(self, default=None, by_doc=None):
+        self.default = default
+        self.by_doc = by_doc or {}
+        self.requests = []
+
+    async def get(self, url, params=None, **kwargs):
+        self.requests.append(dict(params or {}))
+        doc_id = (params or {}).get("docId")
+        order = list(self.by_doc)
+        await asyncio.sleep(0.01 * (len(order) - order.index(doc_id) if doc_id in order else 1))
+        return self.by_doc.get(doc_id) or self.default
+
+
+def test_body_is_decoded_once():
+    response = FakeResponse(body={"List": []})
+    assert _decode_response(response, "zones") == {"List": []}
+    assert response.reads == 1
+
+
+@pytest.mark.parametrize("response, message", [
+    (FakeResponse(500, text="oops"), "Error fetching zones: 500 - oops"),
+    (FakeResponse(body={"status": 404, "message": "No valuation"}), "Error fetching zones: 404 - No valuation"),
+])
+def test_failures_raise_value_error(response, message):
+    with pytest.raises(ValueError, match=message):
+        _decode_response(response, "zones")
+
+
+def test_concurrent_identical_requests_share_one_fetch():
+    session = FakeSession(FakeResponse(body={"List": [{"GroupType": "Zone"}]}))
+
+    async def main():
+        return await asyncio.gather(*(get_tnv_raw(session, "123") for _ in range(4)))
+
+    assert all(result == {"List": [{"GroupType": "Zone"}]} for result in asyncio.run(main()))
+    assert len(session.requests) == 1
+
+
+def test_error_bodies_are_not_replayed_from_the_cache(tmp_path):
+    cache = HttpCache(tmp_path / "http.sqlite")
+    upstream = FakeSession(FakeResponse(body={"status": 500, "message": "busy"}))
+    session = CachingSession(upstream, cache)
+    with pytest.raises(ValueError):
+        asyncio.run(get_tnv_raw(session, "123"))
+    upstream.default = FakeResponse(body={"List": []})
+    assert asyncio.run(get_tnv_raw(session, "123")) == {"List": []}
+    assert len(upstream.requests) == 2
+    cache.close()
+
+
+def test_documents_keep_doc_id_order_and_skip_non_lists(monkeypatch):
+    monkeypatch.setattr(valuation, "_host_semaphores", {})
+    session = FakeSession(by_doc={
+        "A": FakeResponse(body=[{"Content": "a"}]),
+        "B": FakeResponse(body={"unexpected": True}),
+        "C": FakeResponse(body=[{"Content": "c"}]),
+    })
+    documents = asyncio.run(get_zone_policies_raw(session, "123", ["A", "B", "C"]))
+    assert documents == [[{"Content": "a"}], [{"Content": "c"}]]
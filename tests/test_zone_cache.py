@@ -0,0 +1,117 @@
+"""``valuation.zone_cache``: which parcels share documents and assessments."""
+import asyncio
+from typing import List
+
+import pytest
+
+from valuation import zone_cache
+from valuation.zone_cache import ZoneCache, get_zone_policies, zone_key_from_tree, zone_key_from_zones
+
+TREE = [{"DocTreeText": "General Neighbourhood Zone", "HasChildren": True,
+         "Children": [{"DocTreeID": "Z0204-0"}, {"DocTreeID": "Z0204-1"}]}]
+
+
+def _zones(zone: str = "Z0204", levels: int = 2) -> dict:
+    items = [{"GroupType": "Local Variation (TNV)", "Code": f"V0006|_{levels}"}]
+    if zone:
+        items.insert(0, {"GroupType": "Zone", "Code": zone})
+    return {"List": items}
+
+
+class FakePlanSA:
+    """Stands in for the three PlanSA calls; ``zones`` maps valuation -> ``_getzones`` payload."""
+
+    def __init__(self, zones: dict, documents: List[List[dict]] = None):
+        self.zones = zones
+        self.documents = [[{"Content": "<p>policy</p>"}]] if documents is None else documents
+        self.fetched: List[str] = []
+
+    async def get_tnv_raw(self, session, valuation_sid):
+        return self.zones[valuation_sid]
+
+    async def get_zone_policy_tree(self, session, valuation_sid):
+        return TREE
+
+    async def get_zone_policies_raw(self, session, valuation_sid, doc_ids):
+        self.fetched.append(valuation_sid)
+        await asyncio.sleep(0.01)
+        return self.documents
+
+
+@pytest.fixture
+def plansa(monkeypatch):
+    def install(zones, documents=None):
+        fake = FakePlanSA(zones, documents)
+        for name in ("get_tnv_raw", "get_zone_policy_tree", "get_zone_policies_raw"):
+            monkeypatch.setattr(zone_cache, name, getattr(fake, name))
+        return fake
+    return install
+
+
+def _policies(cache, *sids):
+    async def main():
+        return await asyncio.gather(*(get_zone_policies(None, sid, cache) for sid in sids))
+    return asyncio.run(main())
+
+
+def test_parcels_in_one_zone_with_the_same_tnv_share_documents(plansa):
+    fake = plansa({"1": _zones(), "2": _zones(), "3": _zones(levels=3)})
+    cache = ZoneCache()
+    first, = _policies(cache, "1")
+    second, third = _policies(cache, "2", "3")
+    assert fake.fetched == ["1", "3"]
+    assert second.cached and second.documents is first.documents
+    assert not third.cached and third.key != first.key
+    assert (cache.stats.hits, cache.stats.misses) == (1, 2)
+
+
+def test_concurrent_parcels_of_a_new_zone_fetch_once(plansa):
+    fake = plansa({str(n): _zones() for n in range(5)})
+    results = _policies(ZoneCache(), *map(str, range(5)))
+    assert len(fake.fetched) == 1
+    assert all(result.documents == fake.documents for result in results)
+
+
+def test_policy_tree_identifies_an_unnamed_zone(plansa):
+    plansa({"1": _zones(zone="")})
+    [result] = _policies(ZoneCache(), "1")
+    assert result.key.startswith(zone_key_from_tree(TREE))
+    assert zone_key_from_zones(_zones(zone="")) is None
+
+
+def test_empty_answers_are_not_shared(plansa):
+    fake = plansa({"1": _zones(), "2": _zones()}, documents=[])
+    cache = ZoneCache()
+    _policies(cache, "1")
+    _policies(cache, "2")
+    assert fake.fetched == ["1", "2"] and len(cache) == 0
+
+
+def test_least_recently_used_zone_is_evicted():
+    cache = ZoneCache(max_zones=2)
+    cache.put("a", [])
+    cache.put("b", [])
+    cache.get("a")
+    cache.put("c", [])
+    assert cache.get("b") is None and cache.get("a") is not None
+    assert cache.stats.evictions == 1
+
+
+def test_assessment_is_built_once_per_zone_and_copied():
+    cache = ZoneCache()
+    cache.put("zone", [])
+    builds = []
+
+    async def build():
+        builds.append(1)
+        return {"site_coverage": {"value": 60}}, {"rule_fields": 1}
+
+    async def main():
+        first = await cache.assessment("zone", True, build)
+        first[0]["site_coverage"]["value"] = 0  # a caller's edits stay its own
+        return first, await cache.assessment("zone", True, build), await cache.assessment("zone", False, build)
+
+    first, second, without_llm = asyncio.run(main())
+    assert len(builds) == 2  # once with the LLM, once without
+    assert second == ({"site_coverage": {"value": 60}}, {"rule_fields": 1}, True)
+    assert not first[2] and not without_llm[2]
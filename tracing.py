@@ -0,0 +1,259 @@
+"""Lightweight spans for seeing where a run spends its time.
+
+Code wraps a unit of work in ``with span("plansa.document", doc_id=...)``.
+Spans nest through a context variable, so concurrent tasks each get their
+own parent chain without passing anything around. Inner code that only
+knows a detail (bytes read, tokens used, a cache hit) attaches it to
+whatever span is current with ``annotate``/``add``.
+
+Every finished span is folded into a fixed-size per-name reservoir of
+latency samples for the p50/p95/p99 summary, so a long-running server
+keeps constant memory however many spans it records. Each span can also
+be written as one JSON line to a trace file using OTLP field names
+(``traceId``, ``spanId``, ``startTimeUnixNano``...) and mirrored to
+OpenTelemetry when its API is installed.
+"""
+from __future__ import annotations
+import json
+import random
+import time
+from array import array
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    start_ns: int
+    end_ns: int = 0
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+    otel: Any = field(default=None, repr=False)
+
+    @property
+    def seconds(self) -> float:
+        return (self.end_ns - self.start_ns) / 1e9
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+    def add(self, name: str, amount: float = 1) -> None:
+        self.attributes[name] = self.attributes.get(name, 0) + amount
+
+    def to_otlp(self) -> Dict[str, Any]:
+        """This span as an OTLP/JSON span object."""
+        record: Dict[str, Any] = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in self.attributes.items()],
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1},
+        }
+        if self.parent_id:
+            record["parentSpanId"] = self.parent_id
+        return record
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _format_bytes(count: int) -> str:
+    return f"{count / 1e6:.1f}MB" if count >= 1e6 else f"{count / 1e3:.1f}kB"
+
+
+RESERVOIR_SIZE = 2048  # latency samples kept per span name
+
+
+def _percentile(ordered: List[float], fraction: float) -> float:
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+@dataclass
+class SpanStats:
+    """Totals for every finished span with one name, and a uniform sample of their durations.
+
+    ``seconds`` is a reservoir (Algorithm R) of at most ``RESERVOIR_SIZE``
+    durations, so percentiles are estimates once more spans than that have
+    finished; ``count`` and ``max`` stay exact.
+    """
+    seconds: array = field(default_factory=lambda: array("d"))
+    count: int = 0
+    max: float = 0.0
+    errors: int = 0
+    cache_hits: int = 0
+    bytes: int = 0
+    tokens: int = 0
+
+    def record(self, span: Span) -> None:
+        self.count += 1
+        self.max = max(self.max, span.seconds)
+        if len(self.seconds) < RESERVOIR_SIZE:
+            self.seconds.append(span.seconds)
+        else:
+            slot = random.randrange(self.count)
+            if slot < RESERVOIR_SIZE:
+                self.seconds[slot] = span.seconds
+        self.errors += span.error is not None
+        self.cache_hits += bool(span.attributes.get("cache_hit"))
+        self.bytes += int(span.attributes.get("bytes", 0))
+        self.tokens += int(span.attributes.get("tokens", 0))
+
+    def summary(self) -> Dict[str, Any]:
+        ordered = sorted(self.seconds)
+        if not ordered:
+            return {"count": 0}
+        return {
+            "count": self.count,
+            "p50": _percentile(ordered, 0.50),
+            "p95": _percentile(ordered, 0.95),
+            "p99": _percentile(ordered, 0.99),
+            "max": self.max,
+            "errors": self.errors,
+            "cache_hits": self.cache_hits,
+            "bytes": self.bytes,
+            "tokens": self.tokens,
+        }
+
+
+class Tracer:
+    """Collects finished spans: summary stats always, a trace file and OpenTelemetry on request."""
+
+    def __init__(self, path: Optional[Path] = None, otel: bool = False):
+        self.path = Path(path) if path else None
+        self.stats: Dict[str, SpanStats] = {}
+        self._file = None
+        if self.path is not None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = self.path.open("w", encoding="utf-8")
+        self.otel = None
+        if otel:
+            try:
+                from opentelemetry import trace
+            except ImportError as e:
+                raise ImportError("OpenTelemetry tracing needs opentelemetry-api: pip install opentelemetry-api") from e
+            self.otel = trace
+
+    def _start_otel(self, span: Span, parent: Optional[Span]) -> Any:
+        context = self.otel.set_span_in_context(parent.otel) if parent is not None and parent.otel else None
+        return self.otel.get_tracer("plansa").start_span(span.name, context=context, start_time=span.start_ns)
+
+    def record(self, span: Span) -> None:
+        stats = self.stats.get(span.name)
+        if stats is None:
+            stats = self.stats[span.name] = SpanStats()
+        stats.record(span)
+        if self._file is not None:
+            self._file.write(json.dumps(span.to_otlp(), default=str) + "\n")
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        return {name: stats.summary() for name, stats in self.stats.items()}
+
+    def report(self) -> None:
+        from rich import print
+
+        if not self.stats:
+            return
+        print("[bold]Timings:[/bold]")
+        for name, summary in self.summary().items():
+            extras = []
+            if summary["bytes"]:
+                extras.append(f"bytes={_format_bytes(summary['bytes'])}")
+            if summary["tokens"]:
+                extras.append(f"tokens={summary['tokens']}")
+            if summary["cache_hits"]:
+                extras.append(f"cache hits={summary['cache_hits']}")
+            if summary["errors"]:
+                extras.append(f"[red]errors={summary['errors']}[/red]")
+            print(
+                f"  {name:<20} n={summary['count']:<6} p50={summary['p50']:.3f}s p95={summary['p95']:.3f}s "
+                f"p99={summary['p99']:.3f}s max={summary['max']:.3f}s {' '.join(extras)}".rstrip()
+            )
+        if self.path is not None:
+            print(f"[green]Trace written to[/green] {self.path}")
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+_tracer = Tracer()
+_current: ContextVar[Optional[Span]] = ContextVar("plansa_span", default=None)
+
+
+def configure(path: Optional[Path] = None, otel: bool = False) -> Tracer:
+    """Replace the process-wide tracer (closing the previous one)."""
+    global _tracer
+    _tracer.close()
+    _tracer = Tracer(path, otel=otel)
+    return _tracer
+
+
+def get_tracer() -> Tracer:
+    return _tracer
+
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+
+def annotate(**attributes: Any) -> None:
+    """Set attributes on the current span, if there is one."""
+    active = _current.get()
+    if active is not None:
+        active.set(**attributes)
+
+
+def add(name: str, amount: float = 1) -> None:
+    """Add ``amount`` to a counter attribute on the current span, if there is one."""
+    active = _current.get()
+    if active is not None:
+        active.add(name, amount)
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Span]:
+    """Time the enclosed block as a child of the current span."""
+    parent = _current.get()
+    current = Span(
+        name=name,
+        trace_id=parent.trace_id if parent else f"{random.getrandbits(128):032x}",
+        span_id=f"{random.getrandbits(64):016x}",
+        parent_id=parent.span_id if parent else None,
+        start_ns=time.time_ns(),
+        attributes=attributes,
+    )
+    tracer = _tracer
+    if tracer.otel is not None:
+        current.otel = tracer._start_otel(current, parent)
+    token = _current.set(current)
+    started = time.perf_counter_ns()
+    try:
+        yield current
+    except BaseException as e:
+        current.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        current.end_ns = current.start_ns + time.perf_counter_ns() - started
+        _current.reset(token)
+        tracer.record(current)
+        if current.otel is not None:
+            current.otel.set_attributes({key: value if isinstance(value, (bool, int, float, str)) else str(value)
+                                         for key, value in current.attributes.items()})
+            current.otel.end(end_time=current.end_ns)
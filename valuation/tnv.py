@@ -0,0 +1,170 @@
+"""Decode a parcel's Technical and Numeric Variations (TNV) from ``_getzones``.
+
+TNV items are the ``_getzones`` ``List`` entries whose ``GroupType`` starts
+with "Local Variation". Each carries its values in ``Code``, after the
+variation code, one per dwelling type:
+
+    V0004|_9_8_6_18_18   ->  detached 9, semi-detached 8, row 6, group 18, flat 18
+
+and its name as the start of the ``Description`` HTML. ``decode_tnv_many``
+turns any number of parcels' payloads into one ``TnvTable`` of numpy
+columns. Parcels repeat the same handful of codes and descriptions, so each
+distinct string is decoded once, descriptions with a tag-stripping regex
+rather than an HTML parser, and the value matrix is assembled by indexing.
+"""
+from __future__ import annotations
+import html
+import math
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+
+
+DWELLING_TYPES: Tuple[str, ...] = ("detached", "semi_detached", "row", "group", "flat")
+
+_TAG = re.compile(r"<[^>]*>")
+_SPACE = re.compile(r"\s+")
+# The trailing "(detached, semi-detached, ...)" note, not parentheses that are part of the name.
+_DWELLING_NOTE = re.compile(r"\s*\([^()]*\b(?:detached|dwelling|row|group|flat)\b[^()]*\).*$", re.IGNORECASE)
+_NOT_WORD = re.compile(r"[^a-z0-9]+")
+
+
+def is_tnv_item(item: Any) -> bool:
+    return isinstance(item, dict) and str(item.get("GroupType") or "").lower().startswith("local variation")
+
+
+def tnv_items(zones: Any) -> List[dict]:
+    """The TNV entries of a ``_getzones`` payload."""
+    items = zones.get("List", []) if isinstance(zones, dict) else []
+    return [item for item in items if is_tnv_item(item)]
+
+
+@lru_cache(maxsize=4096)
+def tnv_label(description: str) -> str:
+    """The variation's name, e.g. "Minimum Frontage", from its ``Description`` HTML."""
+    text = _SPACE.sub(" ", html.unescape(_TAG.sub(" ", description))).strip()
+    return _DWELLING_NOTE.sub("", text).strip()
+
+
+def tnv_key(label: str) -> str:
+    """``label`` as an identifier: "Maximum Building Height (Levels)" -> "maximum_building_height_levels"."""
+    return _NOT_WORD.sub("_", label.lower()).strip("_")
+
+
+def _number(text: str) -> float:
+    try:
+        return float(text)
+    except ValueError:
+        return float("nan")
+
+
+@lru_cache(maxsize=4096)
+def tnv_code(code: str) -> Tuple[str, Tuple[float, ...]]:
+    """``(variation code, one value per DWELLING_TYPES)`` from a ``Code``; NaN where absent."""
+    variation, _, encoded = code.partition("|")
+    parts = encoded.split("_")
+    if parts and parts[0] == "":  # values are written with a leading "_"
+        parts = parts[1:]
+    values = [_number(part) if part else float("nan") for part in parts[:len(DWELLING_TYPES)]]
+    values += [float("nan")] * (len(DWELLING_TYPES) - len(values))
+    return variation.strip(), tuple(values)
+
+
+def _entry(code: str, label: str, values: Iterable[float]) -> Dict[str, Any]:
+    return {
+        "code": code,
+        "label": label,
+        **{dwelling: None if math.isnan(value) else value for dwelling, value in zip(DWELLING_TYPES, values)},
+    }
+
+
+@dataclass
+class TnvTable:
+    """TNV items of many parcels as columns; row ``i`` belongs to payload ``parcel[i]``."""
+    parcel: np.ndarray   # int64 index of the payload the item came from
+    code: np.ndarray     # variation code, e.g. "V0004"
+    label: np.ndarray    # variation name, e.g. "Minimum Frontage"
+    values: np.ndarray   # float64, one column per DWELLING_TYPES, NaN where absent
+    parcels: int         # payloads decoded, including those without TNV
+
+    def __len__(self) -> int:
+        return len(self.parcel)
+
+    def rows(self, parcel: int) -> slice:
+        """Rows of payload ``parcel`` (rows are grouped by payload, in order)."""
+        start, stop = self.parcel.searchsorted([parcel, parcel + 1])
+        return slice(int(start), int(stop))
+
+    def for_parcel(self, parcel: int) -> Dict[str, Dict[str, Any]]:
+        """Payload ``parcel``'s variations as ``{key: {code, label, <dwelling type>: value}}``."""
+        decoded: Dict[str, Dict[str, Any]] = {}
+        rows = self.rows(parcel)
+        for code, label, values in zip(self.code[rows], self.label[rows], self.values[rows].tolist()):
+            decoded[tnv_key(label) or code] = _entry(code, label, values)
+        return decoded
+
+    def to_frame(self) -> pd.DataFrame:
+        import pandas as pd
+
+        frame = pd.DataFrame({"parcel": self.parcel, "code": self.code, "label": self.label})
+        for column, dwelling in enumerate(DWELLING_TYPES):
+            frame[dwelling] = self.values[:, column]
+        return frame
+
+
+def decode_tnv_many(payloads: Iterable[Any]) -> TnvTable:
+    """Decode the TNV items of many ``_getzones`` payloads in one pass."""
+    import numpy as np
+
+    parcel: List[int] = []
+    code_index: List[int] = []
+    description_index: List[int] = []
+    codes: Dict[str, int] = {}
+    descriptions: Dict[str, int] = {}
+    count = 0
+    for index, zones in enumerate(payloads):
+        count = index + 1
+        for item in tnv_items(zones):
+            parcel.append(index)
+            # Distinct strings are numbered as they're first seen, decoded
+            # once below and fanned back out by index.
+            code_index.append(codes.setdefault(str(item.get("Code") or ""), len(codes)))
+            description_index.append(descriptions.setdefault(str(item.get("Description") or ""), len(descriptions)))
+
+    decoded = [tnv_code(code) for code in codes]
+    values = np.array([values for _, values in decoded], dtype=np.float64).reshape(-1, len(DWELLING_TYPES))
+    variations = np.array([variation for variation, _ in decoded], dtype=object)
+    labels = np.array([tnv_label(description) for description in descriptions], dtype=object)
+    code_rows = np.array(code_index, dtype=np.int64)
+
+    return TnvTable(
+        parcel=np.array(parcel, dtype=np.int64),
+        code=variations[code_rows],
+        label=labels[np.array(description_index, dtype=np.int64)],
+        values=values[code_rows],
+        parcels=count,
+    )
+
+
+def decode_tnv(zones: Any) -> Dict[str, Dict[str, Any]]:
+    """One parcel's TNV, keyed like ``TnvTable.for_parcel``; empty when it has none."""
+    decoded: Dict[str, Dict[str, Any]] = {}
+    for item in tnv_items(zones):
+        code, values = tnv_code(str(item.get("Code") or ""))
+        label = tnv_label(str(item.get("Description") or ""))
+        decoded[tnv_key(label) or code] = _entry(code, label, values)
+    return decoded
+
+
+def merge_tnv(assessment: Optional[Dict[str, Any]], zones: Any) -> Optional[Dict[str, Any]]:
+    """Add the parcel's decoded TNV to ``assessment`` under ``"tnv"`` (in place)."""
+    if assessment is not None:
+        tnv = decode_tnv(zones)
+        if tnv:
+            assessment["tnv"] = tnv
+    return assessment
@@ -1,9 +1,67 @@
-from curl_cffi.requests import AsyncSession
+from __future__ import annotations
+import asyncio
+from typing import TYPE_CHECKING, Any, AsyncIterator, Optional
+from urllib.parse import urlsplit
 from rich import print
-import json
-from bs4 import BeautifulSoup
 
-async def get_tnv_raw(session: AsyncSession, valuation_sid: str) -> json:
+from http_cache import discard
+from json_backend import loads
+from settings import PLANSA_CODE_URL
+from singleflight import get_group, request_key
+from tracing import span
+
+if TYPE_CHECKING:
+    from curl_cffi.requests import AsyncSession
+
+
+GETZONES_URL = f'{PLANSA_CODE_URL}/int/_getzones'
+GETPOLICIES_URL = f'{PLANSA_CODE_URL}/int/_getpolicies'
+PLANSA_HOST = urlsplit(PLANSA_CODE_URL).hostname or 'code.plan.sa.gov.au'
+DEFAULT_HOST_CONCURRENCY = 4
+
+_host_limits: dict[str, int] = {}
+_host_semaphores: dict[str, asyncio.Semaphore] = {}
+
+# Parcels that share a valuation or a zone policy docId issue identical
+# requests; concurrent ones share a single fetch and decode.
+_flights = get_group("valuation")
+
+
+def _decode_response(response, what: str) -> Any:
+    """Check ``response`` and decode its body exactly once.
+
+    PlanSA reports failures either as a non-200 status or as a JSON object
+    with a ``status`` key; both raise ``ValueError`` naming ``what``.
+    """
+    if response.status_code != 200:
+        raise ValueError(f"Error fetching {what}: {response.status_code} - {response.text}")
+    payload = loads(response.content)
+    if isinstance(payload, dict) and 'status' in payload:
+        raise ValueError(f"Error fetching {what}: {payload['status']} - {payload.get('message', '')}")
+    return payload
+
+
+async def _get_json(session: AsyncSession, url: str, params: dict, what: str, host: Optional[str] = None) -> Any:
+    """GET ``url`` and decode it, sharing the work with identical in-flight calls.
+
+    With ``host`` set the request also waits for that host's concurrency cap.
+    """
+    async def fetch() -> Any:
+        if host is None:
+            response = await session.get(url=url, params=params, impersonate='chrome')
+        else:
+            async with _host_semaphore(host):
+                response = await session.get(url=url, params=params, impersonate='chrome')
+        try:
+            return _decode_response(response, what)
+        except ValueError:
+            discard(session, response)  # an error body must not be replayed from the cache
+            raise
+
+    return await _flights.do(request_key(url, params), fetch)
+
+
+async def get_tnv_raw(session: AsyncSession, valuation_sid: str) -> dict:
     
     params = {
         'term': str(valuation_sid),
@@ -11,78 +69,113 @@ async def get_tnv_raw(session: AsyncSession, valuation_sid: str) -> json:
         'filter':'full'
     }
 
-    response = await session.get(
-
-                        url='https://code.plan.sa.gov.au/int/_getzones',
-                        params=params, 
-                        impersonate='chrome'
-                                )
-    
-    if response.status_code != 200:
-        raise ValueError(f"Error fetching valuation data: {response.status_code} - {response.text}")
-    if 'status' in response.json() :
-        raise ValueError(f"Error fetching valuation data: {response.json()['status']} - {response.json().get('message', '')}")
-    return response.json()
+    with span("plansa.getzones"):
+        return await _get_json(session, GETZONES_URL, params, "valuation data")
 
 
-async def get_zone_policies_doc_id(session: AsyncSession, valuation_sid: str) -> str:
-    
+async def get_zone_policy_tree(session: AsyncSession, valuation_sid: str) -> list[dict]:
+    """The ``_getpolicies`` document tree for a valuation, undecoded beyond JSON."""
     params = {
         'term': str(valuation_sid),
         'type': 'valuation',
     }
 
-    response = await session.get(
+    with span("plansa.getpolicies"):
+        return await _get_json(session, GETPOLICIES_URL, params, "zone policies")
 
-                        url='https://code.plan.sa.gov.au/int/_getpolicies',
-                        params=params, 
-                        impersonate='chrome'
-                                )
-    
-    if response.status_code != 200:
-        raise ValueError(f"Error fetching zone policies: {response.status_code} - {response.text}")
-    if 'status' in response.json() :
-        raise ValueError(f"Error fetching zone policies: {response.json()['status']} - {response.json().get('message', '')}")
-    doc_ids = []
-    for policy in response.json():
-        if "Zone" in policy.get('DocTreeText') :
-            if policy.get('HasChildren') is True:
-                for child in policy.get('Children', []):
-                        doc_ids.append(child.get('DocTreeID'))
-    print(f"Zone Policies Doc IDs: {doc_ids}")
-    return doc_ids
 
+def zone_nodes(policies: list[dict]) -> list[dict]:
+    """The tree nodes holding zone policy documents."""
+    return [policy for policy in policies
+            if "Zone" in (policy.get('DocTreeText') or '') and policy.get('HasChildren') is True]
 
 
-async def get_zone_policies_raw(session: AsyncSession, valuation_sid: str) -> list[list[dict]]:
-    """Fetch zone policies for a given valuation SID."""
-    doc_ids = await get_zone_policies_doc_id(session, valuation_sid)
-    if not doc_ids:
-        return []
+def zone_doc_ids(policies: list[dict]) -> list[str]:
+    return [child.get('DocTreeID') for policy in zone_nodes(policies) for child in policy.get('Children', [])]
 
-    params = {
-        'term': str(valuation_sid),
-        'type': 'valuation',
-        'filter': 'full'
-    }
-    policies_responses = []
-    for doc_id in doc_ids:
-        response = await session.get(
-            url='https://code.plan.sa.gov.au/int/_getpolicies',
-            params={**params, 'docId': doc_id},
-            impersonate='chrome'
-        )
 
-        if response.status_code != 200:
-            raise ValueError(f"Error fetching policy document {doc_id}: {response.status_code} - {response.text}")
-        if 'status' in response.json():
-            raise ValueError(f"Error fetching policy document {doc_id}: {response.json()['status']} - {response.json().get('message', '')}")
-        response_json = response.json()
-        if isinstance(response_json, list):
-            policies_responses.append(response_json)
+async def get_zone_policies_doc_id(session: AsyncSession, valuation_sid: str) -> list[str]:
+    doc_ids = zone_doc_ids(await get_zone_policy_tree(session, valuation_sid))
+    print(f"Zone Policies Doc IDs: {doc_ids}")
+    return doc_ids
 
-    return policies_responses
 
 
+def set_host_concurrency(limit: int, host: str = PLANSA_HOST) -> None:
+    """Cap how many policy requests may be in flight to ``host`` at once.
 
+    The cap is shared by every caller in the process, so a batch run with
+    many parcels in flight still never opens more than ``limit`` concurrent
+    ``_getpolicies`` requests.
+    """
+    if limit < 1:
+        raise ValueError("limit must be at least 1")
+    _host_limits[host] = limit
+    _host_semaphores.pop(host, None)
 
+
+def _host_semaphore(host: str) -> asyncio.Semaphore:
+    semaphore = _host_semaphores.get(host)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(_host_limits.get(host, DEFAULT_HOST_CONCURRENCY))
+        _host_semaphores[host] = semaphore
+    return semaphore
+
+
+async def _get_policy_document(session: AsyncSession, valuation_sid: str, doc_id: str) -> Optional[list[dict]]:
+    params = {
+        'term': str(valuation_sid),
+        'type': 'valuation',
+        'filter': 'full',
+        'docId': doc_id,
+    }
+    with span("plansa.document", doc_id=doc_id):
+        response_json = await _get_json(session, GETPOLICIES_URL, params, f"policy document {doc_id}",
+                                        host=PLANSA_HOST)
+    return response_json if isinstance(response_json, list) else None
+
+
+async def iter_zone_policies_raw(
+    session: AsyncSession,
+    valuation_sid: str,
+    doc_ids: Optional[list[str]] = None,
+) -> AsyncIterator[tuple[int, str, Optional[list[dict]]]]:
+    """Yield ``(index, doc_id, document)`` for each zone policy document as soon as it arrives.
+
+    ``index`` is the position of ``doc_id`` in the doc ID list, so callers can
+    restore the original order; ``document`` is ``None`` when the service
+    answered with something other than a list. Requests still in flight are cancelled if the
+    consumer stops iterating early or a fetch fails. ``doc_ids`` skips the
+    tree lookup when the caller already has it.
+    """
+    if doc_ids is None:
+        doc_ids = await get_zone_policies_doc_id(session, valuation_sid)
+
+    async def fetch(index: int, doc_id: str) -> tuple[int, str, Optional[list[dict]]]:
+        return index, doc_id, await _get_policy_document(session, valuation_sid, doc_id)
+
+    tasks = [asyncio.ensure_future(fetch(index, doc_id)) for index, doc_id in enumerate(doc_ids)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def get_zone_policies_raw(
+    session: AsyncSession,
+    valuation_sid: str,
+    doc_ids: Optional[list[str]] = None,
+) -> list[list[dict]]:
+    """Fetch zone policies for a given valuation SID.
+
+    Documents are requested concurrently (bounded by the per-host cap, see
+    ``set_host_concurrency``) and returned in the same order as their doc IDs.
+    """
+    documents: dict[int, list[dict]] = {}
+    async for index, _, document in iter_zone_policies_raw(session, valuation_sid, doc_ids):
+        if document is not None:
+            documents[index] = document
+    return [documents[index] for index in sorted(documents)]
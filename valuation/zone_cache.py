@@ -0,0 +1,209 @@
+"""Zone-level cache of policy documents and the assessments parsed from them.
+
+Zone policy in the Planning and Design Code is the same for every parcel in
+a zone (and subzone) except for its Technical and Numeric Variations
+(TNV), which PlanSA fills into the policy ``Content`` it serves for a
+valuation ("Maximum building height is 3 levels"). So each parcel costs one
+``_getzones`` call, which names its zone and lists its TNV codes, and the
+``_getpolicies`` tree and documents are fetched only the first time that
+zone and TNV combination is seen. The parsed assessment is cached
+alongside, so the rule and LLM extractors also run once per combination.
+When ``_getzones`` doesn't name a zone, the policy tree's zone nodes and
+doc IDs identify it instead.
+"""
+from __future__ import annotations
+import copy
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from settings import ZONE_CACHE_MAX_ZONES
+from singleflight import get_group
+from tracing import span
+
+from .tnv import tnv_items
+from .valuation import get_tnv_raw, get_zone_policies_raw, get_zone_policy_tree, zone_doc_ids, zone_nodes
+
+if TYPE_CHECKING:
+    from curl_cffi.requests import AsyncSession
+
+
+Assessment = Tuple[Dict[str, Any], Dict[str, Any]]  # (assessment, provenance)
+
+_documents_flights = get_group("zone-documents")
+_assessment_flights = get_group("zone-assessment")
+
+
+def tnv_key_part(zones: Any) -> str:
+    """The parcel's TNV codes (variation and values), sorted, for a zone key."""
+    return "tnv:" + ",".join(sorted(str(item.get("Code") or "") for item in tnv_items(zones)))
+
+
+def zone_key_from_zones(zones: Any) -> Optional[str]:
+    """Zone identity from a ``_getzones`` payload: its zone and subzone items, or ``None``.
+
+    The key doesn't include TNV; ``get_zone_policies`` adds ``tnv_key_part``.
+    """
+    items = zones.get("List", []) if isinstance(zones, dict) else []
+    parts = sorted(
+        f"{item.get('GroupType')}:{item.get('Code') or item.get('Description')}"
+        for item in items
+        if str(item.get("GroupType") or "").lower() in ("zone", "subzone")
+    )
+    return "|".join(parts) or None
+
+
+def zone_key_from_tree(policies: list[dict]) -> Optional[str]:
+    """Zone identity from a ``_getpolicies`` tree: its zone nodes and their doc IDs."""
+    parts = [f"{policy.get('DocTreeText')}:{','.join(str(child.get('DocTreeID')) for child in policy.get('Children', []))}"
+             for policy in zone_nodes(policies)]
+    return "tree:" + "|".join(parts) if parts else None
+
+
+@dataclass
+class ZoneCacheStats:
+    hits: int = 0
+    misses: int = 0
+    assessment_hits: int = 0
+    assessment_misses: int = 0
+    evictions: int = 0
+
+
+@dataclass
+class ZoneEntry:
+    documents: list[list[dict]]
+    assessments: Dict[bool, Assessment] = field(default_factory=dict)  # keyed by use_llm
+
+
+@dataclass
+class ZonePolicies:
+    """One parcel's zone: the shared documents plus the parcel's own ``_getzones`` payload."""
+    valuation_sid: str
+    key: Optional[str]
+    documents: list[list[dict]]
+    zones: dict
+    cached: bool = False
+
+
+class ZoneCache:
+    """In-memory LRU of zone documents and assessments, at most ``max_zones`` zones."""
+
+    def __init__(self, max_zones: int = ZONE_CACHE_MAX_ZONES):
+        if max_zones < 1:
+            raise ValueError("max_zones must be at least 1")
+        self.max_zones = max_zones
+        self.stats = ZoneCacheStats()
+        self._entries: OrderedDict[str, ZoneEntry] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[ZoneEntry]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key: str, documents: list[list[dict]]) -> ZoneEntry:
+        entry = self._entries[key] = ZoneEntry(documents)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_zones:
+            self._entries.popitem(last=False)
+            self.stats.evictions += 1
+        return entry
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    async def assessment(
+        self,
+        key: str,
+        use_llm: bool,
+        build: Callable[[], Awaitable[Assessment]],
+    ) -> Tuple[Dict[str, Any], Dict[str, Any], bool]:
+        """``(assessment, provenance, cached)`` for a zone, running ``build`` once per zone.
+
+        Copies are returned, so callers can add parcel-specific data freely.
+        """
+        entry = self.get(key)
+        cached = entry is not None and use_llm in entry.assessments
+        if cached:
+            self.stats.assessment_hits += 1
+            assessment, provenance = entry.assessments[use_llm]
+        else:
+            self.stats.assessment_misses += 1
+
+            async def run() -> Assessment:
+                built = await build()
+                current = self.get(key)
+                if current is not None:
+                    current.assessments[use_llm] = built
+                return built
+
+            assessment, provenance = await _assessment_flights.do((key, use_llm), run)
+        return copy.deepcopy(assessment), dict(provenance), cached
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "zones": len(self._entries),
+            "hits": self.stats.hits,
+            "misses": self.stats.misses,
+            "assessment_hits": self.stats.assessment_hits,
+            "assessment_misses": self.stats.assessment_misses,
+            "evictions": self.stats.evictions,
+        }
+
+
+async def get_zone_policies(
+    session: AsyncSession,
+    valuation_sid: str,
+    cache: Optional[ZoneCache] = None,
+) -> ZonePolicies:
+    """Resolve a parcel's zone and return its policy documents, fetching them once per zone."""
+    cache = get_default_zone_cache() if cache is None else cache
+    with span("zone.policies") as current:
+        zones = await get_tnv_raw(session, valuation_sid)
+        key = zone_key_from_zones(zones)
+        tree = None
+        if key is None:
+            tree = await get_zone_policy_tree(session, valuation_sid)
+            key = zone_key_from_tree(tree)
+            if key is None:  # no zone documents to share
+                return ZonePolicies(valuation_sid, None, [], zones)
+        # Documents carry the parcel's TNV values, so only parcels with the
+        # same variations can share them.
+        key = f"{key}|{tnv_key_part(zones)}"
+
+        entry = cache.get(key)
+        current.set(zone=key, cache_hit=entry is not None)
+        if entry is not None:
+            cache.stats.hits += 1
+            return ZonePolicies(valuation_sid, key, entry.documents, zones, cached=True)
+        cache.stats.misses += 1
+
+        async def load() -> list[list[dict]]:
+            policies = tree if tree is not None else await get_zone_policy_tree(session, valuation_sid)
+            documents = await get_zone_policies_raw(session, valuation_sid, zone_doc_ids(policies))
+            if documents:  # an empty answer is retried by the next parcel instead of shared
+                cache.put(key, documents)
+            return documents
+
+        documents = await _documents_flights.do(key, load)
+        return ZonePolicies(valuation_sid, key, documents, zones)
+
+
+_default_cache: Optional[ZoneCache] = None
+
+
+def configure_zone_cache(max_zones: int) -> ZoneCache:
+    """Replace the process-wide zone cache with an empty one holding ``max_zones`` zones."""
+    global _default_cache
+    _default_cache = ZoneCache(max_zones)
+    return _default_cache
+
+
+def get_default_zone_cache() -> ZoneCache:
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ZoneCache()
+    return _default_cache